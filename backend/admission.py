@@ -0,0 +1,167 @@
+"""
+Admission control for the deliberation endpoint.
+
+Stage 0 (gatekeeper) requests and full Stage 1-4 pipelines share a pool of
+`max_concurrent` slots, of which pipelines may use at most
+`max_concurrent_pipelines`, so cheap Stage 0 calls always find room. When
+no slot is free requests wait in a bounded queue, gatekeeper requests ahead
+of pipelines. A full queue is rejected right away (429); a request that
+waited `queue_timeout_seconds` without starting is shed (503). Both carry a
+Retry-After estimate from recent run times.
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Deque, Tuple
+from .config import get_settings
+
+GATEKEEPER = "gatekeeper"
+PIPELINE = "pipeline"
+
+# Lower value is admitted first
+PRIORITY = {GATEKEEPER: 0, PIPELINE: 1}
+
+DEFAULT_ADMISSION = {
+    "enabled": True,
+    "max_concurrent": 12,
+    "max_concurrent_pipelines": 4,
+    "max_queued_gatekeeper": 32,
+    "max_queued_pipelines": 8,
+    "queue_timeout_seconds": 30,
+    # Retry-After used before any run time has been observed
+    "default_retry_after_seconds": {GATEKEEPER: 5, PIPELINE: 60}
+}
+
+class Overloaded(Exception):
+    """Request not admitted; carries the HTTP status and a Retry-After hint"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+class AdmissionController:
+    """Bounded concurrency and priority queueing per request kind"""
+
+    def __init__(self, admission_config: Optional[Dict[str, Any]] = None):
+        if admission_config is None:
+            admission_config = get_settings().api.get("admission", {}) or {}
+        self.settings = {**DEFAULT_ADMISSION, **admission_config}
+        self.active = {GATEKEEPER: 0, PIPELINE: 0}
+        self.queued = {GATEKEEPER: 0, PIPELINE: 0}
+        self.rejected = {GATEKEEPER: 0, PIPELINE: 0}
+        self.shed = {GATEKEEPER: 0, PIPELINE: 0}
+        self.durations: Dict[str, Deque[float]] = {GATEKEEPER: deque(maxlen=50), PIPELINE: deque(maxlen=50)}
+        self._waiters: List[Tuple[int, int, str, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def _limit(self, kind: str) -> int:
+        if kind == PIPELINE:
+            return min(self.settings["max_concurrent_pipelines"], self.settings["max_concurrent"])
+        return self.settings["max_concurrent"]
+
+    def _has_slot(self, kind: str) -> bool:
+        return (
+            sum(self.active.values()) < self.settings["max_concurrent"]
+            and self.active[kind] < self._limit(kind)
+        )
+
+    def _max_queued(self, kind: str) -> int:
+        return self.settings["max_queued_gatekeeper" if kind == GATEKEEPER else "max_queued_pipelines"]
+
+    def retry_after(self, kind: str) -> int:
+        """Seconds until a slot of this kind is likely free (mean run time x queue depth per slot)"""
+        durations = self.durations[kind]
+        if not durations:
+            return int(self.settings["default_retry_after_seconds"][kind])
+        mean = sum(durations) / len(durations)
+        waves = (self.queued[kind] + self.active[kind]) / max(1, self._limit(kind))
+        return max(1, int(mean * max(1.0, waves)))
+
+    def _wake(self) -> None:
+        """Start queued requests in priority order while slots are free"""
+        skipped = []
+        while self._waiters:
+            entry = heapq.heappop(self._waiters)
+            _, _, kind, future = entry
+            if future.done():
+                continue
+            if self._has_slot(kind):
+                self.active[kind] += 1
+                self.queued[kind] -= 1
+                future.set_result(None)
+            else:
+                # A pipeline blocked by its own cap must not block gatekeeper requests behind it
+                skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._waiters, entry)
+
+    async def acquire(self, kind: str) -> None:
+        """Take a slot for `kind`, waiting in the queue if needed; raises Overloaded"""
+        if not self.settings["enabled"]:
+            self.active[kind] += 1
+            return
+
+        ahead = any(PRIORITY[k] <= PRIORITY[kind] for _, _, k, f in self._waiters if not f.done())
+        if self._has_slot(kind) and not ahead:
+            self.active[kind] += 1
+            return
+
+        if self.queued[kind] >= self._max_queued(kind):
+            self.rejected[kind] += 1
+            raise Overloaded(429, self.retry_after(kind), f"Too many {kind} requests queued, retry later")
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (PRIORITY[kind], next(self._seq), kind, future))
+        self.queued[kind] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.settings["queue_timeout_seconds"])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Admitted at the same moment the wait gave up: hand the slot back
+                self.release(kind)
+            else:
+                future.cancel()
+                self.queued[kind] -= 1
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.shed[kind] += 1
+            raise Overloaded(503, self.retry_after(kind), f"Server busy, {kind} request not started in time")
+
+    def release(self, kind: str, duration: Optional[float] = None) -> None:
+        self.active[kind] -= 1
+        if duration is not None:
+            self.durations[kind].append(duration)
+        self._wake()
+
+    @asynccontextmanager
+    async def admit(self, kind: str):
+        """`async with controller.admit(kind):` around the admitted work"""
+        await self.acquire(kind)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(kind, time.monotonic() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            kind: {
+                "active": self.active[kind],
+                "queued": self.queued[kind],
+                "rejected": self.rejected[kind],
+                "shed": self.shed[kind],
+                "retry_after": self.retry_after(kind)
+            }
+            for kind in (GATEKEEPER, PIPELINE)
+        }
+
+@lru_cache(maxsize=1)
+def get_admission() -> AdmissionController:
+    """Controller shared by all requests in this process, constructed on first use"""
+    return AdmissionController()
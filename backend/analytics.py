@@ -0,0 +1,539 @@
+"""
+Archive-wide analytics over stored deliberations.
+
+Usage (from project root):
+    python -m backend.analytics --out backend/data/analytics
+    python -m backend.analytics --format parquet --workers 8 --full
+
+Conversations are streamed from storage (working-set files and archive
+segments), parsed and reduced to flat rows in a process pool, and written as
+columnar tables with a fixed column list each (FIELDS):
+    experts    one row per (conversation, expert)
+    solutions  one row per (conversation, proposed solution)
+    stages     one row per (conversation, stage) with latency in seconds
+    models     per-model summary (win rate, failure and fallback rates),
+               recomputed from `experts` at the end of every run
+
+Runs are incremental by default: a manifest keeps the mtime of every
+working-set file and archive segment processed, and unchanged ones are
+skipped. Rows carry `source_mtime`; when a conversation changed, moved into
+the archive or was deleted since the last run, a compaction step rewrites
+the tables keeping only each conversation's current rows.
+"""
+import argparse
+import csv
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from .storage import Storage, iter_latest_in_segment
+from .scoring import aggregate_rankings
+
+TABLES = ("experts", "solutions", "stages")
+MANIFEST_NAME = "manifest.json"
+SUMMARY_TABLE = "models"
+
+_RUN_FIELDS = ["conversation_id", "created_at", "source_mtime", "run"]
+FIELDS = {
+    "experts": _RUN_FIELDS + [
+        "agent_id", "role_name", "llm_model", "model_used", "stage1_failed", "stage2_failed",
+        "stage4_fallback", "picked_winner", "points_to_winner"
+    ],
+    "solutions": _RUN_FIELDS + ["solution_id", "text_length", "rank", "total", "borda", "approvals", "mean_points"],
+    "stages": _RUN_FIELDS + ["stage", "latency_seconds"],
+    SUMMARY_TABLE: [
+        "llm_model", "experts", "win_rate", "mean_points_to_winner", "stage1_failure_rate",
+        "stage2_failure_rate", "stage4_fallback_rate", "substitution_rate"
+    ]
+}
+
+# Fallback markers written by the stage functions when a model call fails
+STAGE1_FAILED = "Response not available"
+STAGE2_FAILED = "Rebuttal not available"
+STAGE4_FALLBACK_PREFIX = "Fallback"
+
+def _parse_timestamp(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+def _split_runs(messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group a conversation's messages into deliberation runs.
+
+    A run starts at each user message and collects the timestamp and payload
+    of every stage stored after it: {"user": ts, "stage0": (ts, data), ...}
+    """
+    runs = []
+    current = None
+
+    for msg in messages:
+        if msg.get("role") == "user":
+            current = {"user": _parse_timestamp(msg.get("timestamp"))}
+            runs.append(current)
+            continue
+        if current is None:
+            continue
+        for stage in ("stage0", "stage1", "stage2", "stage3", "stage4"):
+            if stage in msg:
+                current[stage] = (_parse_timestamp(msg.get("timestamp")), msg[stage])
+
+    return runs
+
+Result = Tuple[str, float, Dict[str, List[Dict[str, Any]]]]
+
+def analyze_conversation(path: str) -> List[Result]:
+    """
+    Reduce one stored conversation file to analytics rows.
+
+    Runs inside a worker process, so it only takes the file path and does its
+    own parsing. Returns [(conversation_id, mtime, {table: rows})], or [] if
+    the file cannot be read.
+    """
+    try:
+        mtime = os.path.getmtime(path)
+        with open(path, "r") as f:
+            conversation = json.load(f)
+        return [conversation_rows(conversation, mtime)]
+    except (OSError, json.JSONDecodeError, KeyError):
+        return []
+
+def analyze_segment(path: str, conversation_ids: List[str]) -> List[Result]:
+    """Rows for the latest copy of each of `conversation_ids` in an archive segment (worker process)"""
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return []
+    return [
+        conversation_rows(conversation, mtime)
+        for conversation in iter_latest_in_segment(Path(path), set(conversation_ids))
+    ]
+
+def conversation_rows(conversation: Dict[str, Any], mtime: float) -> Result:
+    """(conversation_id, mtime, {table: rows}) for one parsed conversation"""
+    conversation_id = conversation["id"]
+    rows = {table: [] for table in TABLES}
+    base = {
+        "conversation_id": conversation_id,
+        "created_at": conversation.get("created_at", ""),
+        "source_mtime": mtime
+    }
+
+    for run_index, run in enumerate(_split_runs(conversation.get("messages", []))):
+        run_base = {**base, "run": run_index}
+
+        # Stage latencies from consecutive storage timestamps. Stage 1 has no
+        # stored start time (the role_update request is not persisted).
+        previous = run.get("user")
+        for stage in ("stage0", "stage1", "stage2", "stage3", "stage4"):
+            if stage not in run:
+                continue
+            ts = run[stage][0]
+            latency = None
+            if stage != "stage1" and ts and previous:
+                latency = (ts - previous).total_seconds()
+            rows["stages"].append({**run_base, "stage": stage, "latency_seconds": latency})
+            previous = ts
+
+        stage0 = run.get("stage0", (None, {}))[1] or {}
+        stage1 = run.get("stage1", (None, {}))[1] or {}
+        stage2 = run.get("stage2", (None, {}))[1] or {}
+        stage3 = run.get("stage3", (None, {}))[1] or {}
+        stage4 = run.get("stage4", (None, {}))[1] or {}
+
+        if not stage1:
+            continue
+
+        rankings = aggregate_rankings(stage4, stage3.get("proposed_solutions") or None) if stage4 else []
+        winner_id = str(rankings[0]["id"]) if rankings else None
+
+        for rank, entry in enumerate(rankings, 1):
+            rows["solutions"].append({
+                **run_base,
+                "solution_id": str(entry["id"]),
+                "text_length": len(entry.get("text", "")),
+                "rank": rank,
+                "total": entry["total"],
+                "borda": entry["borda"],
+                "approvals": entry["approvals"],
+                "mean_points": entry["mean"]
+            })
+
+        # Runs stored before Stage 1 entries carried llm_model: fall back to the Stage 0 proposal
+        proposed_models = {
+            agent.get("agent_id"): agent.get("llm_model", "")
+            for agent in stage0.get("proposed_agents", [])
+            if isinstance(agent, dict)
+        }
+
+        for agent_id, response in stage1.items():
+            scoring = stage4.get(agent_id, {})
+            scores = [s for s in scoring.get("scores", []) if isinstance(s, dict)]
+            top = max(scores, key=lambda s: s.get("points", 0), default=None)
+
+            rows["experts"].append({
+                **run_base,
+                "agent_id": agent_id,
+                "role_name": response.get("role_name", ""),
+                "llm_model": response.get("llm_model") or proposed_models.get(agent_id, ""),
+                # The failover model that actually answered, if any
+                "model_used": (response.get("model_substitution") or {}).get("used") or response.get("llm_model") or proposed_models.get(agent_id, ""),
+                "stage1_failed": response.get("initial_recommendation") == STAGE1_FAILED,
+                "stage2_failed": stage2.get(agent_id, {}).get("final_stance") == STAGE2_FAILED,
+                "stage4_fallback": str(scoring.get("reasoning", "")).startswith(STAGE4_FALLBACK_PREFIX),
+                "picked_winner": bool(top and winner_id is not None and str(top.get("id")) == winner_id),
+                "points_to_winner": next(
+                    (s.get("points", 0) for s in scores if str(s.get("id")) == winner_id), 0
+                )
+            })
+
+    return conversation_id, mtime, rows
+
+def _empty_manifest() -> Dict[str, Dict[str, float]]:
+    # conversations: id -> source_mtime of its current rows; segments: name -> mtime
+    return {"conversations": {}, "segments": {}}
+
+def _load_manifest(out_dir: Path) -> Dict[str, Dict[str, float]]:
+    path = out_dir / MANIFEST_NAME
+    if not path.exists():
+        return _empty_manifest()
+    try:
+        with open(path, "r") as f:
+            manifest = json.load(f)
+    except (json.JSONDecodeError, IOError):
+        return _empty_manifest()
+    if "conversations" not in manifest:
+        # Manifests before archive support were a flat {id: mtime}
+        manifest = {"conversations": manifest, "segments": {}}
+    return manifest
+
+def _save_manifest(out_dir: Path, manifest: Dict[str, Dict[str, float]]) -> None:
+    tmp = out_dir / f"{MANIFEST_NAME}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    tmp.replace(out_dir / MANIFEST_NAME)
+
+def _pending_sources(
+    storage: Storage,
+    manifest: Dict[str, Dict[str, float]],
+    seen: set,
+    stats: Dict[str, int]
+) -> Iterator[Tuple[Any, ...]]:
+    """
+    Yield (segment, segment mtime, analyze function, *args) for every
+    working-set file (segment None) and archive segment that is new or
+    changed since the manifest, and add every stored conversation id to
+    `seen`. A working-set copy supersedes an archived one.
+    """
+    working = set()
+    for conversation_id, path in storage.iter_conversation_files():
+        working.add(conversation_id)
+        seen.add(conversation_id)
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            continue
+        if manifest["conversations"].get(conversation_id) == mtime:
+            stats["skipped"] += 1
+            continue
+        yield None, None, analyze_conversation, str(path)
+
+    for segment, conversation_ids in sorted(storage.archive_segments().items()):
+        archived = conversation_ids - working
+        seen.update(archived)
+        path = storage.archive_dir / segment
+        try:
+            mtime = path.stat().st_mtime
+        except OSError:
+            continue
+        if manifest["segments"].get(segment) == mtime:
+            stats["skipped"] += len(archived)
+            continue
+        if archived:
+            yield segment, mtime, analyze_segment, str(path), sorted(archived)
+        else:
+            manifest["segments"][segment] = mtime
+
+class TableWriter:
+    """Append-only columnar output: one CSV per table, or Parquet part files"""
+
+    def __init__(self, out_dir: Path, fmt: str = "csv", batch_size: int = 5000):
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.batch_size = batch_size
+        self.buffers = {table: [] for table in TABLES}
+        self.run_stamp = datetime.now().strftime("%Y%m%dT%H%M%S")
+        self.part = 0
+
+        if fmt == "parquet":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise SystemExit("Parquet output requires pyarrow (pip install pyarrow), or use --format csv")
+
+    def add(self, rows: Dict[str, List[Dict[str, Any]]]) -> None:
+        for table, table_rows in rows.items():
+            self.buffers[table].extend(table_rows)
+        if any(len(buffer) >= self.batch_size for buffer in self.buffers.values()):
+            self.flush()
+
+    def flush(self) -> None:
+        for table, buffer in self.buffers.items():
+            if not buffer:
+                continue
+            if self.fmt == "parquet":
+                self._write_parquet(table, buffer)
+            else:
+                self._write_csv(table, buffer)
+            self.buffers[table] = []
+        self.part += 1
+
+    def _write_csv(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        path = self.out_dir / f"{table}.csv"
+        if path.exists() and _csv_header(path) != FIELDS[table]:
+            # Written with an older column list: rewrite it with the current one
+            _rewrite_csv(path, FIELDS[table], lambda row: True)
+        new_file = not path.exists()
+        with open(path, "a", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS[table])
+            if new_file:
+                writer.writeheader()
+            writer.writerows(rows)
+
+    def _write_parquet(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        import pyarrow.parquet as pq
+
+        table_dir = self.out_dir / table
+        table_dir.mkdir(parents=True, exist_ok=True)
+        pq.write_table(
+            _arrow_table(table, rows),
+            table_dir / f"part-{self.run_stamp}-{self.part:05d}.parquet"
+        )
+
+def _arrow_table(table: str, rows: List[Dict[str, Any]]):
+    import pyarrow as pa
+
+    return pa.Table.from_pylist([{field: row.get(field) for field in FIELDS[table]} for row in rows])
+
+def _csv_header(path: Path) -> List[str]:
+    with open(path, "r", newline="") as f:
+        return next(csv.reader(f), [])
+
+def _rewrite_csv(path: Path, fields: List[str], keep) -> int:
+    """Stream `path` through a temporary file with `fields` as columns, keeping rows where keep(row); returns rows dropped"""
+    dropped = 0
+    tmp = path.with_name(path.name + ".tmp")
+    with open(path, "r", newline="") as src, open(tmp, "w", newline="") as out:
+        writer = csv.DictWriter(out, fieldnames=fields, extrasaction="ignore")
+        writer.writeheader()
+        for row in csv.DictReader(src):
+            if keep(row):
+                writer.writerow(row)
+            else:
+                dropped += 1
+    tmp.replace(path)
+    return dropped
+
+def _is_current(current: Dict[str, float], row: Dict[str, Any]) -> bool:
+    """Whether a row holds its conversation's latest processed version"""
+    mtime = current.get(row.get("conversation_id"))
+    try:
+        return mtime is not None and float(row.get("source_mtime")) == mtime
+    except (TypeError, ValueError):
+        return False
+
+def compact(out_dir: Path, current: Dict[str, float]) -> int:
+    """Drop rows of conversations that were reprocessed, archived or deleted since; returns rows dropped"""
+    dropped = 0
+    for table in TABLES:
+        path = out_dir / f"{table}.csv"
+        if path.exists():
+            dropped += _rewrite_csv(path, FIELDS[table], lambda row: _is_current(current, row))
+        parts = sorted((out_dir / table).glob("*.parquet"))
+        if parts:
+            import pyarrow.parquet as pq
+
+            for part in parts:
+                rows = pq.read_table(part).to_pylist()
+                kept = [row for row in rows if _is_current(current, row)]
+                if len(kept) == len(rows):
+                    continue
+                dropped += len(rows) - len(kept)
+                if kept:
+                    pq.write_table(_arrow_table(table, kept), part)
+                else:
+                    part.unlink()
+    return dropped
+
+def _iter_table(out_dir: Path, table: str) -> Iterator[Dict[str, Any]]:
+    path = out_dir / f"{table}.csv"
+    if path.exists():
+        with open(path, "r", newline="") as f:
+            yield from csv.DictReader(f)
+    parts = sorted((out_dir / table).glob("*.parquet"))
+    if parts:
+        import pyarrow.parquet as pq
+
+        for part in parts:
+            for batch in pq.ParquetFile(part).iter_batches():
+                yield from batch.to_pylist()
+
+def _flag(value: Any) -> bool:
+    # CSV cells come back as "True"/"False"
+    return value is True or value == "True"
+
+def model_summary(out_dir: Path) -> List[Dict[str, Any]]:
+    """
+    Per requested model, over every expert row: win rate (the expert's top
+    pick was the consensus winner), mean points given to the winner, and
+    Stage 1 failure, Stage 2 failure, Stage 4 fallback and failover rates.
+    """
+    totals: Dict[str, Dict[str, float]] = {}
+    for row in _iter_table(out_dir, "experts"):
+        model = row.get("llm_model") or "unknown"
+        entry = totals.setdefault(model, {
+            "experts": 0, "wins": 0, "points": 0.0, "stage1": 0, "stage2": 0, "stage4": 0, "substituted": 0
+        })
+        entry["experts"] += 1
+        entry["wins"] += _flag(row.get("picked_winner"))
+        entry["points"] += float(row.get("points_to_winner") or 0)
+        entry["stage1"] += _flag(row.get("stage1_failed"))
+        entry["stage2"] += _flag(row.get("stage2_failed"))
+        entry["stage4"] += _flag(row.get("stage4_fallback"))
+        entry["substituted"] += bool(row.get("model_used")) and row.get("model_used") != row.get("llm_model")
+
+    return [
+        {
+            "llm_model": model,
+            "experts": entry["experts"],
+            "win_rate": round(entry["wins"] / entry["experts"], 4),
+            "mean_points_to_winner": round(entry["points"] / entry["experts"], 3),
+            "stage1_failure_rate": round(entry["stage1"] / entry["experts"], 4),
+            "stage2_failure_rate": round(entry["stage2"] / entry["experts"], 4),
+            "stage4_fallback_rate": round(entry["stage4"] / entry["experts"], 4),
+            "substitution_rate": round(entry["substituted"] / entry["experts"], 4)
+        }
+        for model, entry in sorted(totals.items(), key=lambda item: -item[1]["experts"])
+    ]
+
+def _write_summary(out_dir: Path, fmt: str, summary: List[Dict[str, Any]]) -> None:
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+
+        pq.write_table(_arrow_table(SUMMARY_TABLE, summary), out_dir / f"{SUMMARY_TABLE}.parquet")
+        return
+    with open(out_dir / f"{SUMMARY_TABLE}.csv", "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS[SUMMARY_TABLE])
+        writer.writeheader()
+        writer.writerows(summary)
+
+def run_analytics(
+    data_dir: str,
+    out_dir: str,
+    fmt: str = "csv",
+    workers: Optional[int] = None,
+    incremental: bool = True,
+    max_in_flight: int = 256,
+    archive_dir: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Process every new or changed conversation and append its rows to `out_dir`,
+    compact away superseded rows and rewrite the per-model summary.
+
+    At most `max_in_flight` files or segments are queued in the pool at once,
+    so memory stays flat regardless of archive size.
+
+    Returns: {"processed", "skipped", "failed", "compacted", "models": summary rows}
+    """
+    storage = Storage(data_dir, archive_dir)
+    out_path = Path(out_dir)
+    out_path.mkdir(parents=True, exist_ok=True)
+
+    if not incremental:
+        for table in TABLES:
+            (out_path / f"{table}.csv").unlink(missing_ok=True)
+            for part in (out_path / table).glob("*.parquet"):
+                part.unlink()
+        manifest = _empty_manifest()
+    else:
+        manifest = _load_manifest(out_path)
+
+    previous = dict(manifest["conversations"])
+    writer = TableWriter(out_path, fmt)
+    stats: Dict[str, Any] = {"processed": 0, "skipped": 0, "failed": 0, "compacted": 0}
+    seen: set = set()
+
+    def collect(item: Tuple[Optional[str], Optional[float], Future]) -> None:
+        segment, segment_mtime, future = item
+        results = future.result()
+        if not results:
+            stats["failed"] += 1
+            return
+        if segment:
+            manifest["segments"][segment] = segment_mtime
+        for conversation_id, mtime, rows in results:
+            writer.add(rows)
+            manifest["conversations"][conversation_id] = mtime
+            stats["processed"] += 1
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = deque()
+        for segment, segment_mtime, fn, *args in _pending_sources(storage, manifest, seen, stats):
+            in_flight.append((segment, segment_mtime, pool.submit(fn, *args)))
+            if len(in_flight) >= max_in_flight:
+                collect(in_flight.popleft())
+        while in_flight:
+            collect(in_flight.popleft())
+
+    writer.flush()
+    current = {cid: mtime for cid, mtime in manifest["conversations"].items() if cid in seen}
+    stale = any(previous.get(cid, mtime) != mtime for cid, mtime in current.items()) or set(previous) - seen
+    if stale:
+        stats["compacted"] = compact(out_path, current)
+    manifest["conversations"] = current
+    manifest["segments"] = {
+        segment: mtime for segment, mtime in manifest["segments"].items()
+        if (storage.archive_dir / segment).exists()
+    }
+    _save_manifest(out_path, manifest)
+
+    stats["models"] = model_summary(out_path)
+    _write_summary(out_path, fmt, stats["models"])
+    return stats
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="RoundWise archive analytics")
+    parser.add_argument("--data-dir", default="backend/data/conversations", help="Conversation store directory")
+    parser.add_argument("--archive-dir", default=None, help="Archive directory (default: <data-dir>/../archive)")
+    parser.add_argument("--out", default="backend/data/analytics", help="Output directory for tables and manifest")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv", help="Columnar output format")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--full", action="store_true", help="Ignore the manifest and reprocess everything")
+    args = parser.parse_args(argv)
+
+    stats = run_analytics(
+        args.data_dir,
+        args.out,
+        fmt=args.format,
+        workers=args.workers,
+        incremental=not args.full,
+        archive_dir=args.archive_dir
+    )
+    print(
+        f"Processed {stats['processed']}, skipped {stats['skipped']} unchanged, failed {stats['failed']}, "
+        f"dropped {stats['compacted']} superseded rows"
+    )
+    print(f"\n{'model':<40} {'experts':>8} {'win':>6} {'s1 fail':>8} {'s2 fail':>8} {'s4 fb':>6} {'subst':>6}")
+    for row in stats["models"]:
+        print(
+            f"{row['llm_model']:<40} {row['experts']:>8} {row['win_rate']:>6.1%} {row['stage1_failure_rate']:>8.1%} "
+            f"{row['stage2_failure_rate']:>8.1%} {row['stage4_fallback_rate']:>6.1%} {row['substitution_rate']:>6.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
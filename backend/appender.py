@@ -0,0 +1,68 @@
+"""
+JSONL appends off the calling thread.
+
+Trace spans and cassette entries are produced on the event loop; writing them
+there would block it on disk I/O (and show up as the very stalls tracing
+measures). get_appender() returns a process-wide writer whose single daemon
+thread serializes queued records and appends them, batching whatever has
+queued up for the same file. flush() waits for the queue to drain; it also
+runs at interpreter exit so the last records are not lost.
+"""
+import atexit
+import json
+import queue
+import threading
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Tuple
+
+class JsonlAppender:
+    """Appends JSON records as lines to files from one background thread"""
+
+    def __init__(self):
+        self._queue: "queue.Queue[Tuple[Path, List[Dict[str, Any]]]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def append(self, path: Path, records: List[Dict[str, Any]]) -> None:
+        """Queue records for `path`; returns immediately"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="jsonl-appender", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        self._queue.put((Path(path), records))
+
+    def flush(self) -> None:
+        """Block until every queued record has been written"""
+        if self._thread is not None:
+            self._queue.join()
+
+    def _run(self) -> None:
+        while True:
+            batches = [self._queue.get()]
+            while True:
+                try:
+                    batches.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            by_path: Dict[Path, List[Dict[str, Any]]] = {}
+            for path, records in batches:
+                by_path.setdefault(path, []).extend(records)
+            for path, records in by_path.items():
+                self._write(path, records)
+            for _ in batches:
+                self._queue.task_done()
+
+    def _write(self, path: Path, records: List[Dict[str, Any]]) -> None:
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with open(path, "a") as f:
+                f.write("".join(json.dumps(record, default=str) + "\n" for record in records))
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Append to {path} failed: {e}")
+
+@lru_cache(maxsize=1)
+def get_appender() -> JsonlAppender:
+    """Writer shared by tracing and cassettes, started on first append"""
+    return JsonlAppender()
@@ -0,0 +1,130 @@
+import json
+import math
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Deque, Tuple
+from .config import get_settings
+
+# Used when a stage or setting is missing from the `llm` section of config.yaml
+DEFAULT_STAGE_PARAMS = {
+    "temperature": 0.7,
+    "max_tokens": 2000,
+    "timeout": 60
+}
+
+DEFAULT_BUDGET = {
+    "enabled": True,
+    "window": 50,
+    "min_samples": 5,
+    "percentile": 95,
+    "headroom": 1.3,
+    "min_tokens": 256
+}
+
+# Rough characters-per-token ratio when the provider omits usage
+CHARS_PER_TOKEN = 4
+
+def _restore_closing_brace(content: str) -> str:
+    """Append the "\\n}" consumed by the stop sequence if that makes the JSON object complete"""
+    start = content.find("{")
+    if start < 0:
+        return content
+    for candidate in (content, content + "\n}"):
+        try:
+            json.loads(candidate[start:])
+            return candidate
+        except ValueError:
+            continue
+    return content
+
+class TokenBudget:
+    """
+    Per-stage generation limits that adapt to how long each model actually answers.
+
+    Static limits come from the `llm` section of config.yaml. Once a (stage, model)
+    pair has `min_samples` recorded completions, max_tokens is tightened to the
+    chosen percentile of recent completion lengths times `headroom`, never above
+    the configured stage limit. Any truncated completion (finish_reason "length")
+    in the window restores the configured limit.
+    """
+
+    def __init__(self, llm_config: Optional[Dict[str, Any]] = None):
+        self.llm_config = llm_config if llm_config is not None else get_settings().llm
+        self.settings = {**DEFAULT_BUDGET, **self.llm_config.get("budget", {})}
+        self.history: Dict[Tuple[str, str], Deque[Tuple[int, bool]]] = {}
+
+    def stage_config(self, stage: str) -> Dict[str, Any]:
+        """Static parameters for a stage from config.yaml"""
+        return {**DEFAULT_STAGE_PARAMS, **self.llm_config.get(stage, {})}
+
+    def learned_max_tokens(self, stage: str, model: str) -> Optional[int]:
+        """Adaptive max_tokens for (stage, model), or None if not enough history"""
+        samples = self.history.get((stage, model))
+        if not samples or len(samples) < self.settings["min_samples"]:
+            return None
+        if any(truncated for _, truncated in samples):
+            return None
+
+        lengths = sorted(tokens for tokens, _ in samples)
+        index = min(len(lengths) - 1, math.ceil(self.settings["percentile"] / 100 * len(lengths)) - 1)
+        return max(self.settings["min_tokens"], int(lengths[max(index, 0)] * self.settings["headroom"]))
+
+    def params(self, stage: str, model: str) -> Dict[str, Any]:
+        """
+        Keyword arguments for LLMClient.query_model for one call.
+
+        Returns: {"temperature": float, "max_tokens": int, "timeout": int, "stop": [str] | None, "stage": str}
+        """
+        cfg = self.stage_config(stage)
+        max_tokens = cfg["max_tokens"]
+
+        if self.settings["enabled"]:
+            learned = self.learned_max_tokens(stage, model)
+            if learned is not None:
+                max_tokens = min(max_tokens, learned)
+
+        return {
+            "temperature": cfg["temperature"],
+            "max_tokens": max_tokens,
+            "timeout": cfg["timeout"],
+            "stop": cfg.get("stop") or None,
+            # Lets the router keep latency stats per stage
+            "stage": stage
+        }
+
+    def record(self, stage: str, model: str, response: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Record a completion's length and repair output cut by a stop sequence.
+
+        Stop sequences are not included in the returned text, so a response
+        stopped on a "\\n}" stop sequence gets the brace appended back unless
+        it already parses as JSON. The content may end with a nested object's
+        brace, so whether it ends with "}" says nothing.
+        Returns the (possibly repaired) response.
+        """
+        if not response:
+            return response
+
+        content = response.get("content") or ""
+        finish_reason = response.get("finish_reason")
+        stop = self.stage_config(stage).get("stop") or []
+
+        if finish_reason == "stop" and "\n}" in stop:
+            content = _restore_closing_brace(content)
+            response["content"] = content
+
+        tokens = (response.get("usage") or {}).get("completion_tokens")
+        if not tokens:
+            tokens = max(1, len(content) // CHARS_PER_TOKEN)
+
+        # Learn on the model that actually answered (it may be a failover substitute)
+        model = response.get("model") or model
+        samples = self.history.setdefault((stage, model), deque(maxlen=self.settings["window"]))
+        samples.append((int(tokens), finish_reason == "length"))
+
+        return response
+
+@lru_cache(maxsize=1)
+def get_budget() -> TokenBudget:
+    """Budget shared across requests so every stage call learns from the previous ones"""
+    return TokenBudget()
@@ -0,0 +1,178 @@
+"""
+Record/replay cassettes of upstream LLM traffic.
+
+In record mode every upstream request made by LLMClient is appended to a
+JSONL cassette with its parameters, response and latency (written by a
+background thread, see appender.py). In replay mode the client never calls
+OpenRouter: responses are served from the cassette,
+after sleeping the recorded latency times `time_scale`, so a whole
+deliberation (or a load test against POST /message) can be reproduced with
+real response sizes and timings.
+
+Lookup is by request hash of the requested model, messages, temperature and
+stop sequences. The adaptive max_tokens and the model the circuit breakers
+actually routed to are left out, so a replay still matches when either
+differs from the recording. Without an exact match, `fuzzy` falls back to
+the recorded call for the same requested model whose prompt is most
+similar, if above `fuzzy_threshold`.
+
+Mode and path come from `llm.cassette` in config.yaml, or from the
+ROUNDWISE_CASSETTE_MODE / ROUNDWISE_CASSETTE environment variables:
+    ROUNDWISE_CASSETTE_MODE=record uvicorn backend.main:app
+    ROUNDWISE_CASSETTE_MODE=replay ROUNDWISE_CASSETTE=runs/a.jsonl uvicorn backend.main:app
+    python -m backend.cassette runs/a.jsonl      # cassette summary
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import time
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional
+from .appender import get_appender
+from .similarity import cosine_similarity
+from .singleflight import request_key
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+DEFAULT_CASSETTE = {
+    "mode": OFF,
+    "path": "backend/data/cassettes/default.jsonl",
+    "time_scale": 1.0,
+    "fuzzy": True,
+    "fuzzy_threshold": 0.5
+}
+
+def prompt_text(messages: List[Dict[str, Any]]) -> str:
+    """Plain text of a chat request (multipart content flattened), for fuzzy matching"""
+    parts = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        parts.append(str(content or ""))
+    return "\n".join(parts)
+
+def cassette_key(model: str, messages: List[Dict[str, Any]], temperature: float, stop: Optional[List[str]]) -> str:
+    """Replay key of a request for `model` (the requested one, not the routed target)"""
+    return request_key(model, messages, temperature, stop)
+
+class Cassette:
+    """One cassette file, either being recorded or replayed"""
+
+    def __init__(self, cassette_config: Optional[Dict[str, Any]] = None):
+        if cassette_config is None:
+            from .config import get_settings
+            cassette_config = get_settings().llm.get("cassette", {}) or {}
+        self.settings = {**DEFAULT_CASSETTE, **cassette_config}
+        self.settings["mode"] = os.getenv("ROUNDWISE_CASSETTE_MODE", self.settings["mode"])
+        self.settings["path"] = os.getenv("ROUNDWISE_CASSETTE", self.settings["path"])
+        self.mode = self.settings["mode"]
+        self.path = Path(self.settings["path"])
+        self._by_key: Dict[str, List[Dict[str, Any]]] = {}
+        self._by_model: Dict[str, List[Dict[str, Any]]] = {}
+        self._served: Dict[str, int] = {}
+        if self.mode == REPLAY:
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._by_key.setdefault(entry["key"], []).append(entry)
+                        self._by_model.setdefault(entry["model"], []).append(entry)
+        except FileNotFoundError:
+            print(f"Cassette {self.path} not found; every replayed call will fail")
+        print(f"Replaying {sum(len(v) for v in self._by_key.values())} recorded calls from {self.path}")
+
+    def record(
+        self,
+        key: str,
+        model: str,
+        messages: List[Dict[str, Any]],
+        params: Dict[str, Any],
+        result: Optional[Dict[str, Any]],
+        latency: float
+    ) -> None:
+        entry = {
+            "key": key,
+            "model": model,
+            "params": params,
+            "prompt": prompt_text(messages),
+            "latency": round(latency, 4),
+            # Copied: the caller keeps annotating the result before the write happens
+            "result": copy.deepcopy(result),
+            "recorded_at": datetime.now().isoformat()
+        }
+        # Appended from a background thread so recording never blocks the event loop
+        get_appender().append(self.path, [entry])
+
+    def _match(self, key: str, model: str, messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        entries = self._by_key.get(key)
+        if entries:
+            # Repeated identical calls are served in recorded order, then cycle
+            index = self._served.get(key, 0)
+            self._served[key] = index + 1
+            return entries[index % len(entries)]
+
+        if not self.settings["fuzzy"]:
+            return None
+        text = prompt_text(messages)
+        best, best_score = None, self.settings["fuzzy_threshold"]
+        for entry in self._by_model.get(model, []):
+            score = cosine_similarity(text, entry["prompt"])
+            if score >= best_score:
+                best, best_score = entry, score
+        return best
+
+    async def replay(self, key: str, model: str, messages: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Recorded response for this request after its scaled latency; None if nothing matches"""
+        entry = self._match(key, model, messages)
+        if entry is None:
+            print(f"No cassette entry for {model} request {key[:12]}")
+            return None
+        await asyncio.sleep(entry["latency"] * self.settings["time_scale"])
+        return dict(entry["result"]) if entry["result"] is not None else None
+
+@lru_cache(maxsize=1)
+def get_cassette() -> Cassette:
+    """Cassette for this process, configured on first use"""
+    return Cassette()
+
+def summarize(path: Path) -> Dict[str, Any]:
+    """Calls, failures and latency per model in a cassette file"""
+    models: Dict[str, Dict[str, Any]] = {}
+    with open(path, "r") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            stats = models.setdefault(entry["model"], {"calls": 0, "failed": 0, "latency_total": 0.0})
+            stats["calls"] += 1
+            stats["failed"] += entry["result"] is None
+            stats["latency_total"] += entry["latency"]
+    return {
+        model: {
+            "calls": stats["calls"],
+            "failed": stats["failed"],
+            "avg_latency": round(stats["latency_total"] / stats["calls"], 3)
+        }
+        for model, stats in models.items()
+    }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Summarize a recorded LLM cassette")
+    parser.add_argument("path", nargs="?", default=DEFAULT_CASSETTE["path"])
+    args = parser.parse_args(argv)
+    for model, stats in summarize(Path(args.path)).items():
+        print(f"{model:<40} {stats['calls']:>5} calls  {stats['failed']:>3} failed  avg {stats['avg_latency']:.2f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Deque, Tuple
+from .config import get_settings
+
+DEFAULT_BREAKER = {
+    "enabled": True,
+    "window_seconds": 120,
+    "min_calls": 4,
+    "error_rate_threshold": 0.5,
+    "slow_call_seconds": 30,
+    "cooldown_seconds": 30
+}
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Sliding-window circuit breaker for a single model route.
+
+    A call counts as failed if it errored or took longer than `slow_call_seconds`.
+    Once the window holds at least `min_calls` calls and the failure rate reaches
+    `error_rate_threshold`, the breaker opens for `cooldown_seconds`. After the
+    cooldown one probe call is let through (half-open); its outcome closes or
+    re-opens the breaker.
+    """
+
+    def __init__(self, settings: Dict[str, Any]):
+        self.settings = settings
+        self.calls: Deque[Tuple[float, bool, float]] = deque()
+        self.state = CLOSED
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.settings["window_seconds"]
+        while self.calls and self.calls[0][0] < horizon:
+            self.calls.popleft()
+
+    def allow(self) -> bool:
+        """Whether a call may be sent to this model right now"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and time.monotonic() - self.opened_at >= self.settings["cooldown_seconds"]:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record(self, ok: bool, latency: float) -> None:
+        """Record the outcome of a call routed to this model"""
+        now = time.monotonic()
+        failed = not ok or latency > self.settings["slow_call_seconds"]
+
+        if self.state == HALF_OPEN:
+            self.probe_in_flight = False
+            if failed:
+                self._open(now)
+            else:
+                self.state = CLOSED
+                self.calls.clear()
+            return
+
+        self.calls.append((now, failed, latency))
+        self._trim(now)
+
+        if len(self.calls) >= self.settings["min_calls"] and self.error_rate() >= self.settings["error_rate_threshold"]:
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = OPEN
+        self.opened_at = now
+        self.calls.clear()
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, failed, _ in self.calls if failed) / len(self.calls)
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._trim(time.monotonic())
+        latencies = [latency for _, _, latency in self.calls]
+        return {
+            "state": self.state,
+            "calls": len(self.calls),
+            "error_rate": round(self.error_rate(), 3),
+            "avg_latency": round(sum(latencies) / len(latencies), 3) if latencies else None
+        }
+
+class BreakerRegistry:
+    """Circuit breakers for every model plus the failover routing between them"""
+
+    def __init__(
+        self,
+        resilience_config: Optional[Dict[str, Any]] = None,
+        available_models: Optional[List[str]] = None
+    ):
+        if resilience_config is None:
+            resilience_config = get_settings().resilience
+        if available_models is None:
+            available_models = get_settings().available_model_ids
+        self.settings = {**DEFAULT_BREAKER, **resilience_config.get("circuit_breaker", {})}
+        self.substitutes: Dict[str, List[str]] = resilience_config.get("substitutes", {}) or {}
+        self.available_models = list(available_models)
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, model: str) -> CircuitBreaker:
+        if model not in self.breakers:
+            self.breakers[model] = CircuitBreaker(self.settings)
+        return self.breakers[model]
+
+    def candidates(self, model: str) -> List[str]:
+        """Substitutes for `model`: configured ones first, then `models.available`"""
+        ordered = list(self.substitutes.get(model, [])) + self.available_models
+        seen = {model}
+        result = []
+        for candidate in ordered:
+            if candidate not in seen:
+                seen.add(candidate)
+                result.append(candidate)
+        return result
+
+    def route(self, model: str) -> str:
+        """
+        Pick the model to actually call for `model`.
+
+        Returns `model` itself while its breaker admits calls, otherwise the first
+        substitute whose breaker does. If every route is open the original model
+        is returned so the call still fails (or recovers) on its own.
+        """
+        if not self.settings["enabled"] or self.get(model).allow():
+            return model
+        for candidate in self.candidates(model):
+            if self.get(candidate).allow():
+                return candidate
+        return model
+
+    def record(self, model: str, ok: bool, latency: float) -> None:
+        if self.settings["enabled"]:
+            self.get(model).record(ok, latency)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {model: breaker.snapshot() for model, breaker in self.breakers.items()}
+
+@lru_cache(maxsize=1)
+def get_breakers() -> BreakerRegistry:
+    """Registry shared by every LLMClient instance, constructed on first use"""
+    return BreakerRegistry()
@@ -0,0 +1,108 @@
+"""
+Response compression: brotli when the client accepts it and the optional
+`brotli` package is installed, gzip otherwise (Starlette's GZipMiddleware).
+
+Single-body responses are compressed in one go; streaming responses are
+compressed chunk by chunk and flushed, so NDJSON streams keep flowing.
+Responses that are small, already encoded or not compressible by type are
+passed through unchanged.
+"""
+from typing import Any, Dict
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.middleware.gzip import GZipMiddleware
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+def _accepts(headers: Headers, encoding: str) -> bool:
+    return any(
+        part.split(";")[0].strip() == encoding and not part.replace(" ", "").endswith("q=0")
+        for part in headers.get("accept-encoding", "").split(",")
+    )
+
+class CompressionMiddleware:
+    def __init__(self, app: Any, minimum_size: int = 1024, brotli_quality: int = 5, gzip_level: int = 6):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.brotli_quality = brotli_quality
+        self.gzip = GZipMiddleware(app, minimum_size=minimum_size, compresslevel=gzip_level)
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] == "http":
+            headers = Headers(scope=scope)
+            if brotli is not None and _accepts(headers, "br"):
+                await BrotliResponder(self.app, self.minimum_size, self.brotli_quality)(scope, receive, send)
+                return
+            await self.gzip(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
+
+class BrotliResponder:
+    """Wraps `send` to brotli-compress one response"""
+
+    def __init__(self, app: Any, minimum_size: int, quality: int):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.quality = quality
+        self.send: Any = None
+        self.start_message: Dict[str, Any] = {}
+        self.passthrough = False
+        self.started = False
+        self.compressor: Any = None
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    async def send_compressed(self, message: Dict[str, Any]) -> None:
+        if message["type"] == "http.response.start":
+            # Held back until the first body chunk shows whether to compress
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            self.passthrough = (
+                "content-encoding" in headers
+                or not any(content_type.startswith(t) for t in COMPRESSIBLE_TYPES)
+            )
+            return
+
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if not self.started:
+            self.started = True
+            if self.passthrough or (not more_body and len(body) < self.minimum_size):
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = "br"
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                body = brotli.compress(body, quality=self.quality)
+                headers["Content-Length"] = str(len(body))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": body})
+                return
+
+            del headers["Content-Length"]
+            self.compressor = brotli.Compressor(quality=self.quality)
+            await self.send(self.start_message)
+
+        if self.passthrough:
+            await self.send(message)
+            return
+
+        chunk = self.compressor.process(body) + (self.compressor.flush() if more_body else self.compressor.finish())
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -1,38 +1,155 @@
+"""
+Lazily loaded, cached and validated settings.
+
+Nothing is read at import time: `.env` and `config.yaml` are parsed on the first
+call to `get_settings()` and cached for the life of the process. The old module
+constants (GATEKEEPER_MODEL, LLM_CONFIG, config, ...) are still importable and
+resolve through the same cache.
+"""
 import os
-import yaml
+from dataclasses import dataclass, field
+from functools import lru_cache
 from pathlib import Path
-from dotenv import load_dotenv
+from typing import Dict, List, Any, Optional
+
+CONFIG_PATH = Path(__file__).parent / "config.yaml"
+
+class ConfigError(ValueError):
+    """Raised when config.yaml is missing a required setting or has the wrong type"""
+
+@dataclass(frozen=True)
+class Settings:
+    # API Configuration (from .env)
+    openrouter_api_key: Optional[str]
+    openai_api_key: Optional[str]
+    gemini_api_key: Optional[str]
+    # Enables admin endpoints (profiling) when set
+    admin_token: Optional[str]
+
+    # Model Configuration (from config.yaml)
+    gatekeeper_model: str
+    notary_model: str
+    default_expert_model: str
+    available_models: List[Dict[str, str]]
+
+    # Server Configuration (from config.yaml, override with .env if present)
+    backend_port: int
+    backend_host: str
+    frontend_url: str
+    cors_allowed_origins: List[str]
+
+    # Sections passed through as dicts
+    llm: Dict[str, Any] = field(default_factory=dict)
+    resilience: Dict[str, Any] = field(default_factory=dict)
+    storage: Dict[str, Any] = field(default_factory=dict)
+    features: Dict[str, Any] = field(default_factory=dict)
+    api: Dict[str, Any] = field(default_factory=dict)
+    deliberation: Dict[str, Any] = field(default_factory=dict)
+
+    # Raw config.yaml contents
+    raw: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def available_model_ids(self) -> List[str]:
+        return [model["value"] for model in self.available_models]
+
+def _require(section: Dict[str, Any], key: str, expected: type, path: str) -> Any:
+    if not isinstance(section, dict) or key not in section:
+        raise ConfigError(f"Missing setting '{path}' in {CONFIG_PATH.name}")
+    value = section[key]
+    if not isinstance(value, expected):
+        raise ConfigError(f"Setting '{path}' must be {expected.__name__}, got {type(value).__name__}")
+    return value
+
+def _validate_llm(llm: Dict[str, Any]) -> Dict[str, Any]:
+    for stage, params in llm.items():
+        if stage in ("budget", "prompt_cache", "cassette") or not isinstance(params, dict):
+            continue
+        for key, expected in (("temperature", (int, float)), ("max_tokens", int), ("timeout", (int, float))):
+            if key in params and not isinstance(params[key], expected):
+                raise ConfigError(f"Setting 'llm.{stage}.{key}' must be numeric")
+        if "max_tokens" in params and params["max_tokens"] <= 0:
+            raise ConfigError(f"Setting 'llm.{stage}.max_tokens' must be positive")
+        if "stop" in params and not isinstance(params["stop"], list):
+            raise ConfigError(f"Setting 'llm.{stage}.stop' must be a list")
+    return llm
+
+def load_settings(config_path: Path = CONFIG_PATH) -> Settings:
+    """Read .env and config.yaml and build validated Settings (uncached)"""
+    import yaml
+    from dotenv import load_dotenv
 
-load_dotenv()
+    load_dotenv()
 
-# Load YAML configuration
-config_path = Path(__file__).parent / "config.yaml"
-with open(config_path, "r") as f:
-    config = yaml.safe_load(f)
+    with open(config_path, "r") as f:
+        raw = yaml.safe_load(f) or {}
 
-# API Configuration (from .env)
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPEN_AI_KEY = os.getenv("OPENAI_API_KEY")
-GEMINI_KEY = os.getenv("GEMINI_API_KEY")
+    models = _require(raw, "models", dict, "models")
+    server = _require(raw, "server", dict, "server")
+    available = _require(models, "available", list, "models.available")
+    for i, model in enumerate(available):
+        _require(model, "value", str, f"models.available[{i}].value")
 
-# Model Configuration (from config.yaml)
-GATEKEEPER_MODEL = config["models"]["gatekeeper"]
-NOTARY_MODEL = config["models"]["notary"]
-DEFAULT_EXPERT_MODEL = config["models"]["expert_default"]
+    # Validated outside the try: ConfigError is a ValueError too
+    port = _require(server, "port", int, "server.port")
+    try:
+        backend_port = int(os.getenv("BACKEND_PORT", port))
+    except ValueError:
+        raise ConfigError("BACKEND_PORT must be an integer")
 
-# Server Configuration (from config.yaml, override with .env if present)
-BACKEND_PORT = int(os.getenv("BACKEND_PORT", config["server"]["port"]))
-BACKEND_HOST = os.getenv("BACKEND_HOST", config["server"]["host"])
-FRONTEND_URL = os.getenv("FRONTEND_URL", config["frontend"]["url"])
+    return Settings(
+        openrouter_api_key=os.getenv("OPENROUTER_API_KEY"),
+        openai_api_key=os.getenv("OPENAI_API_KEY"),
+        gemini_api_key=os.getenv("GEMINI_API_KEY"),
+        admin_token=os.getenv("ADMIN_TOKEN") or None,
+        gatekeeper_model=_require(models, "gatekeeper", str, "models.gatekeeper"),
+        notary_model=_require(models, "notary", str, "models.notary"),
+        default_expert_model=_require(models, "expert_default", str, "models.expert_default"),
+        available_models=available,
+        backend_port=backend_port,
+        backend_host=os.getenv("BACKEND_HOST", _require(server, "host", str, "server.host")),
+        frontend_url=os.getenv("FRONTEND_URL", _require(raw.get("frontend", {}), "url", str, "frontend.url")),
+        cors_allowed_origins=_require(raw.get("api", {}), "cors_allowed_origins", list, "api.cors_allowed_origins"),
+        llm=_validate_llm(_require(raw, "llm", dict, "llm")),
+        resilience=raw.get("resilience", {}) or {},
+        storage=_require(raw, "storage", dict, "storage"),
+        features=raw.get("features", {}) or {},
+        api=raw.get("api", {}) or {},
+        deliberation=raw.get("deliberation", {}) or {},
+        raw=raw
+    )
 
-# LLM Parameters (from config.yaml)
-LLM_CONFIG = config["llm"]
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Settings for this process, parsed once on first use"""
+    return load_settings()
 
-# Storage Configuration (from config.yaml)
-STORAGE_CONFIG = config["storage"]
+def reload_settings() -> Settings:
+    """Drop the cached settings and parse .env and config.yaml again"""
+    get_settings.cache_clear()
+    return get_settings()
 
-# Feature Flags (from config.yaml)
-FEATURES = config["features"]
+# Legacy module constants -> Settings attributes, resolved on first access
+_LEGACY_NAMES = {
+    "config": "raw",
+    "OPENROUTER_API_KEY": "openrouter_api_key",
+    "OPEN_AI_KEY": "openai_api_key",
+    "GEMINI_KEY": "gemini_api_key",
+    "GATEKEEPER_MODEL": "gatekeeper_model",
+    "NOTARY_MODEL": "notary_model",
+    "DEFAULT_EXPERT_MODEL": "default_expert_model",
+    "AVAILABLE_MODELS": "available_model_ids",
+    "BACKEND_PORT": "backend_port",
+    "BACKEND_HOST": "backend_host",
+    "FRONTEND_URL": "frontend_url",
+    "LLM_CONFIG": "llm",
+    "RESILIENCE_CONFIG": "resilience",
+    "STORAGE_CONFIG": "storage",
+    "FEATURES": "features",
+    "CORS_ALLOWED_ORIGINS": "cors_allowed_origins",
+}
 
-# CORS Configuration (from config.yaml)
-CORS_ALLOWED_ORIGINS = config["api"]["cors_allowed_origins"]
+def __getattr__(name: str) -> Any:
+    if name in _LEGACY_NAMES:
+        return getattr(get_settings(), _LEGACY_NAMES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,83 @@
+"""
+Local deduplication of the Notary's proposed solutions before Stage 4.
+
+Solutions are embedded as term vectors (words plus word bigrams, see
+similarity.py) and compared all-pairs with one matrix product. Each solution
+joins the first earlier cluster whose representative is at least
+`threshold` similar; otherwise it starts a new one. The representative keeps
+its original id, so Stage 4 scores and aggregate rankings map straight back
+to the Notary's list, and `merged_ids` records what it absorbed.
+"""
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from .similarity import term_vector
+
+def similarity_matrix(texts: List[str]) -> np.ndarray:
+    """(n, n) cosine similarities of the texts' term vectors"""
+    vectors = [term_vector(text) for text in texts]
+    vocabulary: Dict[str, int] = {}
+    for vector in vectors:
+        for term in vector:
+            vocabulary.setdefault(term, len(vocabulary))
+
+    matrix = np.zeros((len(texts), len(vocabulary)))
+    for i, vector in enumerate(vectors):
+        for term, count in vector.items():
+            matrix[i, vocabulary[term]] = count
+
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = np.divide(matrix, norms, out=np.zeros_like(matrix), where=norms > 0)
+    return matrix @ matrix.T
+
+def cluster(similarity: np.ndarray, threshold: float) -> List[List[int]]:
+    """Leader clustering in input order; returns member indices per cluster, leader first"""
+    clusters: List[List[int]] = []
+    leaders: List[int] = []
+    for i in range(similarity.shape[0]):
+        if leaders:
+            scores = similarity[i, leaders]
+            best = int(np.argmax(scores))
+            if scores[best] >= threshold:
+                clusters[best].append(i)
+                continue
+        leaders.append(i)
+        clusters.append([i])
+    return clusters
+
+def dedupe_solutions(
+    solutions: List[Dict[str, Any]],
+    threshold: float = 0.75,
+    max_solutions: Optional[int] = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Optional[str]]]:
+    """
+    Merge near-identical solutions and cap the list at `max_solutions`.
+
+    When capping, clusters backed by more near-duplicates win; ties keep
+    the Notary's order.
+
+    Returns: (solutions, id_map) where id_map is {original_id: kept_id, or
+    None if the solution was dropped by the cap}
+    """
+    if not solutions:
+        return [], {}
+
+    clusters = cluster(similarity_matrix([str(sol.get("text", "")) for sol in solutions]), threshold)
+    if max_solutions and len(clusters) > max_solutions:
+        kept = sorted(range(len(clusters)), key=lambda c: (-len(clusters[c]), c))[:max_solutions]
+        clusters = [clusters[c] for c in sorted(kept)]
+
+    id_map: Dict[str, Optional[str]] = {str(sol.get("id", "")): None for sol in solutions}
+    deduped = []
+    for members in clusters:
+        leader = solutions[members[0]]
+        kept_id = str(leader.get("id", ""))
+        entry = dict(leader)
+        merged = [str(solutions[m].get("id", "")) for m in members[1:]]
+        if merged:
+            entry["merged_ids"] = merged
+        deduped.append(entry)
+        for m in members:
+            id_map[str(solutions[m].get("id", ""))] = kept_id
+    return deduped, id_map
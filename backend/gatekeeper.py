@@ -1,8 +1,19 @@
 import json
 from typing import Dict, List, Any
-from .llm_client import LLMClient
-from .config import GATEKEEPER_MODEL
+from .llm_client import get_client, model_substitution
+from .config import get_settings
+from .budget import get_budget
+from .router import get_router
+from .tracing import traced
 
+def _with_substitution(result: Any, response: Dict[str, Any]) -> Any:
+    """Record on the Stage 0 output that a failover model answered instead"""
+    substitution = model_substitution(response)
+    if substitution and isinstance(result, dict):
+        result["model_substitution"] = substitution
+    return result
+
+@traced("to_gatekeeper")
 async def to_gatekeeper(problem: str) -> Dict[str, Any]:
     """
     Stage 0: Send problem to Gatekeeper to normalize and propose expert roles.
@@ -17,7 +28,9 @@ async def to_gatekeeper(problem: str) -> Dict[str, Any]:
         ]
     }
     """
-    client = LLMClient()
+    client = get_client()
+    budget = get_budget()
+    gatekeeper_model = get_router().choose("gatekeeper", get_settings().gatekeeper_model)
     
     system_prompt = """You are a Gatekeeper AI that normalizes problem statements and proposes expert roles for analysis.
 
@@ -54,14 +67,14 @@ Return ONLY valid JSON (no markdown, no extra text) with this structure:
     ]
     
     response = await client.query_model(
-        model=GATEKEEPER_MODEL,
+        model=gatekeeper_model,
         messages=[
             {"role": "system", "content": system_prompt},
             *messages
         ],
-        temperature=0.7,
-        max_tokens=1500
+        **budget.params("gatekeeper", gatekeeper_model)
     )
+    response = budget.record("gatekeeper", gatekeeper_model, response)
     
     if not response:
         # Fallback if Gatekeeper fails
@@ -72,13 +85,13 @@ Return ONLY valid JSON (no markdown, no extra text) with this structure:
                 {
                     "role_name": "Technical Expert",
                     "role_mission": "Analyze the technical feasibility and implementation aspects",
-                    "llm_model": GATEKEEPER_MODEL,
+                    "llm_model": gatekeeper_model,
                     "agent_id": "expert_1"
                 },
                 {
                     "role_name": "Business Strategist",
                     "role_mission": "Consider business impact, market fit, and strategic implications",
-                    "llm_model": GATEKEEPER_MODEL,
+                    "llm_model": gatekeeper_model,
                     "agent_id": "expert_2"
                 }
             ]
@@ -89,7 +102,7 @@ Return ONLY valid JSON (no markdown, no extra text) with this structure:
         content = response["content"]
         # Try to parse as JSON directly
         result = json.loads(content)
-        return result
+        return _with_substitution(result, response)
     except json.JSONDecodeError:
         # Try to find JSON in the response
         import re
@@ -97,7 +110,7 @@ Return ONLY valid JSON (no markdown, no extra text) with this structure:
         if json_match:
             try:
                 result = json.loads(json_match.group())
-                return result
+                return _with_substitution(result, response)
             except:
                 pass
         
@@ -109,13 +122,13 @@ Return ONLY valid JSON (no markdown, no extra text) with this structure:
                 {
                     "role_name": "Technical Expert",
                     "role_mission": "Analyze the technical feasibility and implementation aspects",
-                    "llm_model": GATEKEEPER_MODEL,
+                    "llm_model": gatekeeper_model,
                     "agent_id": "expert_1"
                 },
                 {
                     "role_name": "Business Strategist",
                     "role_mission": "Consider business impact, market fit, and strategic implications",
-                    "llm_model": GATEKEEPER_MODEL,
+                    "llm_model": gatekeeper_model,
                     "agent_id": "expert_2"
                 }
             ]
@@ -1,75 +1,159 @@
-import aiohttp
 import json
 import asyncio
+import time
+from functools import lru_cache
 from typing import Optional, Dict, Any, List
-from .config import OPENROUTER_API_KEY
+from .config import get_settings
+from .circuit_breaker import get_breakers
+from .router import get_router
+from .singleflight import SingleFlight, request_key
+from .prompts import get_cache_stats
+from .tracing import span, usage_attributes
+from .cassette import get_cassette, cassette_key, RECORD, REPLAY
+from .providers import ProviderRouter, OpenRouterProvider
+
+# In-flight upstream requests shared by all clients; a request nobody waits
+# for any more (e.g. a cancelled speculative call) is cancelled too
+_upstream_flights = SingleFlight(cancel_orphans=True)
+
+def model_substitution(response: Optional[Dict[str, Any]]) -> Optional[Dict[str, str]]:
+    """Return {"requested": str, "used": str} if the response came from a failover model"""
+    if response and response.get("substituted_for"):
+        return {"requested": response["substituted_for"], "used": response["model"]}
+    return None
 
 class LLMClient:
-    """Async OpenRouter client for LLM queries"""
+    """Async LLM client: OpenRouter, or a direct provider for openai/ and google/ models"""
     
-    def __init__(self, api_key: str = OPENROUTER_API_KEY):
-        self.api_key = api_key
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key if api_key is not None else get_settings().openrouter_api_key
         self.base_url = "https://openrouter.ai/api/v1"
+        self.providers = ProviderRouter(OpenRouterProvider(self.api_key, self.base_url))
         
     async def query_model(
         self,
         model: str,
-        messages: List[Dict[str, str]],
+        messages: List[Dict[str, Any]],
         temperature: float = 0.7,
         max_tokens: int = 2000,
-        timeout: int = 60
+        timeout: int = 60,
+        stop: Optional[List[str]] = None,
+        trace_attributes: Optional[Dict[str, Any]] = None,
+        stage: Optional[str] = None
     ) -> Optional[Dict[str, Any]]:
         """
-        Query a single model via OpenRouter.
+        Query a single model via its provider (see providers.py).
         
-        Returns dict with 'content' and optional 'reasoning_details' on success.
+        If the model's circuit breaker is open the call is routed right away
+        to a substitute; the result then carries 'model' (the model used) and
+        'substituted_for' (the model requested).
+        
+        Concurrent identical calls (same model, messages and parameters)
+        share one upstream request.
+        
+        Returns dict with 'content', 'model', 'provider', 'finish_reason', 'usage',
+        'cached_tokens' (prompt tokens served from the provider's prompt
+        cache) and optional 'reasoning_details' on success.
         Returns None on failure.
-        """
-        headers = {
-            "Authorization": f"Bearer {self.api_key}",
-            "Content-Type": "application/json",
-        }
         
-        payload = {
-            "model": model,
-            "messages": messages,
-            "temperature": temperature,
-            "max_tokens": max_tokens,
-        }
+        `trace_attributes` (e.g. {"agent.id": ...}) are added to the call's span.
+        `stage` (set by budget.params) files the call's latency under that
+        stage in the router.
+        """
+        key = request_key(model, messages, temperature, max_tokens, stop)
+        with span("llm.query_model", **{"llm.model": model, "llm.max_tokens": max_tokens}, **(trace_attributes or {})) as s:
+            s.set_attribute("llm.coalesced", _upstream_flights.in_flight(key))
+            result = await _upstream_flights.do(
+                key,
+                lambda: self._query_routed(model, messages, temperature, max_tokens, timeout, stop, stage)
+            )
+            s.set_attributes(usage_attributes(result))
+        # Each caller gets its own copy; stage code may post-process the content
+        return dict(result) if result is not None else None
+    
+    async def _query_routed(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: int,
+        stop: Optional[List[str]],
+        stage: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Route through the circuit breakers and send the request"""
+        breakers = get_breakers()
+        target = breakers.route(model)
+        if target != model:
+            print(f"Circuit open for {model}, routing to {target}")
         
+        start = time.monotonic()
+        result = None
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/chat/completions",
-                    json=payload,
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=timeout)
-                ) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        content = data["choices"][0]["message"]["content"]
-                        
-                        result = {"content": content}
-                        
-                        # Include reasoning details if available (for o1 models)
-                        if "reasoning_details" in data["choices"][0]["message"]:
-                            result["reasoning_details"] = data["choices"][0]["message"]["reasoning_details"]
-                        
-                        return result
-                    else:
-                        error_text = await response.text()
-                        print(f"API Error {response.status}: {error_text}")
-                        return None
-        except asyncio.TimeoutError:
-            print(f"Timeout error for model {model}")
-            return None
-        except Exception as e:
-            print(f"Error querying model {model}: {str(e)}")
-            return None
+            with span("llm.request", **{"llm.model": target}):
+                result = await self._send(target, messages, temperature, max_tokens, timeout, stop, requested=model)
+        finally:
+            # Also runs on cancellation so a half-open probe is always released
+            latency = time.monotonic() - start
+            breakers.record(target, result is not None, latency)
+            get_router().record(stage, target, result is not None, latency, result.get("usage") if result else None)
+        
+        if result is not None:
+            result["model"] = target
+            result["cached_tokens"] = get_cache_stats().record(target, result.get("usage"))
+            if target != model:
+                result["substituted_for"] = model
+        return result
+    
+    async def _send(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        timeout: int,
+        stop: Optional[List[str]],
+        requested: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Upstream request, recorded to or replayed from the cassette when enabled.
+        
+        `model` is the routed target; cassette entries are keyed and indexed
+        by `requested` (the model the caller asked for, default `model`).
+        """
+        requested = requested or model
+        cassette = get_cassette()
+        if cassette.mode == REPLAY:
+            return await cassette.replay(cassette_key(requested, messages, temperature, stop), requested, messages)
+        
+        start = time.monotonic()
+        result = await self._request(model, messages, temperature, max_tokens, timeout, stop)
+        if cassette.mode == RECORD:
+            cassette.record(
+                cassette_key(requested, messages, temperature, stop),
+                requested,
+                messages,
+                {"temperature": temperature, "max_tokens": max_tokens, "stop": stop, "target": model},
+                result,
+                time.monotonic() - start
+            )
+        return result
+    
+    async def _request(
+        self,
+        model: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timeout: int,
+        stop: Optional[List[str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Send one chat completion request via the model's provider; None on failure"""
+        return await self.providers.request(model, messages, temperature, max_tokens, timeout, stop)
     
     async def query_models_parallel(
         self,
-        queries: List[tuple],  # [(model, messages, temperature, max_tokens), ...]
+        queries: List[tuple],  # [(model, messages, temperature, max_tokens, extra_kwargs), ...]
         timeout: int = 60
     ) -> List[Optional[Dict[str, Any]]]:
         """
@@ -83,9 +167,14 @@ class LLMClient:
                 messages=query[1],
                 temperature=query[2] if len(query) > 2 else 0.7,
                 max_tokens=query[3] if len(query) > 3 else 2000,
-                timeout=timeout
+                **{"timeout": timeout, **(query[4] if len(query) > 4 else {})}
             )
             for query in queries
         ]
         
         return await asyncio.gather(*tasks)
+
+@lru_cache(maxsize=1)
+def get_client() -> LLMClient:
+    """Shared LLMClient, constructed on first use"""
+    return LLMClient()
@@ -1,12 +1,17 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Header, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import Dict, List, Any, Optional
 import asyncio
+import hmac
 import json
+from functools import lru_cache
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
 
-from .config import BACKEND_PORT, BACKEND_HOST, CORS_ALLOWED_ORIGINS, config
-from .storage import Storage
+from .config import get_settings
+from .storage import get_storage
 from .gatekeeper import to_gatekeeper
 from .roundwise import (
     stage1_expert_responses,
@@ -14,23 +19,97 @@ from .roundwise import (
     stage3_notary_synthesis,
     stage4_expert_scoring
 )
+from .circuit_breaker import get_breakers
+from .router import get_router
+from .llm_client import get_client
+from .admission import get_admission, Overloaded, GATEKEEPER, PIPELINE
+from .tracing import span, monitor_event_loop
+from .profiling import get_profiles, ProfileMiddleware
+from .search import KINDS as SEARCH_KINDS
+from .compression import CompressionMiddleware
+from .speculation import get_speculation
+from .transfer import Importer, iter_export, iter_ndjson, aiter_lines, DEFAULT_BATCH_SIZE
+from .singleflight import SingleFlight, request_key
+from .prompts import get_cache_stats
+from .maintenance import run_periodically
 
 app = FastAPI(title="RoundWise MVP Backend")
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=CORS_ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+class _Deferred:
+    """ASGI middleware built on the first request, so settings are not read at import time"""
+    
+    def __init__(self, app: Any, build: Any):
+        self.app = app
+        self.build = build
+        self.inner: Any = None
+    
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if self.inner is None:
+            self.inner = self.build(self.app)
+        await self.inner(scope, receive, send)
+
+def _compression_middleware(app: Any) -> Any:
+    """Response compression (brotli if installed, else gzip), unless disabled"""
+    compression = {"enabled": True, "minimum_size": 1024, "brotli_quality": 5, **get_settings().api.get("compression", {})}
+    if not compression["enabled"]:
+        return app
+    return CompressionMiddleware(app, minimum_size=compression["minimum_size"], brotli_quality=compression["brotli_quality"])
 
-storage = Storage()
+def _cors_middleware(app: Any) -> Any:
+    return CORSMiddleware(
+        app,
+        allow_origins=get_settings().cors_allowed_origins,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+
+app.add_middleware(_Deferred, build=_compression_middleware)
+app.add_middleware(_Deferred, build=_cors_middleware)
+
+def _is_admin(token: Optional[str]) -> bool:
+    expected = get_settings().admin_token
+    return bool(expected and token) and hmac.compare_digest(token, expected)
+
+# Per-request profiling (X-Profile: 1 from an admin); outermost so it sees the whole request
+app.add_middleware(ProfileMiddleware, is_admin=_is_admin)
 
 # Global state for tracking processing stages
 processing_state = {}
 
+# Duplicate submission coalescing: in-flight only, and in-flight plus
+# recently completed results (for idempotency keys and pipeline retries)
+in_flight_requests = SingleFlight()
+
+@lru_cache(maxsize=1)
+def _completed_flights() -> SingleFlight:
+    return SingleFlight(result_ttl=get_settings().api.get("idempotency_ttl_seconds", 600))
+
+@app.on_event("startup")
+async def start_storage_maintenance():
+    """Periodic retention/archival, if storage.retention.background_interval_hours > 0"""
+    asyncio.create_task(run_periodically(get_storage(), lambda: list(processing_state)))
+
+@app.on_event("startup")
+async def backfill_search_index():
+    """Index existing conversations in the background if the search index has never been backfilled"""
+    storage = get_storage()
+    if storage.search is None or storage.search.backfilled:
+        return
+    if not next(storage.iter_conversation_files(), None) and not storage.archive_segments():
+        # Nothing stored yet: add_message keeps the index complete from here on
+        storage.search.mark_backfilled()
+        return
+
+    async def backfill():
+        print(f"Indexed {await asyncio.to_thread(storage.rebuild_search_index)} existing conversations for search")
+    asyncio.create_task(backfill())
+
+@app.on_event("startup")
+async def start_event_loop_monitor():
+    """Record event-loop stalls as spans when tracing is enabled"""
+    asyncio.create_task(monitor_event_loop())
+
 # Request/Response models
 class ProblemRequest(BaseModel):
     problem: str
@@ -54,6 +133,26 @@ class MessageResponse(BaseModel):
     stage4: Optional[Dict[str, Any]] = None
     metadata: Optional[Dict[str, Any]] = None
 
+def _collect_substitutions(stage: str, stage_data: Any) -> List[Dict[str, Any]]:
+    """List failover substitutions recorded on a stage output (top level or per agent)"""
+    if not isinstance(stage_data, dict):
+        return []
+    if "model_substitution" in stage_data:
+        return [{"stage": stage, "agent_id": None, **stage_data["model_substitution"]}]
+    return [
+        {"stage": stage, "agent_id": agent_id, **entry["model_substitution"]}
+        for agent_id, entry in stage_data.items()
+        if isinstance(entry, dict) and "model_substitution" in entry
+    ]
+
+async def _admitted(kind: str, run) -> Dict[str, Any]:
+    """Run `run()` once admission control grants a slot of `kind`"""
+    try:
+        async with get_admission().admit(kind):
+            return await run()
+    except Overloaded as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
 # Routes
 
 @app.get("/api/health")
@@ -61,6 +160,102 @@ async def health():
     """Health check endpoint"""
     return {"status": "ok"}
 
+@app.get("/api/health/models")
+async def model_health():
+    """Circuit breaker state, error rate, latency, cost and prompt cache hits per model and provider"""
+    return {
+        "models": get_breakers().snapshot(),
+        "routing": get_router().snapshot(),
+        "providers": get_client().providers.snapshot(),
+        "admission": get_admission().snapshot(),
+        "speculation": get_speculation().snapshot(),
+        "prompt_cache": get_cache_stats().snapshot(),
+        "conversation_cache": get_storage().cache.snapshot()
+    }
+
+# Admin: on-demand profiling
+
+def _require_admin(token: Optional[str]) -> None:
+    if not get_settings().admin_token:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled")
+    if not _is_admin(token):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.post("/api/admin/profile")
+async def start_profile_window(seconds: float = 30, x_admin_token: Optional[str] = Header(None)):
+    """Sample-profile the whole backend for a time window"""
+    _require_admin(x_admin_token)
+    profiles = get_profiles()
+    profiler = profiles.start(f"window {seconds:g}s", max_seconds=seconds)
+    if profiler is None:
+        raise HTTPException(status_code=409, detail="A profile is already running")
+    
+    async def finish():
+        await asyncio.sleep(seconds)
+        await asyncio.to_thread(profiles.stop, profiler)
+    
+    asyncio.create_task(finish())
+    return {"id": profiler.profile.id, "seconds": min(seconds, profiler.max_seconds)}
+
+@app.get("/api/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Stored profiles, newest first"""
+    _require_admin(x_admin_token)
+    return {"profiles": get_profiles().list_profiles()}
+
+@app.get("/api/admin/profiles/{profile_id}")
+async def get_profile(profile_id: str, format: str = "json", x_admin_token: Optional[str] = Header(None)):
+    """Top-N hot functions (format=json) or collapsed stacks for flamegraphs (format=folded)"""
+    _require_admin(x_admin_token)
+    profile = get_profiles().get_profile(profile_id, folded=(format == "folded"))
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "folded":
+        return PlainTextResponse(profile)
+    return profile
+
+# Admin: bulk export/import
+
+@app.get("/api/admin/export")
+async def export_conversations(
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    has_stage4: Optional[bool] = None,
+    after: Optional[str] = None,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Stream conversations as NDJSON: the working set in id order, then each archive segment in file order.
+    
+    Filters: created_at in [since, until), has_stage4. To resume an
+    interrupted export pass the last id received as `after`.
+    """
+    _require_admin(x_admin_token)
+    conversations = iter_export(get_storage(), since, until, has_stage4, after)
+    return StreamingResponse(iter_ndjson(conversations), media_type="application/x-ndjson")
+
+@app.post("/api/admin/import")
+async def import_conversations(
+    request: Request,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    overwrite: bool = False,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Import an NDJSON request body (as produced by export) in batched writes.
+    
+    Conversations already present are skipped unless `overwrite`, so an
+    interrupted import can simply be sent again.
+    """
+    _require_admin(x_admin_token)
+    importer = Importer(get_storage(), max(1, batch_size), overwrite)
+    async for line in aiter_lines(request.stream()):
+        batch = importer.add(line)
+        if batch:
+            await asyncio.to_thread(importer.write, batch)
+    await asyncio.to_thread(importer.write, importer.take())
+    return importer.totals
+
 @app.get("/api/conversations/{conversation_id}/progress")
 async def get_progress(conversation_id: str):
     """Get current processing stage for a conversation"""
@@ -71,33 +266,245 @@ async def get_progress(conversation_id: str):
 async def get_available_models():
     """Get available LLM models for expert selection"""
     return {
-        "available": config["models"]["available"]
+        "available": get_settings().available_models
     }
 
 @app.post("/api/conversations")
 async def create_conversation():
     """Create a new conversation"""
-    conversation_id = storage.create_conversation()
+    conversation_id = get_storage().create_conversation()
     return {"id": conversation_id}
 
 @app.get("/api/conversations")
 async def list_conversations():
     """List all conversations"""
-    conversations = storage.list_conversations()
+    conversations = get_storage().list_conversations()
     return {"conversations": conversations}
 
+@app.get("/api/search")
+async def search_conversations(q: str, limit: int = 20, offset: int = 0, kind: Optional[str] = None):
+    """
+    Full-text search over problems, role names, summaries and solutions.
+    
+    Returns conversations ranked by relevance, each with its best-matching
+    snippet; `kind` restricts matches to one of problem/role/summary/solution.
+    """
+    storage = get_storage()
+    if storage.search is None:
+        raise HTTPException(status_code=503, detail="Search is not available (SQLite FTS5 missing)")
+    if kind is not None and kind not in SEARCH_KINDS:
+        raise HTTPException(status_code=400, detail=f"kind must be one of {', '.join(SEARCH_KINDS)}")
+    limit = max(1, min(limit, 100))
+    
+    found = storage.search.search(q, limit=limit, offset=max(0, offset), kind=kind)
+    return {"query": q, "limit": limit, "offset": offset, **found}
+
+def _http_date(iso_timestamp: str) -> str:
+    """Local ISO timestamp (as stored) -> HTTP-date"""
+    moment = datetime.fromisoformat(iso_timestamp).replace(microsecond=0).astimezone(timezone.utc)
+    return format_datetime(moment, usegmt=True)
+
+def _not_modified(request: Request, etag: str, last_modified: str) -> bool:
+    """Conditional GET check: If-None-Match wins over If-Modified-Since"""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return any(tag.strip() in (etag, "*") for tag in if_none_match.split(","))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return parsedate_to_datetime(if_modified_since) >= parsedate_to_datetime(last_modified)
+        except (TypeError, ValueError):
+            return False
+    return False
+
 @app.get("/api/conversations/{conversation_id}")
-async def get_conversation(conversation_id: str):
-    """Get a specific conversation"""
-    conversation = storage.get_conversation(conversation_id)
+async def get_conversation(conversation_id: str, request: Request):
+    """
+    Get a specific conversation.
+    
+    Carries an ETag and Last-Modified from the conversation's storage
+    version; a matching If-None-Match / If-Modified-Since gets 304 without
+    the conversation being read or serialized again.
+    """
+    storage = get_storage()
+    version = storage.get_version(conversation_id)
+    if version is None:
+        raise HTTPException(status_code=404, detail="Conversation not found")
+    
+    etag = f'W/"{conversation_id}-{version[0]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if version[1]:
+        headers["Last-Modified"] = _http_date(version[1])
     
+    if _not_modified(request, etag, headers.get("Last-Modified", "")):
+        return Response(status_code=304, headers=headers)
+    
+    conversation = storage.get_conversation(conversation_id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    return conversation
+    return Response(content=json.dumps(conversation), media_type="application/json", headers=headers)
+
+async def _run_gatekeeper(conversation_id: str, content: str) -> Dict[str, Any]:
+    """Stage 0: store the user problem, run the Gatekeeper and store its proposal"""
+    storage = get_storage()
+    response_data = {
+        "role": "assistant",
+        "content": "",
+        "metadata": {}
+    }
+    
+    # Store user message
+    storage.add_message(conversation_id, "user", content)
+    
+    # Run Gatekeeper
+    try:
+        stage0 = await to_gatekeeper(content)
+        response_data["stage0"] = stage0
+        response_data["content"] = f"Gatekeeper Analysis: {stage0.get('normalized_problem', '')}"
+        
+        # Store metadata
+        response_data["metadata"]["label_to_model"] = {}
+        response_data["metadata"]["aggregate_rankings"] = []
+        response_data["metadata"]["model_substitutions"] = _collect_substitutions("stage0", stage0)
+        # Warn before the user confirms roles whose models are running over the SLO
+        response_data["metadata"]["routing_warnings"] = get_router().check_agents(stage0.get("proposed_agents") or [])
+        
+        # Store assistant response with stage0
+        storage.add_message(
+            conversation_id,
+            "assistant",
+            response_data["content"],
+            stage_data={"stage0": stage0}
+        )
+        
+        # Opt-in: start Stage 1 for the proposed experts while the user reviews them
+        get_speculation().start(
+            conversation_id,
+            stage0.get("normalized_problem", ""),
+            stage0.get("key_dimensions", []),
+            stage0.get("proposed_agents") or []
+        )
+        
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Gatekeeper error: {str(e)}")
+    
+    return response_data
+
+async def _run_pipeline(
+    conversation_id: str,
+    agents: List[Dict[str, str]],
+    normalized_problem: str,
+    key_dimensions: List[str]
+) -> Dict[str, Any]:
+    """Stages 1-4 with confirmed roles, storing each stage as it completes"""
+    storage = get_storage()
+    response_data = {
+        "role": "assistant",
+        "content": "",
+        "metadata": {}
+    }
+    
+    response_data["metadata"]["routing_warnings"] = get_router().check_agents(agents)
+    
+    try:
+        # Stage 1: Expert responses (parallel)
+        processing_state[conversation_id] = "stage1"
+        # Reuse speculative Stage 1 work for experts the user did not change
+        speculative = get_speculation().claim(conversation_id, normalized_problem, key_dimensions, agents)
+        stage1 = await stage1_expert_responses(normalized_problem, key_dimensions, agents, speculative)
+        response_data["stage1"] = stage1
+        
+        # Store assistant response with stage1
+        storage.add_message(
+            conversation_id,
+            "assistant",
+            "Stage 1: Initial Expert Analyses complete",
+            stage_data={"stage1": stage1}
+        )
+        
+        # Stage 2: Expert rebuttals
+        processing_state[conversation_id] = "stage2"
+        stage2, label_to_model, deliberation = await stage2_expert_rebuttals(normalized_problem, agents, stage1)
+        response_data["stage2"] = stage2
+        response_data["metadata"]["label_to_model"] = label_to_model
+        response_data["metadata"]["deliberation"] = deliberation
+        
+        # Store assistant response with stage2
+        storage.add_message(
+            conversation_id,
+            "assistant",
+            "Stage 2: Expert Rebuttals complete",
+            stage_data={"stage2": stage2}
+        )
+        
+        # Stage 3: Notary synthesis
+        processing_state[conversation_id] = "stage3"
+        stage3 = await stage3_notary_synthesis(normalized_problem, stage1, stage2)
+        response_data["stage3"] = stage3
+        
+        # Store assistant response with stage3
+        storage.add_message(
+            conversation_id,
+            "assistant",
+            "Stage 3: Notary Synthesis complete",
+            stage_data={"stage3": stage3}
+        )
+        
+        # Stage 4: Expert scoring
+        processing_state[conversation_id] = "stage4"
+        stage4 = await stage4_expert_scoring(
+            stage3.get("proposed_solutions", []),
+            stage1,
+            agents
+        )
+        response_data["stage4"] = stage4
+        
+        # Build aggregate rankings from stage4 (keyed by solution id)
+        if stage4:
+            from .scoring import aggregate_rankings
+            
+            response_data["metadata"]["aggregate_rankings"] = aggregate_rankings(
+                stage4,
+                stage3.get("proposed_solutions") or None
+            )
+        
+        # Store assistant response with stage4
+        storage.add_message(
+            conversation_id,
+            "assistant",
+            "Stage 4: Final Scoring complete",
+            stage_data={"stage4": stage4}
+        )
+        
+        response_data["metadata"]["model_substitutions"] = [
+            substitution
+            for stage in ("stage1", "stage2", "stage3", "stage4")
+            for substitution in _collect_substitutions(stage, response_data.get(stage))
+        ]
+        
+        response_data["content"] = "All analysis stages complete"
+        
+        # Clear processing state
+        if conversation_id in processing_state:
+            del processing_state[conversation_id]
+        
+    except Exception as e:
+        import traceback
+        traceback.print_exc()
+        # Clear processing state on error
+        if conversation_id in processing_state:
+            del processing_state[conversation_id]
+        raise HTTPException(status_code=500, detail=f"Analysis pipeline error: {str(e)}")
+    
+    return response_data
 
 @app.post("/api/conversations/{conversation_id}/message")
-async def post_message(conversation_id: str, request: MessageRequest):
+async def post_message(
+    conversation_id: str,
+    request: MessageRequest,
+    idempotency_key: Optional[str] = Header(None)
+):
     """
     Post a message to a conversation.
     
@@ -106,54 +513,51 @@ async def post_message(conversation_id: str, request: MessageRequest):
       
     If type="role_update":
       - Proceed to stages 1-4 with confirmed roles
+    
+    Duplicate submissions (double clicks, client retries) are coalesced:
+    a request identical to one already running attaches to it and gets its
+    result. Requests carrying the same Idempotency-Key header, and repeated
+    role_update calls for the same Stage 0 and agents, also get the stored
+    result for a while after the first one completes.
+    
+    Admission control applies to the work itself (duplicates attach without
+    taking a slot): when overloaded the request waits in a queue, Stage 0
+    ahead of Stages 1-4, or fails with 429/503 and a Retry-After header.
     """
+    with span("POST /api/conversations/{id}/message", **{"conversation.id": conversation_id, "message.type": request.type}):
+        return await _dispatch_message(conversation_id, request, idempotency_key)
+
+async def _dispatch_message(
+    conversation_id: str,
+    request: MessageRequest,
+    idempotency_key: Optional[str]
+) -> Dict[str, Any]:
+    """Stage 0 or Stages 1-4, depending on the message type"""
+    storage = get_storage()
     conversation = storage.get_conversation(conversation_id)
     
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
     
-    response_data = {
-        "role": "assistant",
-        "content": "",
-        "metadata": {}
-    }
-    
     # Handle different message types
     if request.type == "message":
         # This is a user problem - start with Gatekeeper (Stage 0)
+        run = lambda: _admitted(GATEKEEPER, lambda: _run_gatekeeper(conversation_id, request.content))
         
-        # Store user message
-        storage.add_message(conversation_id, "user", request.content)
-        
-        # Run Gatekeeper
-        try:
-            stage0 = await to_gatekeeper(request.content)
-            response_data["stage0"] = stage0
-            response_data["content"] = f"Gatekeeper Analysis: {stage0.get('normalized_problem', '')}"
-            
-            # Store metadata
-            response_data["metadata"]["label_to_model"] = {}
-            response_data["metadata"]["aggregate_rankings"] = []
-            
-            # Store assistant response with stage0
-            storage.add_message(
-                conversation_id,
-                "assistant",
-                response_data["content"],
-                stage_data={"stage0": stage0}
-            )
-            
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Gatekeeper error: {str(e)}")
+        if idempotency_key:
+            return await _completed_flights().do(request_key(conversation_id, request.type, idempotency_key), run)
+        return await in_flight_requests.do(request_key(conversation_id, "message", request.content), run)
     
     elif request.type == "role_update":
         # User has confirmed/updated roles - proceed to Stages 1-4 automatically
         
         # Extract the last assistant message with stage0
         last_stage0 = None
+        last_stage0_at = None
         for msg in reversed(conversation["messages"]):
             if msg.get("role") == "assistant" and "stage0" in msg:
                 last_stage0 = msg.get("stage0")
+                last_stage0_at = msg.get("timestamp")
                 break
         
         if not last_stage0:
@@ -165,103 +569,15 @@ async def post_message(conversation_id: str, request: MessageRequest):
         normalized_problem = last_stage0.get("normalized_problem", "")
         key_dimensions = last_stage0.get("key_dimensions", [])
         
-        try:
-            # Stage 1: Expert responses (parallel)
-            processing_state[conversation_id] = "stage1"
-            stage1 = await stage1_expert_responses(normalized_problem, key_dimensions, agents)
-            response_data["stage1"] = stage1
-            
-            # Store assistant response with stage1
-            storage.add_message(
-                conversation_id,
-                "assistant",
-                "Stage 1: Initial Expert Analyses complete",
-                stage_data={"stage1": stage1}
-            )
-            
-            # Stage 2: Expert rebuttals
-            processing_state[conversation_id] = "stage2"
-            stage2, label_to_model = await stage2_expert_rebuttals(normalized_problem, agents, stage1)
-            response_data["stage2"] = stage2
-            response_data["metadata"]["label_to_model"] = label_to_model
-            
-            # Store assistant response with stage2
-            storage.add_message(
-                conversation_id,
-                "assistant",
-                "Stage 2: Expert Rebuttals complete",
-                stage_data={"stage2": stage2}
-            )
-            
-            # Stage 3: Notary synthesis
-            processing_state[conversation_id] = "stage3"
-            stage3 = await stage3_notary_synthesis(normalized_problem, stage1, stage2)
-            response_data["stage3"] = stage3
-            
-            # Store assistant response with stage3
-            storage.add_message(
-                conversation_id,
-                "assistant",
-                "Stage 3: Notary Synthesis complete",
-                stage_data={"stage3": stage3}
-            )
-            
-            # Stage 4: Expert scoring
-            processing_state[conversation_id] = "stage4"
-            stage4 = await stage4_expert_scoring(
-                stage3.get("proposed_solutions", []),
-                stage1,
-                agents
-            )
-            response_data["stage4"] = stage4
-            
-            # Build aggregate rankings from stage4
-            if stage4:
-                aggregate = {}
-                for agent_id, scoring in stage4.items():
-                    scores_list = scoring.get("scores", [])
-                    for score_obj in scores_list:
-                        if isinstance(score_obj, dict):
-                            sol_id = score_obj.get("id", "")
-                            sol_text = score_obj.get("text", "")
-                            points = score_obj.get("points", 0)
-                            key = f"{sol_id}_{sol_text}"
-                            if key not in aggregate:
-                                aggregate[key] = {"id": sol_id, "text": sol_text, "total": 0}
-                            aggregate[key]["total"] += points
-                
-                response_data["metadata"]["aggregate_rankings"] = sorted(
-                    aggregate.values(),
-                    key=lambda x: x["total"],
-                    reverse=True
-                )
-            
-            # Store assistant response with stage4
-            storage.add_message(
-                conversation_id,
-                "assistant",
-                "Stage 4: Final Scoring complete",
-                stage_data={"stage4": stage4}
-            )
-            
-            response_data["content"] = "All analysis stages complete"
-            
-            # Clear processing state
-            if conversation_id in processing_state:
-                del processing_state[conversation_id]
-            
-        except Exception as e:
-            import traceback
-            traceback.print_exc()
-            # Clear processing state on error
-            if conversation_id in processing_state:
-                del processing_state[conversation_id]
-            raise HTTPException(status_code=500, detail=f"Analysis pipeline error: {str(e)}")
+        # Same conversation, same Stage 0 and same agents = same pipeline run
+        key = request_key(conversation_id, request.type, idempotency_key or [last_stage0_at, agents])
+        return await _completed_flights().do(
+            key,
+            lambda: _admitted(PIPELINE, lambda: _run_pipeline(conversation_id, agents, normalized_problem, key_dimensions))
+        )
     
     else:
         raise HTTPException(status_code=400, detail=f"Unknown message type: {request.type}")
-    
-    return response_data
 
 @app.get("/")
 async def root():
@@ -270,4 +586,5 @@ async def root():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host=BACKEND_HOST, port=BACKEND_PORT)
+    settings = get_settings()
+    uvicorn.run(app, host=settings.backend_host, port=settings.backend_port)
@@ -0,0 +1,162 @@
+"""
+Retention, archival and compaction for the conversation store.
+
+Usage (from project root):
+    python -m backend.maintenance --dry-run
+    python -m backend.maintenance --archive-after-days 14
+
+Policies come from `storage.retention` in config.yaml (CLI flags override):
+    empty_after_hours     delete conversations with no messages older than this
+    stale_after_days      delete conversations inactive for this long (0 = never)
+    archive_after_days    move conversations inactive for this long into
+                          gzip-compressed monthly segments (0 = never)
+
+Each run finishes by rebuilding the archive index. The server can also run the
+job periodically (`background_interval_hours`).
+"""
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+from .storage import Storage
+
+DEFAULT_RETENTION = {
+    "empty_after_hours": 24,
+    "stale_after_days": 0,
+    "archive_after_days": 30,
+    "archive_batch_size": 500,
+    "background_interval_hours": 0
+}
+
+def retention_settings(overrides: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    from .config import get_settings
+    
+    configured = get_settings().storage.get("retention", {}) or {}
+    return {
+        **DEFAULT_RETENTION,
+        **configured,
+        **{k: v for k, v in (overrides or {}).items() if v is not None}
+    }
+
+def _segment_name(conversation: Dict[str, Any]) -> str:
+    """Monthly segments by creation date, e.g. segment-2025-03.jsonl.gz"""
+    created = str(conversation.get("created_at", ""))[:7] or "unknown"
+    return f"segment-{created}.jsonl.gz"
+
+def run_maintenance(
+    storage: Storage,
+    settings: Dict[str, Any],
+    dry_run: bool = False,
+    skip_ids: Iterable[str] = ()
+) -> Dict[str, int]:
+    """
+    Apply the retention policies once over the working set.
+
+    `skip_ids` protects conversations that are being processed right now.
+    Returns counts: {"scanned", "deleted_empty", "deleted_stale", "archived", "indexed"}
+    """
+    now = time.time()
+    skip = set(skip_ids)
+    stats = {"scanned": 0, "deleted_empty": 0, "deleted_stale": 0, "archived": 0, "indexed": 0}
+    
+    empty_cutoff = now - settings["empty_after_hours"] * 3600
+    stale_cutoff = now - settings["stale_after_days"] * 86400 if settings["stale_after_days"] else None
+    archive_cutoff = now - settings["archive_after_days"] * 86400 if settings["archive_after_days"] else None
+    
+    pending: Dict[str, List[Dict[str, Any]]] = {}
+    # File stamps taken before reading: a conversation written since is left alone
+    stamps: Dict[str, Tuple[int, ...]] = {}
+    
+    def flush(segment: str) -> None:
+        batch = pending.pop(segment, [])
+        if batch and not dry_run:
+            stats["archived"] += storage.archive_conversations(batch, segment, stamps)
+        elif batch:
+            stats["archived"] += len(batch)
+    
+    for conversation_id, path in storage.iter_conversation_files():
+        if conversation_id in skip:
+            continue
+        try:
+            last_activity = path.stat().st_mtime
+        except OSError:
+            continue
+        stats["scanned"] += 1
+        
+        # File mtime is the last write; nothing to do for recently active files
+        if last_activity > empty_cutoff and (archive_cutoff is None or last_activity > archive_cutoff) \
+                and (stale_cutoff is None or last_activity > stale_cutoff):
+            continue
+        
+        stamps[conversation_id] = storage.file_stamp(conversation_id)
+        try:
+            with open(path, "r") as f:
+                conversation = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            continue
+        
+        if not conversation.get("messages") and last_activity <= empty_cutoff:
+            if dry_run or storage.delete_conversation(conversation_id, stamps[conversation_id]):
+                stats["deleted_empty"] += 1
+        elif stale_cutoff is not None and last_activity <= stale_cutoff:
+            if dry_run or storage.delete_conversation(conversation_id, stamps[conversation_id]):
+                stats["deleted_stale"] += 1
+        elif archive_cutoff is not None and last_activity <= archive_cutoff and conversation.get("messages"):
+            segment = _segment_name(conversation)
+            pending.setdefault(segment, []).append(conversation)
+            if len(pending[segment]) >= settings["archive_batch_size"]:
+                flush(segment)
+    
+    for segment in list(pending):
+        flush(segment)
+    
+    if not dry_run:
+        stats["indexed"] = storage.rebuild_archive_index()
+    
+    return stats
+
+async def run_periodically(storage: Storage, skip_ids_fn=lambda: ()) -> None:
+    """Background loop for the server: run maintenance every `background_interval_hours`"""
+    settings = retention_settings()
+    interval = settings["background_interval_hours"] * 3600
+    if interval <= 0:
+        return
+    
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            stats = await asyncio.to_thread(run_maintenance, storage, settings, False, list(skip_ids_fn()))
+            print(f"[{datetime.now().isoformat()}] Storage maintenance: {stats}")
+        except Exception as e:
+            print(f"Storage maintenance failed: {e}")
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="RoundWise conversation store maintenance")
+    parser.add_argument("--data-dir", default="backend/data/conversations", help="Conversation store directory")
+    parser.add_argument("--archive-dir", default=None, help="Archive directory (default: <data-dir>/../archive)")
+    parser.add_argument("--empty-after-hours", type=float, default=None)
+    parser.add_argument("--stale-after-days", type=float, default=None)
+    parser.add_argument("--archive-after-days", type=float, default=None)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without touching files")
+    args = parser.parse_args(argv)
+    
+    settings = retention_settings({
+        "empty_after_hours": args.empty_after_hours,
+        "stale_after_days": args.stale_after_days,
+        "archive_after_days": args.archive_after_days
+    })
+    storage = Storage(args.data_dir, args.archive_dir)
+    stats = run_maintenance(storage, settings, dry_run=args.dry_run)
+    
+    prefix = "Would delete" if args.dry_run else "Deleted"
+    print(
+        f"Scanned {stats['scanned']}: {prefix} {stats['deleted_empty']} empty "
+        f"and {stats['deleted_stale']} stale, archived {stats['archived']}, "
+        f"archive index holds {stats['indexed']}"
+    )
+
+if __name__ == "__main__":
+    main()
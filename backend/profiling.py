@@ -0,0 +1,245 @@
+"""
+On-demand sampling profiler for the running backend.
+
+A background thread samples the event-loop thread's stack every
+`interval_ms` (sys._current_frames), so the profiled code runs unmodified
+and nothing is sampled while no profile is active. Samples where the loop is
+idle in its selector are counted separately; the rest are the CPU time the
+request(s) spent in Python (JSON, regex parsing, ...).
+
+Admin-only triggers (see main.py), both require the ADMIN_TOKEN env value in
+an `X-Admin-Token` header:
+    X-Profile: 1 on any request      profile that one request
+    POST /api/admin/profile?seconds=N  profile everything for a time window
+
+Each profile is stored as `<id>.folded` (collapsed stacks for flamegraph.pl,
+speedscope or inferno) and `<id>.json` (top-N hot functions).
+Note: the loop thread is shared, so a per-request profile also contains
+whatever other requests ran on the loop meanwhile.
+"""
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+DEFAULT_PROFILING = {
+    "interval_ms": 5,
+    "max_seconds": 120,
+    "top_n": 30,
+    "path": "backend/data/profiles"
+}
+
+# Leaf frames that mean the event loop is waiting, not working
+IDLE_LEAVES = {("selectors.py", "select"), ("threading.py", "wait")}
+
+Stack = Tuple[str, ...]
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class Profile:
+    """Aggregated stack samples from one profiling session"""
+
+    def __init__(self, profile_id: str, label: str, interval: float):
+        self.id = profile_id
+        self.label = label
+        self.interval = interval
+        self.started_at = datetime.now().isoformat()
+        self.duration = 0.0
+        self.stacks: Counter = Counter()
+        self.idle_samples = 0
+
+    @property
+    def samples(self) -> int:
+        return sum(self.stacks.values())
+
+    def folded(self) -> str:
+        """Collapsed stacks, root first: `a;b;c <count>` per line"""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def top(self, n: int) -> List[Dict[str, Any]]:
+        """Hottest functions by self samples, with inclusive samples alongside"""
+        own: Counter = Counter()
+        inclusive: Counter = Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack):
+                inclusive[label] += count
+        total = self.samples or 1
+        return [
+            {
+                "function": label,
+                "self_samples": count,
+                "self_pct": round(100 * count / total, 1),
+                "total_samples": inclusive[label],
+                "total_pct": round(100 * inclusive[label] / total, 1)
+            }
+            for label, count in own.most_common(n)
+        ]
+
+    def summary(self, top_n: int) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "label": self.label,
+            "started_at": self.started_at,
+            "duration_seconds": round(self.duration, 3),
+            "interval_ms": self.interval * 1000,
+            "samples": self.samples,
+            "idle_samples": self.idle_samples,
+            "cpu_seconds_estimate": round(self.samples * self.interval, 3),
+            "top": self.top(top_n)
+        }
+
+class SamplingProfiler:
+    """Samples one thread's stack from a daemon thread until stopped"""
+
+    def __init__(self, profile: Profile, thread_id: int, max_seconds: float):
+        self.profile = profile
+        self.thread_id = thread_id
+        self.max_seconds = max_seconds
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="roundwise-profiler", daemon=True)
+        self._started = 0.0
+
+    def start(self) -> None:
+        self._started = time.monotonic()
+        self._thread.start()
+
+    def stop(self) -> Profile:
+        self._stop.set()
+        self._thread.join()
+        return self.profile
+
+    def _run(self) -> None:
+        interval = self.profile.interval
+        deadline = self._started + self.max_seconds
+        while not self._stop.wait(interval) and time.monotonic() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                break
+            stack = []
+            while frame is not None:
+                stack.append(frame)
+                frame = frame.f_back
+            leaf = stack[0].f_code
+            if (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES:
+                self.profile.idle_samples += 1
+                continue
+            self.profile.stacks[tuple(_frame_label(f) for f in reversed(stack))] += 1
+        self.profile.duration = time.monotonic() - self._started
+
+class ProfileManager:
+    """One active profile at a time, plus storage of finished ones"""
+
+    def __init__(self, profiling_config: Optional[Dict[str, Any]] = None):
+        if profiling_config is None:
+            from .config import get_settings
+            profiling_config = get_settings().raw.get("profiling", {}) or {}
+        self.settings = {**DEFAULT_PROFILING, **profiling_config}
+        self.path = Path(self.settings["path"])
+        self.active: Optional[SamplingProfiler] = None
+        self._lock = threading.Lock()
+
+    def start(self, label: str, max_seconds: Optional[float] = None) -> Optional[SamplingProfiler]:
+        """Start profiling the calling thread; None if a profile is already running"""
+        with self._lock:
+            if self.active is not None:
+                return None
+            profile_id = datetime.now().strftime("%Y%m%d-%H%M%S-") + os.urandom(3).hex()
+            profile = Profile(profile_id, label, self.settings["interval_ms"] / 1000)
+            seconds = min(max_seconds or self.settings["max_seconds"], self.settings["max_seconds"])
+            self.active = SamplingProfiler(profile, threading.get_ident(), seconds)
+            self.active.start()
+            return self.active
+
+    def stop(self, profiler: SamplingProfiler) -> Dict[str, Any]:
+        """Stop `profiler`, store its output and return the summary"""
+        profile = profiler.stop()
+        with self._lock:
+            if self.active is profiler:
+                self.active = None
+        return self.save(profile)
+
+    def save(self, profile: Profile) -> Dict[str, Any]:
+        summary = profile.summary(self.settings["top_n"])
+        self.path.mkdir(parents=True, exist_ok=True)
+        (self.path / f"{profile.id}.folded").write_text(profile.folded())
+        with open(self.path / f"{profile.id}.json", "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+    def list_profiles(self) -> List[Dict[str, Any]]:
+        profiles = []
+        for file in sorted(self.path.glob("*.json"), reverse=True):
+            try:
+                with open(file, "r") as f:
+                    summary = json.load(f)
+                profiles.append({k: summary.get(k) for k in ("id", "label", "started_at", "duration_seconds", "samples")})
+            except (json.JSONDecodeError, IOError):
+                pass
+        return profiles
+
+    def get_profile(self, profile_id: str, folded: bool = False) -> Optional[Any]:
+        """Stored summary, or the collapsed stacks text with folded=True"""
+        # Ids are generated here; refuse anything that could leave the directory
+        if not profile_id or "/" in profile_id or ".." in profile_id:
+            return None
+        path = self.path / f"{profile_id}.{'folded' if folded else 'json'}"
+        if not path.exists():
+            return None
+        if folded:
+            return path.read_text()
+        with open(path, "r") as f:
+            return json.load(f)
+
+class ProfileMiddleware:
+    """
+    Plain ASGI middleware for `X-Profile: 1`: requests without the header go
+    straight to the app, so it costs one header scan when unused. The profile
+    covers the whole request, body streaming included; its id is sent as
+    `X-Profile-Id` (or `X-Profile-Status: busy` if another profile runs).
+    """
+
+    def __init__(self, app: Any, is_admin: Callable[[Optional[str]], bool]):
+        self.app = app
+        self.is_admin = is_admin
+
+    async def __call__(self, scope: Dict[str, Any], receive: Any, send: Any) -> None:
+        if scope["type"] != "http" or (b"x-profile", b"1") not in scope["headers"]:
+            await self.app(scope, receive, send)
+            return
+
+        from starlette.datastructures import Headers, MutableHeaders
+        from starlette.responses import JSONResponse
+
+        if not self.is_admin(Headers(scope=scope).get("x-admin-token")):
+            response = JSONResponse(status_code=403, content={"detail": "Profiling requires a valid X-Admin-Token"})
+            await response(scope, receive, send)
+            return
+
+        profiles = get_profiles()
+        profiler = profiles.start(f"{scope['method']} {scope['path']}")
+        header = ("X-Profile-Status", "busy") if profiler is None else ("X-Profile-Id", profiler.profile.id)
+
+        async def send_with_header(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append(*header)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            if profiler is not None:
+                profiles.stop(profiler)
+
+@lru_cache(maxsize=1)
+def get_profiles() -> ProfileManager:
+    """Process-wide profile manager, constructed on first use"""
+    return ProfileManager()
@@ -0,0 +1,103 @@
+"""
+Prompt assembly with provider prompt-prefix caching in mind.
+
+Providers cache the longest previously seen prefix of a request, so every
+call is built as: system message with the stage instructions and output
+schema, then a user message that starts with the content shared by all
+experts of a stage (problem and key dimensions, the solutions list) and ends
+with the per-expert part (role block, the expert's own position, other
+experts' output). For models that need explicit hints (Anthropic via
+OpenRouter) the shared part of the user message carries a `cache_control`
+breakpoint.
+
+Caching only applies once the shared prefix is long enough: about 1024
+tokens for OpenAI automatic caching and for Anthropic `cache_control`
+(2048 for Haiku). Short problems stay below that and report no cached tokens.
+"""
+from functools import lru_cache
+from typing import Dict, List, Any, Optional
+from .config import get_settings
+
+DEFAULT_PROMPT_CACHE = {
+    "enabled": True,
+    # Model prefixes that need explicit cache_control breakpoints
+    "cache_control_prefixes": ["anthropic/"]
+}
+
+ROLE_TEMPLATE = """Your assignment:
+Your role: {role_name}
+Your mission: {role_mission}"""
+
+def prompt_cache_settings() -> Dict[str, Any]:
+    return {**DEFAULT_PROMPT_CACHE, **get_settings().llm.get("prompt_cache", {})}
+
+def role_block(agent: Dict[str, str]) -> str:
+    """Per-expert role details, placed after the shared content of a prompt"""
+    return ROLE_TEMPLATE.format(role_name=agent["role_name"], role_mission=agent["role_mission"])
+
+def wants_cache_control(model: str) -> bool:
+    settings = prompt_cache_settings()
+    return settings["enabled"] and any(model.startswith(prefix) for prefix in settings["cache_control_prefixes"])
+
+def user_message(model: str, shared: str, expert: str = "") -> Dict[str, Any]:
+    """
+    User message with the `shared` content first and the per-expert part last.
+
+    Models matching `cache_control_prefixes` get multipart content with a
+    cache breakpoint after the shared part; others get a plain string with the
+    same ordering, which is what automatic prefix caching keys on.
+    """
+    if not wants_cache_control(model):
+        return {"role": "user", "content": f"{shared}\n\n{expert}" if expert else shared}
+
+    parts = [{"type": "text", "text": shared, "cache_control": {"type": "ephemeral"}}]
+    if expert:
+        parts.append({"type": "text", "text": expert})
+    return {"role": "user", "content": parts}
+
+def build_messages(
+    model: str,
+    system: str,
+    shared_content: str,
+    expert_content: str = ""
+) -> List[Dict[str, Any]]:
+    """[system (stage instructions), user (shared content, then the per-expert part)] for one stage call"""
+    return [
+        {"role": "system", "content": system},
+        user_message(model, shared_content, expert_content)
+    ]
+
+class PromptCacheStats:
+    """Prompt and cached prompt token totals per model, from provider usage"""
+
+    def __init__(self):
+        self.models: Dict[str, Dict[str, int]] = {}
+
+    def record(self, model: str, usage: Optional[Dict[str, Any]]) -> int:
+        """Add one call's usage; returns its cached token count"""
+        usage = usage or {}
+        cached = cached_tokens(usage)
+        stats = self.models.setdefault(model, {"calls": 0, "prompt_tokens": 0, "cached_tokens": 0})
+        stats["calls"] += 1
+        stats["prompt_tokens"] += int(usage.get("prompt_tokens") or 0)
+        stats["cached_tokens"] += cached
+        return cached
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            model: {
+                **stats,
+                "hit_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0
+            }
+            for model, stats in self.models.items()
+        }
+
+def cached_tokens(usage: Optional[Dict[str, Any]]) -> int:
+    """Cached prompt tokens from an OpenAI-style usage block (0 if not reported)"""
+    details = (usage or {}).get("prompt_tokens_details") or {}
+    return int(details.get("cached_tokens") or 0)
+
+@lru_cache(maxsize=1)
+def get_cache_stats() -> PromptCacheStats:
+    """Process-wide prompt cache statistics"""
+    return PromptCacheStats()
@@ -0,0 +1,288 @@
+"""
+LLM providers behind LLMClient.
+
+Every provider implements the same request contract and returns
+{"content", "finish_reason" ("stop" | "length" | ...), "usage"} with
+OpenAI-style usage keys, or None on failure.
+
+    OpenRouterProvider        any model, via openrouter.ai (default)
+    OpenAICompatibleProvider  "openai/..." models straight to the OpenAI API
+    GeminiProvider            "google/..." models straight to the Gemini API
+
+ProviderRouter sends a request to the direct provider for the model's prefix
+when its API key is configured (`providers` in config.yaml) and falls
+back to OpenRouter if that fails. Latency and errors are tracked per provider,
+and each direct provider has a circuit breaker: while it is open, requests go
+straight to OpenRouter instead of waiting for the degraded direct route to
+fail first.
+"""
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Any, Optional
+from .circuit_breaker import CircuitBreaker, DEFAULT_BREAKER
+from .router import ModelStats
+
+DEFAULT_PROVIDERS = {
+    "enabled": True,
+    # Model prefix -> direct provider name
+    "prefixes": {"openai/": "openai", "google/": "gemini"},
+    "fallback_to_openrouter": True,
+    # Timeout for a direct attempt that can fall back (None = the call's timeout)
+    "direct_timeout_seconds": None,
+    # Per-provider breaker settings, over circuit_breaker.DEFAULT_BREAKER
+    "circuit_breaker": {},
+    # Calls kept per provider for the latency/error stats
+    "window_size": 200,
+    "openai_base_url": "https://api.openai.com/v1",
+    "gemini_base_url": "https://generativelanguage.googleapis.com/v1beta"
+}
+
+def _flatten(content: Any) -> str:
+    """Multipart message content (e.g. with cache_control parts) -> plain text"""
+    if isinstance(content, list):
+        return "\n\n".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+class Provider(ABC):
+    name = "provider"
+
+    @abstractmethod
+    async def request(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        timeout: int,
+        stop: Optional[List[str]]
+    ) -> Optional[Dict[str, Any]]:
+        """One chat request; the result dict described above, or None on failure"""
+
+    async def _post(self, url: str, payload: Dict[str, Any], headers: Dict[str, str], timeout: int, model: str) -> Optional[Dict[str, Any]]:
+        """POST JSON and return the decoded body, or None on any failure"""
+        # Imported on first request so CLI tools and workers start fast
+        import aiohttp
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(
+                    url,
+                    json=payload,
+                    headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+                ) as response:
+                    if response.status == 200:
+                        return await response.json()
+                    error_text = await response.text()
+                    print(f"{self.name} API Error {response.status}: {error_text}")
+                    return None
+        except asyncio.TimeoutError:
+            print(f"Timeout error for model {model} ({self.name})")
+            return None
+        except Exception as e:
+            print(f"Error querying model {model} ({self.name}): {str(e)}")
+            return None
+
+class OpenAICompatibleProvider(Provider):
+    """Chat Completions API; `strip_prefix` maps "openai/gpt-4o" to "gpt-4o" """
+
+    def __init__(self, name: str, api_key: Optional[str], base_url: str, strip_prefix: str = ""):
+        self.name = name
+        self.api_key = api_key
+        self.base_url = base_url
+        self.strip_prefix = strip_prefix
+
+    def payload(self, model: str, messages: List[Dict[str, Any]], temperature: float, max_tokens: int, stop: Optional[List[str]]) -> Dict[str, Any]:
+        if self.strip_prefix and model.startswith(self.strip_prefix):
+            model = model[len(self.strip_prefix):]
+        payload = {
+            "model": model,
+            "messages": [{**m, "content": _flatten(m.get("content"))} for m in messages],
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+        }
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+    async def request(self, model, messages, temperature, max_tokens, timeout, stop):
+        data = await self._post(
+            f"{self.base_url}/chat/completions",
+            self.payload(model, messages, temperature, max_tokens, stop),
+            {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+            timeout,
+            model
+        )
+        if data is None:
+            return None
+        try:
+            message = data["choices"][0]["message"]
+            result = {
+                "content": message["content"],
+                "finish_reason": data["choices"][0].get("finish_reason"),
+                "usage": data.get("usage") or {}
+            }
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Unexpected {self.name} response for {model}: {e}")
+            return None
+        # Include reasoning details if available (for o1 models)
+        if "reasoning_details" in message:
+            result["reasoning_details"] = message["reasoning_details"]
+        return result
+
+class OpenRouterProvider(OpenAICompatibleProvider):
+    """OpenRouter accepts every model id as is"""
+
+    def __init__(self, api_key: Optional[str], base_url: str = "https://openrouter.ai/api/v1"):
+        super().__init__("openrouter", api_key, base_url)
+
+    def payload(self, model, messages, temperature, max_tokens, stop):
+        payload = {
+            "model": model,
+            # Multipart content is kept: it carries cache_control breakpoints
+            "messages": messages,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            # Ask OpenRouter for detailed usage, including cached prompt tokens
+            "usage": {"include": True},
+        }
+        if stop:
+            payload["stop"] = stop
+        return payload
+
+class GeminiProvider(Provider):
+    """Native Gemini generateContent API for "google/..." models"""
+
+    name = "gemini"
+
+    # Gemini finish reasons -> OpenAI-style ones used by the budget
+    FINISH_REASONS = {"STOP": "stop", "MAX_TOKENS": "length"}
+
+    def __init__(self, api_key: Optional[str], base_url: str):
+        self.api_key = api_key
+        self.base_url = base_url
+
+    async def request(self, model, messages, temperature, max_tokens, timeout, stop):
+        system = "\n\n".join(_flatten(m.get("content")) for m in messages if m.get("role") == "system")
+        contents = [
+            {"role": "model" if m.get("role") == "assistant" else "user", "parts": [{"text": _flatten(m.get("content"))}]}
+            for m in messages if m.get("role") != "system"
+        ]
+        payload: Dict[str, Any] = {
+            "contents": contents,
+            "generationConfig": {"temperature": temperature, "maxOutputTokens": max_tokens}
+        }
+        if system:
+            payload["systemInstruction"] = {"parts": [{"text": system}]}
+        if stop:
+            payload["generationConfig"]["stopSequences"] = stop
+
+        native_model = model.split("/", 1)[1] if model.startswith("google/") else model
+        data = await self._post(
+            f"{self.base_url}/models/{native_model}:generateContent",
+            payload,
+            {"x-goog-api-key": self.api_key or "", "Content-Type": "application/json"},
+            timeout,
+            model
+        )
+        if data is None:
+            return None
+        try:
+            candidate = data["candidates"][0]
+            content = "".join(part.get("text", "") for part in candidate["content"]["parts"])
+        except (KeyError, IndexError, TypeError) as e:
+            print(f"Unexpected gemini response for {model}: {e}")
+            return None
+        meta = data.get("usageMetadata") or {}
+        return {
+            "content": content,
+            "finish_reason": self.FINISH_REASONS.get(candidate.get("finishReason"), candidate.get("finishReason")),
+            "usage": {
+                "prompt_tokens": meta.get("promptTokenCount", 0),
+                "completion_tokens": meta.get("candidatesTokenCount", 0),
+                "prompt_tokens_details": {"cached_tokens": meta.get("cachedContentTokenCount", 0)}
+            }
+        }
+
+class ProviderRouter:
+    """Picks the provider for each model and keeps per-provider latency stats and breakers"""
+
+    def __init__(self, openrouter: OpenRouterProvider, providers_config: Optional[Dict[str, Any]] = None):
+        from .config import get_settings
+
+        settings = get_settings()
+        if providers_config is None:
+            providers_config = settings.raw.get("providers", {}) or {}
+        self.settings = {**DEFAULT_PROVIDERS, **providers_config}
+        self.openrouter = openrouter
+        self.direct: Dict[str, Provider] = {}
+        if settings.openai_api_key:
+            self.direct["openai"] = OpenAICompatibleProvider(
+                "openai", settings.openai_api_key, self.settings["openai_base_url"], strip_prefix="openai/"
+            )
+        if settings.gemini_api_key:
+            self.direct["gemini"] = GeminiProvider(settings.gemini_api_key, self.settings["gemini_base_url"])
+        self.stats: Dict[str, ModelStats] = {}
+        self.breaker_settings = {**DEFAULT_BREAKER, **(self.settings["circuit_breaker"] or {})}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def provider_for(self, model: str) -> Provider:
+        if self.settings["enabled"]:
+            for prefix, name in self.settings["prefixes"].items():
+                if model.startswith(prefix) and name in self.direct:
+                    return self.direct[name]
+        return self.openrouter
+
+    def breaker(self, provider: Provider) -> CircuitBreaker:
+        if provider.name not in self.breakers:
+            self.breakers[provider.name] = CircuitBreaker(self.breaker_settings)
+        return self.breakers[provider.name]
+
+    async def _timed(self, provider: Provider, model: str, *args) -> Optional[Dict[str, Any]]:
+        start = time.monotonic()
+        result = None
+        try:
+            result = await provider.request(model, *args)
+        finally:
+            # Also runs on cancellation so a half-open probe is always released
+            latency = time.monotonic() - start
+            stats = self.stats.setdefault(provider.name, ModelStats(self.settings["window_size"]))
+            stats.record(result is not None, latency, None)
+            if provider is not self.openrouter:
+                self.breaker(provider).record(result is not None, latency)
+        if result is not None:
+            result["provider"] = provider.name
+        return result
+
+    async def request(
+        self,
+        model: str,
+        messages: List[Dict[str, Any]],
+        temperature: float,
+        max_tokens: int,
+        timeout: int,
+        stop: Optional[List[str]]
+    ) -> Optional[Dict[str, Any]]:
+        """Send via the model's direct provider, falling back to OpenRouter"""
+        provider = self.provider_for(model)
+        args = (messages, temperature, max_tokens, timeout, stop)
+        if provider is self.openrouter or not self.settings["fallback_to_openrouter"]:
+            return await self._timed(provider, model, *args)
+
+        if not self.breaker(provider).allow():
+            return await self._timed(self.openrouter, model, *args)
+        direct_timeout = self.settings["direct_timeout_seconds"]
+        direct_args = (messages, temperature, max_tokens, min(timeout, direct_timeout) if direct_timeout else timeout, stop)
+        result = await self._timed(provider, model, *direct_args)
+        if result is None:
+            print(f"{provider.name} failed for {model}, retrying via OpenRouter")
+            result = await self._timed(self.openrouter, model, *args)
+        return result
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {
+            "direct": sorted(self.direct),
+            "stats": {name: stats.snapshot(0.9) for name, stats in self.stats.items()},
+            "breakers": {name: breaker.snapshot() for name, breaker in self.breakers.items()}
+        }
@@ -1,9 +1,15 @@
 import json
 import asyncio
 import re
-from typing import Dict, List, Any, Tuple
-from .llm_client import LLMClient
-from .config import NOTARY_MODEL
+import time
+from typing import Dict, List, Any, Tuple, Optional, Awaitable
+from .llm_client import get_client, model_substitution
+from .config import get_settings
+from .budget import get_budget, CHARS_PER_TOKEN
+from .router import get_router
+from .prompts import build_messages, role_block
+from .similarity import cosine_similarity, stance_text
+from .tracing import traced, span
 
 def _parse_json_from_response(response_text: str) -> Dict[str, Any]:
     """Helper to extract JSON from response text"""
@@ -19,15 +25,59 @@ def _parse_json_from_response(response_text: str) -> Dict[str, Any]:
                 pass
     return {}
 
+def _with_substitution(entry: Dict[str, Any], response: Any) -> Dict[str, Any]:
+    """Record on a stage output entry that a failover model answered instead"""
+    substitution = model_substitution(response)
+    if substitution:
+        entry["model_substitution"] = substitution
+    return entry
+
+def _equal_distribution(proposed_solutions: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+    """Fallback Stage 4 scores: spread the points budget evenly across solutions"""
+    from .scoring import normalize_allocation, POINTS_BUDGET
+    
+    solution_ids = [str(sol.get("id", "")) for sol in proposed_solutions]
+    score_map = normalize_allocation({}, solution_ids, POINTS_BUDGET)
+    return [
+        {
+            "id": sol.get("id", ""),
+            "text": sol.get("text", ""),
+            "points": score_map[sol_id]
+        }
+        for sol, sol_id in zip(proposed_solutions, solution_ids)
+    ]
+
+# Stage instructions shared by every expert; role details go at the end of the user message
+STAGE1_SYSTEM = """You are a specialized expert analyst with a specific role and perspective.
+
+Provide an initial analysis of the problem that has been presented to you. Structure your response as valid JSON:
+
+{
+  "initial_recommendation": "Markdown of your reasoning to support your position (max 6 sentences)",
+  "one_sentence_summary": "A one sentence chat-like message that explains your overall position",
+  "critical_points_to_consider": {
+    "1": "First key point",
+    "2": "Second key point",
+    "3": "Third key point"
+  }
+}
+
+Be thorough but concise. Focus on YOUR unique perspective and expertise."""
+
+@traced("stage1_expert_responses")
 async def stage1_expert_responses(
     normalized_problem: str,
     key_dimensions: List[str],
-    agents: List[Dict[str, str]]
+    agents: List[Dict[str, str]],
+    speculative: Optional[Dict[str, Awaitable[Dict[str, Any]]]] = None
 ) -> Dict[str, Any]:
     """
     Stage 1: Query all experts in parallel for initial analyses.
     
     agents: [{"role_name": str, "role_mission": str, "llm_model": str, "agent_id": str}, ...]
+    speculative: optional {agent_id: awaitable} of analyses already started
+    for exactly these agents (see speculation.py); those are awaited instead
+    of queried again.
     
     Returns: {
         "expert_1": {
@@ -38,111 +88,101 @@ async def stage1_expert_responses(
         ...
     }
     """
-    client = LLMClient()
+    speculative = speculative or {}
+    entries = await asyncio.gather(*[
+        speculative[agent["agent_id"]] if agent["agent_id"] in speculative
+        else stage1_expert_response(normalized_problem, key_dimensions, agent)
+        for agent in agents
+    ])
+    return {agent["agent_id"]: entry for agent, entry in zip(agents, entries)}
+
+async def stage1_expert_response(
+    normalized_problem: str,
+    key_dimensions: List[str],
+    agent: Dict[str, str]
+) -> Dict[str, Any]:
+    """Stage 1 analysis of a single expert"""
+    client = get_client()
+    budget = get_budget()
+    agent_id = agent["agent_id"]
     
-    system_prompt_template = """You are a specialized expert analyst with a specific role and perspective.
-
-Your role: {role_name}
-Your mission: {role_mission}
-
-Provide an initial analysis of the problem that has been presented to you. Structure your response as valid JSON:
-
-{{
-  "initial_recommendation": "Markdown of your reasoning to support your position (max 6 sentences)",
-  "one_sentence_summary": "A one sentence chat-like message that explains your overall position",
-  "critical_points_to_consider": {{
-    "1": "First key point",
-    "2": "Second key point",
-    "3": "Third key point"
-  }}
-}}
-
-Be thorough but concise. Focus on YOUR unique perspective and expertise."""
-
     problem_prompt = f"""Analyze this problem from your expert perspective:
 
 Problem: {normalized_problem}
 
 Key dimensions to consider:
-{chr(10).join(f"- {dim}" for dim in key_dimensions)}
-
-Provide your initial analysis now."""
-
-    # Build queries for parallel execution
-    queries = []
-    agent_ids = []
+{chr(10).join(f"- {dim}" for dim in key_dimensions)}"""
     
-    for agent in agents:
-        system_prompt = system_prompt_template.format(
-            role_name=agent["role_name"],
-            role_mission=agent["role_mission"]
-        )
-        
-        queries.append((
+    response = await client.query_model(
+        model=agent["llm_model"],
+        messages=build_messages(
             agent["llm_model"],
-            [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": problem_prompt}
-            ],
-            0.7,
-            2000
-        ))
-        agent_ids.append(agent["agent_id"])
-    
-    # Execute in parallel
-    responses = await client.query_models_parallel(queries)
+            STAGE1_SYSTEM,
+            problem_prompt,
+            f"{role_block(agent)}\n\nProvide your initial analysis now."
+        ),
+        trace_attributes={"agent.id": agent_id},
+        **budget.params("expert", agent["llm_model"])
+    )
+    response = budget.record("expert", agent["llm_model"], response)
     
-    # Process responses
-    result = {}
-    for i, (agent_id, response) in enumerate(zip(agent_ids, responses)):
-        agent = agents[i]
-        if response:
-            try:
-                parsed = _parse_json_from_response(response["content"])
-                result[agent_id] = {
-                    "role_name": agent["role_name"],
-                    "initial_recommendation": parsed.get("initial_recommendation", ""),
-                    "one_sentence_summary": parsed.get("one_sentence_summary", ""),
-                    "critical_points_to_consider": parsed.get("critical_points_to_consider", {})
-                }
-            except Exception as e:
-                print(f"Error parsing response for {agent_id}: {e}")
-                result[agent_id] = {
-                    "role_name": agent["role_name"],
-                    "initial_recommendation": response["content"][:500],
-                    "one_sentence_summary": "See full analysis",
-                    "critical_points_to_consider": {"1": response["content"][:300]}
-                }
-        else:
-            result[agent_id] = {
+    if response:
+        try:
+            parsed = _parse_json_from_response(response["content"])
+            entry = {
                 "role_name": agent["role_name"],
-                "initial_recommendation": "Response not available",
-                "one_sentence_summary": "Failed to generate analysis",
-                "critical_points_to_consider": {}
+                "llm_model": agent["llm_model"],
+                "initial_recommendation": parsed.get("initial_recommendation", ""),
+                "one_sentence_summary": parsed.get("one_sentence_summary", ""),
+                "critical_points_to_consider": parsed.get("critical_points_to_consider", {})
             }
-    
-    return result
+        except Exception as e:
+            print(f"Error parsing response for {agent_id}: {e}")
+            entry = {
+                "role_name": agent["role_name"],
+                "llm_model": agent["llm_model"],
+                "initial_recommendation": response["content"][:500],
+                "one_sentence_summary": "See full analysis",
+                "critical_points_to_consider": {"1": response["content"][:300]}
+            }
+    else:
+        entry = {
+            "role_name": agent["role_name"],
+            "llm_model": agent["llm_model"],
+            "initial_recommendation": "Response not available",
+            "one_sentence_summary": "Failed to generate analysis",
+            "critical_points_to_consider": {}
+        }
+    return _with_substitution(entry, response)
 
+@traced("stage2_expert_rebuttals")
 async def stage2_expert_rebuttals(
     normalized_problem: str,
     agents: List[Dict[str, str]],
     stage1_responses: Dict[str, Any]
-) -> Tuple[Dict[str, Any], Dict[str, str]]:
+) -> Tuple[Dict[str, Any], Dict[str, str], Dict[str, Any]]:
     """
     Stage 2: Experts read each other's analyses and provide rebuttals.
     
-    Returns: (rebuttal_responses, label_to_model mapping)
+    Runs up to `deliberation.rebuttals.max_rounds` rounds. From round 2 on,
+    each expert answers the other's latest refined stance. Between rounds a
+    local check compares the experts' stances; rounds stop early once they
+    converge, stop moving, or the time/token budget would be exceeded.
+    Each entry holds the expert's final round; earlier rounds are kept
+    under "previous_rounds".
+    
+    Returns: (rebuttal_responses, label_to_model mapping, deliberation info)
+    deliberation: {"rounds": int, "stop_reason": str, "similarity": [float, ...]}
     """
-    client = LLMClient()
+    client = get_client()
+    budget = get_budget()
     
     # Create anonymized labels for other responses
     agent_ids = list(stage1_responses.keys())
     label_to_model = {}
     
-    system_prompt_template = """You are a specialized expert analyst with a specific role and perspective.
-
-Your role: {role_name}
-Your mission: {role_mission}
+    # Stage instructions shared by every expert; role details go at the end of the user message
+    system_prompt = """You are a specialized expert analyst with a specific role and perspective.
 
 You have already provided an initial analysis. Now, you are seeing the initial analysis from another expert.
 
@@ -154,101 +194,259 @@ Read their analysis carefully, analyse critically and be autocritical with yours
 
 Structure your response as valid JSON:
 
-{{
+{
   "final_stance": "Your refined position after considering the other expert's perspective",
   "one_sentence_summary": "A concise short chat-like message that explains your refined position",
-  "critical_points_to_consider": {{
+  "critical_points_to_consider": {
     "1": "Most relevant point",
     "2": "Second most relevant point",
     "3": "Final point"
-  }},
+  },
   "critical_evaluation": "Your overall evaluation of the problem given both perspectives"
-}}
+}
 
 IMPORTANT
 - Consider that the other expert does does not need to have the same perspective as you, so focus on how both analyses can be merged or contrasted to improve overall understanding."""
 
-    result = {}
+    settings = _rebuttal_settings()
+    started = time.monotonic()
     
-    # Process each expert sequentially or in parallel (can be either)
+    # Pair each expert with the other one (two-expert panel)
+    pairs = []
     for i, agent in enumerate(agents):
-        # Get the other expert's response
         other_agent_id = agent_ids[1 - i] if len(agent_ids) == 2 else None
         
         if not other_agent_id or other_agent_id not in stage1_responses:
             continue
         
-        other_response = stage1_responses[other_agent_id]
-        
         # Create anonymized label
         label = f"Response Expert {1 if i == 0 else 2}"
         label_to_model[label] = agent["llm_model"]
-        
-        system_prompt = system_prompt_template.format(
-            role_name=agent["role_name"],
-            role_mission=agent["role_mission"]
+        pairs.append((agent, other_agent_id))
+    
+    deliberation = {"rounds": 0, "stop_reason": "max_rounds", "similarity": []}
+    
+    # Experts that already agree after Stage 1 may skip rebuttals entirely
+    if settings["min_rounds"] == 0 and len(pairs) == 2:
+        similarity = cosine_similarity(
+            stance_text(stage1_responses[pairs[0][0]["agent_id"]]),
+            stance_text(stage1_responses[pairs[1][0]["agent_id"]])
         )
+        deliberation["similarity"].append(round(similarity, 3))
+        if similarity >= settings["convergence_threshold"]:
+            deliberation["stop_reason"] = "converged"
+            return {}, label_to_model, deliberation
+    
+    result = {}
+    history = {agent["agent_id"]: [] for agent, _ in pairs}
+    tokens_used = 0
+    
+    for round_number in range(1, settings["max_rounds"] + 1):
+        round_started = time.monotonic()
+        previous = dict(result)
+        
+        # Both experts answer the other's latest position in parallel
+        with span("stage2.round", **{"rebuttal.round": round_number}):
+            responses = await asyncio.gather(*[
+                _rebuttal_call(
+                    client,
+                    budget,
+                    agent,
+                    system_prompt,
+                    normalized_problem,
+                    _rebuttal_prompt(agent, other_agent_id, stage1_responses, previous)
+                )
+                for agent, other_agent_id in pairs
+            ])
+        
+        for (agent, other_agent_id), response in zip(pairs, responses):
+            agent_id = agent["agent_id"]
+            tokens_used += _completion_tokens(response)
+            
+            # A failed later round keeps the expert's last good stance
+            if not response and agent_id in previous:
+                continue
+            
+            if agent_id in previous:
+                history[agent_id].append(_round_summary(round_number - 1, previous[agent_id]))
+            result[agent_id] = _with_substitution(
+                _parse_rebuttal(agent, stage1_responses[other_agent_id].get("role_name", ""), response),
+                response
+            )
+        
+        deliberation["rounds"] = round_number
         
+        if round_number >= settings["max_rounds"]:
+            break
+        
+        if round_number >= settings["min_rounds"] and len(result) == 2:
+            entries = [result[agent["agent_id"]] for agent, _ in pairs]
+            similarity = cosine_similarity(stance_text(entries[0]), stance_text(entries[1]))
+            deliberation["similarity"].append(round(similarity, 3))
+            
+            if similarity >= settings["convergence_threshold"]:
+                deliberation["stop_reason"] = "converged"
+                break
+            
+            # Nobody moved since the last round: another round will not either
+            if previous and all(
+                agent["agent_id"] in previous and cosine_similarity(
+                    stance_text(previous[agent["agent_id"]]),
+                    stance_text(result[agent["agent_id"]])
+                ) >= settings["stability_threshold"]
+                for agent, _ in pairs
+            ):
+                deliberation["stop_reason"] = "stable"
+                break
+        
+        # Stop if another round like this one would overrun the budgets
+        elapsed = time.monotonic() - started
+        round_seconds = time.monotonic() - round_started
+        if elapsed + round_seconds > settings["max_seconds"]:
+            deliberation["stop_reason"] = "time_budget"
+            break
+        if tokens_used + tokens_used / round_number > settings["max_completion_tokens"]:
+            deliberation["stop_reason"] = "token_budget"
+            break
+    
+    for agent_id, rounds in history.items():
+        if rounds and agent_id in result:
+            result[agent_id]["previous_rounds"] = rounds
+    
+    return result, label_to_model, deliberation
+
+def _rebuttal_settings() -> Dict[str, Any]:
+    """Multi-round rebuttal settings from config.yaml (deliberation.rebuttals)"""
+    defaults = {
+        "max_rounds": 1,
+        "min_rounds": 1,
+        "convergence_threshold": 0.6,
+        "stability_threshold": 0.85,
+        "max_seconds": 120,
+        "max_completion_tokens": 8000
+    }
+    return {**defaults, **get_settings().deliberation.get("rebuttals", {})}
+
+def _point_list(points: Any) -> List[str]:
+    """critical_points_to_consider as a list: models return a {"1": ...} object, a list or a single string"""
+    if isinstance(points, dict):
+        return [str(p) for p in points.values()]
+    if isinstance(points, list):
+        return [str(p) for p in points]
+    return [str(points)] if points else []
+
+def _rebuttal_prompt(
+    agent: Dict[str, str],
+    other_agent_id: str,
+    stage1_responses: Dict[str, Any],
+    previous: Dict[str, Any]
+) -> str:
+    """Per-expert part of one rebuttal prompt: the other expert's Stage 1 analysis, or their latest rebuttal"""
+    agent_id = agent["agent_id"]
+    
+    if other_agent_id not in previous:
+        other_response = stage1_responses[other_agent_id]
         other_analysis = f"""Their one-sentence summary: {other_response.get('one_sentence_summary', '')}
 
 Their initial recommendation: {other_response.get('initial_recommendation', '')}
 
 Their key reasoning points:
-{chr(10).join(f"- {other_response.get('critical_points_to_consider', {}).get(str(k), '')}" for k in range(1, 4)) if other_response.get('critical_points_to_consider') else ""}"""
+{chr(10).join(f"- {p}" for p in _point_list(other_response.get('critical_points_to_consider'))[:3])}"""
         
-        rebuttal_prompt = f"""The problem was: {normalized_problem}
-
-Your original analysis summary: {stage1_responses[agent["agent_id"]].get("one_sentence_summary", "")}
+        return f"""Your original analysis summary: {stage1_responses[agent_id].get("one_sentence_summary", "")}
 
 Here is another expert's initial analysis:
 
 {other_analysis}
 
 Now provide your rebuttal and refined analysis:"""
-        
-        response = await client.query_model(
-            model=agent["llm_model"],
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": rebuttal_prompt}
-            ],
-            temperature=0.7,
-            max_tokens=1500
-        )
-        
-        if response:
-            try:
-                parsed = _parse_json_from_response(response["content"])
-                result[agent["agent_id"]] = {
-                    "role_name": agent["role_name"],
-                    "other_expert_role": stage1_responses[other_agent_id].get("role_name", ""),
-                    "final_stance": parsed.get("final_stance", ""),
-                    "one_sentence_summary": parsed.get("one_sentence_summary", ""),
-                    "critical_points_to_consider": parsed.get("critical_points_to_consider", {}),
-                    "critical_evaluation": parsed.get("critical_evaluation", "")
-                }
-            except Exception as e:
-                print(f"Error parsing rebuttal for {agent['agent_id']}: {e}")
-                result[agent["agent_id"]] = {
-                    "role_name": agent["role_name"],
-                    "other_expert_role": stage1_responses[other_agent_id].get("role_name", ""),
-                    "final_stance": response["content"][:500],
-                    "one_sentence_summary": "See full analysis",
-                    "critical_points_to_consider": {},
-                    "critical_evaluation": ""
-                }
-        else:
-            result[agent["agent_id"]] = {
+    
+    other_response = previous[other_agent_id]
+    own_summary = previous.get(agent_id, stage1_responses[agent_id]).get("one_sentence_summary", "")
+    points_text = chr(10).join(f"- {p}" for p in _point_list(other_response.get("critical_points_to_consider")))
+    
+    return f"""Your latest position summary: {own_summary}
+
+The other expert has responded to you with a refined stance:
+
+Their one-sentence summary: {other_response.get('one_sentence_summary', '')}
+
+Their refined stance: {other_response.get('final_stance', '')}
+
+Their key reasoning points:
+{points_text}
+
+Now provide your rebuttal and refined analysis:"""
+
+async def _rebuttal_call(
+    client: Any,
+    budget: Any,
+    agent: Dict[str, str],
+    system_prompt: str,
+    normalized_problem: str,
+    rebuttal_prompt: str
+) -> Any:
+    response = await client.query_model(
+        model=agent["llm_model"],
+        messages=build_messages(
+            agent["llm_model"],
+            system_prompt,
+            f"The problem was: {normalized_problem}",
+            f"{role_block(agent)}\n\n{rebuttal_prompt}"
+        ),
+        trace_attributes={"agent.id": agent["agent_id"]},
+        **budget.params("rebuttal", agent["llm_model"])
+    )
+    return budget.record("rebuttal", agent["llm_model"], response)
+
+def _parse_rebuttal(agent: Dict[str, str], other_expert_role: str, response: Any) -> Dict[str, Any]:
+    """Stage 2 entry for one expert from their rebuttal response (or its failure)"""
+    if response:
+        try:
+            parsed = _parse_json_from_response(response["content"])
+            return {
+                "role_name": agent["role_name"],
+                "other_expert_role": other_expert_role,
+                "final_stance": parsed.get("final_stance", ""),
+                "one_sentence_summary": parsed.get("one_sentence_summary", ""),
+                "critical_points_to_consider": parsed.get("critical_points_to_consider", {}),
+                "critical_evaluation": parsed.get("critical_evaluation", "")
+            }
+        except Exception as e:
+            print(f"Error parsing rebuttal for {agent['agent_id']}: {e}")
+            return {
                 "role_name": agent["role_name"],
-                "other_expert_role": stage1_responses[other_agent_id].get("role_name", ""),
-                "final_stance": "Rebuttal not available",
-                "one_sentence_summary": "Failed to generate rebuttal",
+                "other_expert_role": other_expert_role,
+                "final_stance": response["content"][:500],
+                "one_sentence_summary": "See full analysis",
                 "critical_points_to_consider": {},
                 "critical_evaluation": ""
             }
-    
-    return result, label_to_model
+    return {
+        "role_name": agent["role_name"],
+        "other_expert_role": other_expert_role,
+        "final_stance": "Rebuttal not available",
+        "one_sentence_summary": "Failed to generate rebuttal",
+        "critical_points_to_consider": {},
+        "critical_evaluation": ""
+    }
+
+def _round_summary(round_number: int, entry: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact record of an expert's stance in an earlier rebuttal round"""
+    return {
+        "round": round_number,
+        "final_stance": entry.get("final_stance", ""),
+        "one_sentence_summary": entry.get("one_sentence_summary", ""),
+        "critical_points_to_consider": entry.get("critical_points_to_consider", {})
+    }
+
+def _completion_tokens(response: Any) -> int:
+    if not response:
+        return 0
+    tokens = (response.get("usage") or {}).get("completion_tokens")
+    return int(tokens) if tokens else len(response.get("content") or "") // CHARS_PER_TOKEN
 
+@traced("stage3_notary_synthesis")
 async def stage3_notary_synthesis(
     normalized_problem: str,
     stage1_responses: Dict[str, Any],
@@ -257,16 +455,112 @@ async def stage3_notary_synthesis(
     """
     Stage 3: Notary synthesizes discussion and extracts unique solutions.
     
+    In "single" mode one Notary call reads every Stage 1/2 output. In
+    "map_reduce" mode each expert's outputs are first condensed in parallel
+    by a cheaper model (summary + candidate solutions), and one Notary call
+    merges and deduplicates those, so the final prompt stays small as the
+    panel grows. "auto" picks map_reduce for large panels or long prompts
+    (deliberation.notary in config.yaml). Near-duplicate solutions are then
+    merged locally and the list is capped (deliberation.solutions).
+    
     Returns: {
         "summary_markdown": str,
         "proposed_solutions": [
             {"id": "1", "text": "Solution text"},
-            {"id": "2", "text": "Solution text"},
+            {"id": "2", "text": "Solution text", "merged_ids": ["4"]},
             ...
-        ]
+        ],
+        "notary_solutions": [...],       # only if solutions were merged or capped
+        "solution_id_map": {"4": "2"}    # likewise
+    }
+    """
+    # Only the final rebuttal round goes to the Notary
+    stage2_final = {
+        agent_id: {k: v for k, v in entry.items() if k != "previous_rounds"}
+        for agent_id, entry in stage2_responses.items()
+    }
+    
+    settings = _notary_settings()
+    mode = settings["mode"]
+    if mode == "auto":
+        prompt_chars = len(json.dumps(stage1_responses)) + len(json.dumps(stage2_final))
+        large = len(stage1_responses) >= settings["map_reduce_min_experts"] or prompt_chars > settings["max_prompt_chars"]
+        mode = "map_reduce" if large else "single"
+    
+    if mode == "map_reduce":
+        synthesis = await _notary_map_reduce(normalized_problem, stage1_responses, stage2_final, settings)
+    else:
+        synthesis = await _notary_single(normalized_problem, stage1_responses, stage2_final)
+    return _dedupe_synthesis(synthesis)
+
+def _solution_settings() -> Dict[str, Any]:
+    """Local solution dedup settings from config.yaml (deliberation.solutions)"""
+    defaults = {
+        "dedupe": True,
+        "similarity_threshold": 0.75,
+        "max_solutions": 8
     }
+    return {**defaults, **get_settings().deliberation.get("solutions", {})}
+
+def _dedupe_synthesis(synthesis: Dict[str, Any]) -> Dict[str, Any]:
     """
-    client = LLMClient()
+    Merge near-duplicate proposed solutions and cap their number before
+    Stage 4. The Notary's original list is kept as `notary_solutions` and
+    `solution_id_map` maps each original id to the id it was scored under
+    (None if capped away).
+    """
+    settings = _solution_settings()
+    solutions = synthesis.get("proposed_solutions") or []
+    if not settings["dedupe"] or not solutions:
+        return synthesis
+    
+    from .dedup import dedupe_solutions
+    deduped, id_map = dedupe_solutions(solutions, settings["similarity_threshold"], settings["max_solutions"])
+    if len(deduped) < len(solutions):
+        synthesis["notary_solutions"] = solutions
+        synthesis["proposed_solutions"] = deduped
+        synthesis["solution_id_map"] = id_map
+    return synthesis
+
+def _notary_settings() -> Dict[str, Any]:
+    """Stage 3 synthesis settings from config.yaml (deliberation.notary)"""
+    defaults = {
+        "mode": "auto",
+        "map_reduce_min_experts": 3,
+        "max_prompt_chars": 24000,
+        "map_model": None
+    }
+    return {**defaults, **get_settings().deliberation.get("notary", {})}
+
+NOTARY_SYSTEM = "You are a Notary synthesizing expert deliberation. Return ONLY valid JSON, no other text."
+
+NOTARY_OUTPUT = """Return only valid JSON:
+{
+  "summary_markdown": "A bulleted markdown summary capturing the key points of the expert discussion, with headers: Problem Overview, Expert Analyses, Key Agreements and Disagreements. Max 3 points per section.",
+  "proposed_solutions": [
+    {"id": "1", "text": "Solution 1 or recommendation mentioned by experts"},
+    {"id": "2", "text": "Solution 2 or recommendation mentioned by experts"},
+    {"id": "3", "text": "Solution 3 or recommendation mentioned by experts"}
+  ]
+}
+
+IMPORTANT: 
+- Each solution MUST have an "id" field (sequential: "1", "2", "3", etc.)
+- Each solution MUST have a "text" field with the full solution description
+- Solutions should be concise, unique statements that capture distinct approaches
+- Deduplicate fundamentally equivalent solutions
+- If more than 5 solutions are found, prioritize the most comprehensive or frequently mentioned ones
+- If no clear solutions emerged, return an empty list for proposed_solutions"""
+
+async def _notary_single(
+    normalized_problem: str,
+    stage1_responses: Dict[str, Any],
+    stage2_responses: Dict[str, Any]
+) -> Dict[str, Any]:
+    """One Notary call over every Stage 1 and Stage 2 output"""
+    client = get_client()
+    budget = get_budget()
+    notary_model = get_router().choose("notary", get_settings().notary_model)
     
     # Build context from all stages
     stage1_text = json.dumps(stage1_responses, indent=2)
@@ -288,34 +582,121 @@ Your job:
 2. Produce a coherent markdown summary that captures the essential debate
 3. Extract a deduplicated list of unique solutions or recommendations that appeared in the expert analyses
 
-Return only valid JSON:
-{{
-  "summary_markdown": "A bulleted markdown summary capturing the key points of the expert discussion, with headers: Problem Overview, Expert Analyses, Key Agreements and Disagreements. Max 3 points per section.",
-  "proposed_solutions": [
-    {{"id": "1", "text": "Solution 1 or recommendation mentioned by experts"}},
-    {{"id": "2", "text": "Solution 2 or recommendation mentioned by experts"}},
-    {{"id": "3", "text": "Solution 3 or recommendation mentioned by experts"}}
-  ]
-}}
-
-IMPORTANT: 
-- Each solution MUST have an "id" field (sequential: "1", "2", "3", etc.)
-- Each solution MUST have a "text" field with the full solution description
-- Solutions should be concise, unique statements that capture distinct approaches
-- Deduplicate fundamentally equivalent solutions
-- If more than 5 solutions are found, prioritize the most comprehensive or frequently mentioned ones
-- If no clear solutions emerged, return an empty list for proposed_solutions"""
+{NOTARY_OUTPUT}"""
     
     response = await client.query_model(
-        model=NOTARY_MODEL,
+        model=notary_model,
         messages=[
-            {"role": "system", "content": "You are a Notary synthesizing expert deliberation. Return ONLY valid JSON, no other text."},
+            {"role": "system", "content": NOTARY_SYSTEM},
             {"role": "user", "content": synthesis_prompt}
         ],
-        temperature=0.7,
-        max_tokens=2000
+        **budget.params("notary", notary_model)
     )
+    response = budget.record("notary", notary_model, response)
+    return _parse_synthesis(response)
+
+async def _notary_map_reduce(
+    normalized_problem: str,
+    stage1_responses: Dict[str, Any],
+    stage2_responses: Dict[str, Any],
+    settings: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Condense each expert in parallel (map), then merge and deduplicate (reduce)"""
+    client = get_client()
+    budget = get_budget()
+    config = get_settings()
+    map_model = get_router().choose("notary_map", settings["map_model"] or config.notary_model)
+    notary_model = get_router().choose("notary", config.notary_model)
+    
+    # Map: one short extraction per expert, all in parallel
+    map_system = """You condense one expert's contribution to a deliberation for a Notary.
+
+Return ONLY valid JSON:
+{
+  "summary": "3-5 sentence summary of the expert's final position, key reasoning and where it changed after the rebuttal",
+  "solutions": ["Each distinct solution or recommendation the expert proposed, one concise sentence each"]
+}"""
+    
+    agent_ids = list(stage1_responses.keys())
+    responses = await asyncio.gather(*[
+        _notary_map_call(
+            client,
+            budget,
+            map_model,
+            map_system,
+            f"""The problem under discussion:
+{normalized_problem}
+
+Expert analysis (Stage 1):
+{json.dumps(stage1_responses[agent_id], indent=2)}
+
+Expert rebuttal (Stage 2):
+{json.dumps(stage2_responses.get(agent_id, {}), indent=2)}""",
+            agent_id
+        )
+        for agent_id in agent_ids
+    ])
+    
+    condensed = []
+    for agent_id, response in zip(agent_ids, responses):
+        role_name = stage1_responses[agent_id].get("role_name", agent_id)
+        parsed = _parse_json_from_response(response["content"]) if response else {}
+        if not parsed or not isinstance(parsed, dict):
+            # Map call failed or returned a non-object: fall back to the expert's own short summaries
+            parsed = {
+                "summary": stance_text(stage2_responses.get(agent_id) or stage1_responses[agent_id]),
+                "solutions": []
+            }
+        condensed.append({"expert": role_name, **parsed})
+    
+    # Reduce: the Notary only sees the condensed contributions
+    synthesis_prompt = f"""You are a Notary - a synthesizer of expert deliberations.
+
+The problem under discussion:
+{normalized_problem}
+
+Condensed expert contributions (summary and candidate solutions per expert):
+{json.dumps(condensed, indent=2)}
+
+Your job:
+1. Synthesize the key points and areas of agreement/disagreement among experts
+2. Produce a coherent markdown summary that captures the essential debate
+3. Merge the candidate solutions into a deduplicated list of unique solutions
+
+{NOTARY_OUTPUT}"""
     
+    response = await client.query_model(
+        model=notary_model,
+        messages=[
+            {"role": "system", "content": NOTARY_SYSTEM},
+            {"role": "user", "content": synthesis_prompt}
+        ],
+        **budget.params("notary", notary_model)
+    )
+    response = budget.record("notary", notary_model, response)
+    return _parse_synthesis(response)
+
+async def _notary_map_call(
+    client: Any,
+    budget: Any,
+    model: str,
+    system_prompt: str,
+    prompt: str,
+    agent_id: str
+) -> Any:
+    response = await client.query_model(
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": prompt}
+        ],
+        trace_attributes={"agent.id": agent_id},
+        **budget.params("notary_map", model)
+    )
+    return budget.record("notary_map", model, response)
+
+def _parse_synthesis(response: Any) -> Dict[str, Any]:
+    """Stage 3 output from the Notary's response (or its failure)"""
     if response:
         try:
             parsed = _parse_json_from_response(response["content"])
@@ -336,22 +717,23 @@ IMPORTANT:
                         "text": str(sol)
                     })
             
-            return {
+            return _with_substitution({
                 "summary_markdown": parsed.get("summary_markdown", ""),
                 "proposed_solutions": validated_solutions
-            }
+            }, response)
         except Exception as e:
             print(f"Error parsing notary synthesis: {e}")
-            return {
+            return _with_substitution({
                 "summary_markdown": response["content"],
                 "proposed_solutions": []
-            }
+            }, response)
     else:
         return {
             "summary_markdown": "Synthesis not available",
             "proposed_solutions": []
         }
 
+@traced("stage4_expert_scoring")
 async def stage4_expert_scoring(
     proposed_solutions: List[Dict[str, str]],
     stage1_responses: Dict[str, Any],
@@ -374,33 +756,35 @@ async def stage4_expert_scoring(
         ...
     }
     """
-    client = LLMClient()
+    client = get_client()
+    budget = get_budget()
     
     if not proposed_solutions:
         proposed_solutions = [{"id": "1", "text": "Default solution"}]
     
-    # Build solutions list text
+    # Build solutions list text, shared by every expert's prompt
     solutions_text = "\n".join(
         f"{sol['id']}. {sol['text']}" 
         for sol in proposed_solutions
     )
-    
-    system_prompt_template = """You are a specialized expert analyst evaluating proposed solutions.
+    solutions_prompt = f"""Based on the discussion so far, please allocate exactly 10 points across these proposed solutions:
 
-Your role: {role_name}
-Your mission: {role_mission}
+{solutions_text}"""
+    
+    # Stage instructions shared by every expert; role details go at the end of the user message
+    system_prompt = """You are a specialized expert analyst evaluating proposed solutions.
 
 You must allocate exactly 10 points across the proposed solutions based on how convincing you find each one from your expert perspective.
 
 Return ONLY valid JSON:
-{{
+{
   "scores": [
-    {{"id": "1", "points": 3}},
-    {{"id": "2", "points": 5}},
-    {{"id": "3", "points": 2}}
+    {"id": "1", "points": 3},
+    {"id": "2", "points": 5},
+    {"id": "3", "points": 2}
   ],
   "reasoning": "Brief explanation of your scoring rationale"
-}}
+}
 
 CONSTRAINTS:
 - Each score MUST have an "id" field matching the solution ID
@@ -412,18 +796,11 @@ CONSTRAINTS:
     result = {}
     
     for agent in agents:
-        system_prompt = system_prompt_template.format(
-            role_name=agent["role_name"],
-            role_mission=agent["role_mission"]
-        )
-        
         # Use the correct agent_id to fetch stage1 response
         agent_id = agent["agent_id"]
         agent_stage1 = stage1_responses.get(agent_id, {})
         
-        prompt = f"""Based on the discussion so far, please allocate exactly 10 points across these proposed solutions:
-
-{solutions_text}
+        expert_prompt = f"""{role_block(agent)}
 
 Your original position summary: {agent_stage1.get("one_sentence_summary", "")}
 
@@ -431,49 +808,36 @@ Allocate your 10 points now. Solutions you consider more convincing get more poi
         
         response = await client.query_model(
             model=agent["llm_model"],
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.5,
-            max_tokens=1000
+            messages=build_messages(agent["llm_model"], system_prompt, solutions_prompt, expert_prompt),
+            trace_attributes={"agent.id": agent_id},
+            **budget.params("scoring", agent["llm_model"])
         )
+        response = budget.record("scoring", agent["llm_model"], response)
         
         if response:
             try:
                 parsed = _parse_json_from_response(response["content"])
                 scores_list = parsed.get("scores", [])
                 
-                # Validate and normalize scores
-                score_map = {}
-                total_points = 0
+                # Validate and normalize scores (largest-remainder apportionment)
+                from .scoring import normalize_allocation
                 
+                score_map = {}
                 for score_obj in scores_list:
                     if isinstance(score_obj, dict):
-                        sol_id = score_obj.get("id", "")
-                        points = int(score_obj.get("points", 0))
-                        score_map[sol_id] = points
-                        total_points += points
+                        sol_id = str(score_obj.get("id", ""))
+                        score_map[sol_id] = int(score_obj.get("points", 0))
                 
-                # If total doesn't equal 10, normalize
-                if total_points != 10 and total_points > 0:
-                    normalized_map = {}
-                    for sol_id, points in score_map.items():
-                        normalized_map[sol_id] = max(0, int(points * 10 / total_points))
-                    score_map = normalized_map
-                    # Adjust for rounding errors
-                    current_total = sum(score_map.values())
-                    if current_total < 10:
-                        # Add remaining points to first solution
-                        first_id = list(score_map.keys())[0] if score_map else ""
-                        if first_id:
-                            score_map[first_id] += (10 - current_total)
+                score_map = normalize_allocation(
+                    score_map,
+                    [str(sol.get("id", "")) for sol in proposed_solutions]
+                )
                 
                 # Build output with full solution text
                 scores_output = []
                 for sol in proposed_solutions:
                     sol_id = sol.get("id", "")
-                    points = score_map.get(sol_id, 0)
+                    points = score_map.get(str(sol_id), 0)
                     scores_output.append({
                         "id": sol_id,
                         "text": sol.get("text", ""),
@@ -488,15 +852,7 @@ Allocate your 10 points now. Solutions you consider more convincing get more poi
             except Exception as e:
                 print(f"Error parsing scoring for {agent_id}: {e}")
                 # Fallback: equal distribution
-                per_solution = 10 // len(proposed_solutions)
-                scores_output = [
-                    {
-                        "id": sol.get("id", ""),
-                        "text": sol.get("text", ""),
-                        "points": per_solution
-                    }
-                    for sol in proposed_solutions
-                ]
+                scores_output = _equal_distribution(proposed_solutions)
                 result[agent_id] = {
                     "role_name": agent["role_name"],
                     "scores": scores_output,
@@ -504,19 +860,12 @@ Allocate your 10 points now. Solutions you consider more convincing get more poi
                 }
         else:
             # Fallback: equal distribution
-            per_solution = 10 // len(proposed_solutions)
-            scores_output = [
-                {
-                    "id": sol.get("id", ""),
-                    "text": sol.get("text", ""),
-                    "points": per_solution
-                }
-                for sol in proposed_solutions
-            ]
+            scores_output = _equal_distribution(proposed_solutions)
             result[agent_id] = {
                 "role_name": agent["role_name"],
                 "scores": scores_output,
                 "reasoning": "Fallback: response not available"
             }
+        _with_substitution(result[agent_id], response)
     
     return result
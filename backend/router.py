@@ -0,0 +1,212 @@
+"""
+Latency/cost-aware model routing.
+
+Keeps rolling latency, error-rate and cost stats per (stage, model), fed by
+every LLM call, and for each stage a latency SLO on a single call. Stats are
+per stage because one model answers very differently sized calls (a short
+gatekeeper call vs. a 2000-token expert analysis). The gatekeeper and notary
+models are chosen among their allowed candidates; every `probe_every`-th
+choice goes to the candidate heard from least recently, so candidates that
+are never picked still collect samples. User-picked expert models are kept
+but produce a warning when their recent latency breaks the stage SLO.
+"""
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Deque, Tuple
+from .config import get_settings
+from .circuit_breaker import get_breakers, OPEN
+
+DEFAULT_ROUTING = {
+    "enabled": True,
+    "window_size": 50,          # calls kept per (stage, model)
+    "min_samples": 3,           # calls before a (stage, model)'s stats are trusted
+    "latency_percentile": 0.9,
+    "max_error_rate": 0.25,
+    # "configured": keep the configured model while it meets the SLO
+    # "fastest" / "cheapest": always pick the best candidate meeting the SLO
+    "prefer": "configured",
+    # Send every Nth choice for a stage to its least recently seen candidate (0 = never)
+    "probe_every": 20,
+    "slo_seconds": {},
+    "candidates": {}
+}
+
+class ModelStats:
+    """Rolling window of (timestamp, ok, latency, cost) for one model"""
+
+    def __init__(self, window_size: int):
+        self.calls: Deque[Tuple[float, bool, float, Optional[float]]] = deque(maxlen=window_size)
+
+    def record(self, ok: bool, latency: float, cost: Optional[float]) -> None:
+        self.calls.append((time.time(), ok, latency, cost))
+
+    def latency(self, percentile: float) -> Optional[float]:
+        """Latency percentile over successful calls (None without data)"""
+        latencies = sorted(latency for _, ok, latency, _ in self.calls if ok)
+        if not latencies:
+            return None
+        return latencies[min(len(latencies) - 1, int(percentile * len(latencies)))]
+
+    def error_rate(self) -> float:
+        if not self.calls:
+            return 0.0
+        return sum(1 for _, ok, _, _ in self.calls if not ok) / len(self.calls)
+
+    def avg_cost(self) -> Optional[float]:
+        costs = [cost for _, ok, _, cost in self.calls if ok and cost is not None]
+        return sum(costs) / len(costs) if costs else None
+
+    def snapshot(self, percentile: float) -> Dict[str, Any]:
+        latency = self.latency(percentile)
+        cost = self.avg_cost()
+        return {
+            "calls": len(self.calls),
+            "error_rate": round(self.error_rate(), 3),
+            "latency_p": round(latency, 3) if latency is not None else None,
+            "avg_cost": round(cost, 6) if cost is not None else None
+        }
+
+class ModelRouter:
+    """Per-(stage, model) rolling stats plus SLO-based model choice per stage"""
+
+    def __init__(self, routing_config: Optional[Dict[str, Any]] = None):
+        if routing_config is None:
+            routing_config = get_settings().raw.get("routing", {}) or {}
+        self.settings = {**DEFAULT_ROUTING, **routing_config}
+        self.stats: Dict[Tuple[str, str], ModelStats] = {}
+        self._choices: Dict[str, int] = {}
+
+    def get(self, stage: str, model: str) -> ModelStats:
+        key = (stage, model)
+        if key not in self.stats:
+            self.stats[key] = ModelStats(self.settings["window_size"])
+        return self.stats[key]
+
+    def record(self, stage: Optional[str], model: str, ok: bool, latency: float, usage: Optional[Dict[str, Any]] = None) -> None:
+        """Record one call at `stage` ("other" if unknown); cost is OpenRouter's `usage.cost` when reported"""
+        cost = (usage or {}).get("cost")
+        self.get(stage or "other", model).record(ok, latency, float(cost) if cost is not None else None)
+
+    def slo(self, stage: str) -> Optional[float]:
+        return (self.settings["slo_seconds"] or {}).get(stage)
+
+    def meets_slo(self, stage: str, model: str) -> Optional[bool]:
+        """True/False from recent stats, None when there is no SLO or too little data"""
+        slo = self.slo(stage)
+        stats = self.stats.get((stage, model))
+        if slo is None or stats is None or len(stats.calls) < self.settings["min_samples"]:
+            return None
+        latency = stats.latency(self.settings["latency_percentile"])
+        if latency is None or stats.error_rate() > self.settings["max_error_rate"]:
+            return False
+        return latency <= slo
+
+    def choose(self, stage: str, configured: str) -> str:
+        """
+        Model to use for `stage`, among `configured` and the stage's candidates.
+
+        Only models with enough data for this stage, meeting the SLO and with
+        a closed (or half-open) breaker are considered. Without any, the
+        configured model is kept. Every `probe_every`-th call goes to the
+        option heard from least recently instead (see probe()).
+        """
+        if not self.settings["enabled"]:
+            return configured
+        options = [configured] + [m for m in self.settings["candidates"].get(stage, []) if m != configured]
+        if len(options) == 1:
+            return configured
+
+        probe = self.probe(stage, options)
+        if probe:
+            return probe
+
+        breakers = get_breakers()
+        eligible = [m for m in options if self.meets_slo(stage, m) and breakers.get(m).state != OPEN]
+        if not eligible:
+            return configured
+        if self.settings["prefer"] == "configured" and configured in eligible:
+            return configured
+
+        percentile = self.settings["latency_percentile"]
+
+        def latency_key(model: str) -> float:
+            return self.get(stage, model).latency(percentile)
+
+        def cost_key(model: str) -> float:
+            cost = self.get(stage, model).avg_cost()
+            return cost if cost is not None else float("inf")
+
+        if self.settings["prefer"] == "cheapest":
+            return min(eligible, key=lambda m: (cost_key(m), latency_key(m)))
+        return min(eligible, key=lambda m: (latency_key(m), cost_key(m)))
+
+    def probe(self, stage: str, options: List[str]) -> Optional[str]:
+        """
+        On every `probe_every`-th choice for `stage`, the option (not behind
+        an open breaker) whose last call at this stage is oldest, so its stats
+        stay current; None otherwise.
+        """
+        every = self.settings["probe_every"]
+        if not every:
+            return None
+        self._choices[stage] = self._choices.get(stage, 0) + 1
+        if self._choices[stage] % every:
+            return None
+
+        breakers = get_breakers()
+
+        def last_seen(model: str) -> float:
+            stats = self.stats.get((stage, model))
+            return stats.calls[-1][0] if stats and stats.calls else 0.0
+
+        available = [m for m in options if breakers.get(m).state != OPEN]
+        return min(available, key=last_seen) if available else None
+
+    def slo_warning(self, stage: str, model: str) -> Optional[Dict[str, Any]]:
+        """Describe an expected SLO breach for `model` at `stage`, or None"""
+        if not self.settings["enabled"] or self.meets_slo(stage, model) is not False:
+            return None
+        stats = self.get(stage, model)
+        warning = {
+            "stage": stage,
+            "model": model,
+            "slo_seconds": self.slo(stage),
+            "latency_p": stats.snapshot(self.settings["latency_percentile"])["latency_p"],
+            "error_rate": round(stats.error_rate(), 3)
+        }
+        suggestion = self.choose(stage, model)
+        if suggestion == model:
+            # Experts have no stage candidates; suggest any model that meets the SLO
+            faster = [m for m in get_settings().available_model_ids if self.meets_slo(stage, m)]
+            suggestion = faster[0] if faster else None
+        warning["suggested_model"] = suggestion
+        return warning
+
+    def check_agents(self, agents: List[Dict[str, Any]], stages: Tuple[str, ...] = ("expert", "rebuttal", "scoring")) -> List[Dict[str, Any]]:
+        """SLO warnings for user-chosen expert models, one per agent and stage at risk"""
+        warnings = []
+        for agent in agents:
+            model = agent.get("llm_model")
+            if not model:
+                continue
+            for stage in stages:
+                warning = self.slo_warning(stage, model)
+                if warning:
+                    warnings.append({"agent_id": agent.get("agent_id"), **warning})
+        return warnings
+
+    def snapshot(self) -> Dict[str, Any]:
+        percentile = self.settings["latency_percentile"]
+        return {
+            "slo_seconds": self.settings["slo_seconds"],
+            "stages": {
+                stage: {model: stats.snapshot(percentile) for (s, model), stats in self.stats.items() if s == stage}
+                for stage in sorted({s for s, _ in self.stats})
+            }
+        }
+
+@lru_cache(maxsize=1)
+def get_router() -> ModelRouter:
+    """Router shared by every LLMClient instance, constructed on first use"""
+    return ModelRouter()
@@ -0,0 +1,251 @@
+import numpy as np
+from typing import Dict, List, Any, Optional, Tuple
+
+# Every expert allocates exactly this many points in Stage 4
+POINTS_BUDGET = 10
+
+def largest_remainder(
+    raw: np.ndarray,
+    total: int = POINTS_BUDGET,
+    mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Apportion `total` integer points along the last axis proportionally to `raw`
+    (Hamilton / largest-remainder method).
+
+    Works on any leading shape, e.g. (solutions,), (experts, solutions) or
+    (conversations, experts, solutions). `mask` marks valid solutions; masked
+    entries always receive 0. Rows with no positive points are spread evenly
+    across their valid solutions. Remainder ties go to the lower index.
+    """
+    raw = np.clip(np.nan_to_num(np.asarray(raw, dtype=float)), 0.0, None)
+    if mask is None:
+        mask = np.ones(raw.shape, dtype=bool)
+    else:
+        mask = np.broadcast_to(np.asarray(mask, dtype=bool), raw.shape)
+
+    raw = np.where(mask, raw, 0.0)
+    sums = raw.sum(axis=-1, keepdims=True)
+    raw = np.where(sums > 0, raw, mask.astype(float))
+    sums = raw.sum(axis=-1, keepdims=True)
+
+    quotas = np.divide(raw * total, sums, out=np.zeros_like(raw), where=sums > 0)
+    floors = np.floor(quotas)
+    remainders = np.where(mask, quotas - floors, -1.0)
+    leftover = total - floors.sum(axis=-1, keepdims=True)
+
+    # Position of each entry when remainders are sorted descending
+    order = np.argsort(-remainders, axis=-1, kind="stable")
+    ranks = np.empty_like(order)
+    np.put_along_axis(ranks, order, np.broadcast_to(np.arange(raw.shape[-1]), order.shape), axis=-1)
+
+    bonus = (ranks < leftover) & mask & (sums > 0)
+    return (floors + bonus).astype(int)
+
+def normalize_allocation(
+    score_map: Dict[str, Any],
+    solution_ids: List[str],
+    total: int = POINTS_BUDGET
+) -> Dict[str, int]:
+    """
+    Normalize one expert's {solution_id: points} map so it sums to `total`
+    over `solution_ids`. Unknown ids are ignored; missing ids count as 0.
+    """
+    raw = np.array([float(score_map.get(sol_id, 0) or 0) for sol_id in solution_ids])
+    points = largest_remainder(raw, total)
+    return {sol_id: int(p) for sol_id, p in zip(solution_ids, points)}
+
+def stage4_to_matrix(
+    stage4: Dict[str, Any],
+    solutions: Optional[List[Dict[str, str]]] = None
+) -> Tuple[np.ndarray, List[str], List[Dict[str, str]]]:
+    """
+    Build an (experts, solutions) points matrix from a Stage 4 result.
+
+    Solutions are keyed by id. If `solutions` is not given they are collected
+    in first-seen order from the experts' score lists.
+
+    Returns: (matrix, agent_ids, solutions)
+    """
+    agent_ids = list(stage4.keys())
+
+    if solutions is None:
+        solutions = []
+        seen = set()
+        for scoring in stage4.values():
+            for score_obj in scoring.get("scores", []):
+                if isinstance(score_obj, dict):
+                    sol_id = str(score_obj.get("id", ""))
+                    if sol_id not in seen:
+                        seen.add(sol_id)
+                        solutions.append({"id": sol_id, "text": score_obj.get("text", "")})
+
+    column = {str(sol["id"]): j for j, sol in enumerate(solutions)}
+    matrix = np.zeros((len(agent_ids), len(solutions)))
+
+    for i, agent_id in enumerate(agent_ids):
+        for score_obj in stage4[agent_id].get("scores", []):
+            if isinstance(score_obj, dict):
+                j = column.get(str(score_obj.get("id", "")))
+                if j is not None:
+                    try:
+                        matrix[i, j] = float(score_obj.get("points", 0) or 0)
+                    except (TypeError, ValueError):
+                        pass
+
+    return matrix, agent_ids, solutions
+
+def stack_matrices(
+    matrices: List[np.ndarray]
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pad per-conversation (experts, solutions) matrices into one
+    (conversations, experts, solutions) tensor for bulk recomputation.
+
+    Returns: (tensor, expert_mask, solution_mask)
+    """
+    n_conv = len(matrices)
+    n_exp = max((m.shape[0] for m in matrices), default=0)
+    n_sol = max((m.shape[1] for m in matrices), default=0)
+
+    tensor = np.zeros((n_conv, n_exp, n_sol))
+    expert_mask = np.zeros((n_conv, n_exp), dtype=bool)
+    solution_mask = np.zeros((n_conv, n_sol), dtype=bool)
+
+    for c, m in enumerate(matrices):
+        tensor[c, :m.shape[0], :m.shape[1]] = m
+        expert_mask[c, :m.shape[0]] = True
+        solution_mask[c, :m.shape[1]] = True
+
+    return tensor, expert_mask, solution_mask
+
+def borda_scores(points: np.ndarray, solution_mask: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Per-expert Borda counts from a (..., experts, solutions) points tensor.
+
+    A solution earns one point for every valid solution the expert scored
+    strictly lower and half a point for every tie.
+    """
+    points = np.asarray(points, dtype=float)
+    if solution_mask is None:
+        solution_mask = np.ones(points.shape[:-2] + points.shape[-1:], dtype=bool)
+    valid = solution_mask[..., None, None, :]
+
+    a = points[..., :, None]
+    b = points[..., None, :]
+    beats = ((a > b) & valid).sum(axis=-1)
+    ties = ((a == b) & valid).sum(axis=-1) - 1
+
+    borda = beats + 0.5 * ties
+    return np.where(solution_mask[..., None, :], borda, 0.0)
+
+def approval_scores(points: np.ndarray, threshold: float = 1) -> np.ndarray:
+    """Per-expert approvals: 1 for every solution given at least `threshold` points"""
+    return (np.asarray(points, dtype=float) >= threshold).astype(float)
+
+def aggregate(
+    points: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    method: str = "points",
+    solution_mask: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Weighted aggregation over the experts axis of a (..., experts, solutions) tensor.
+
+    method: "points" (sum of allocated points), "borda" or "approval".
+    weights: (..., experts); padded experts should carry weight 0.
+    Returns: (..., solutions)
+    """
+    points = np.asarray(points, dtype=float)
+
+    if method == "points":
+        per_expert = points
+    elif method == "borda":
+        per_expert = borda_scores(points, solution_mask)
+    elif method == "approval":
+        per_expert = approval_scores(points)
+    else:
+        raise ValueError(f"Unknown aggregation method: {method}")
+
+    if weights is None:
+        weights = np.ones(points.shape[:-1])
+
+    totals = np.einsum("...e,...es->...s", np.asarray(weights, dtype=float), per_expert)
+    if solution_mask is not None:
+        totals = np.where(solution_mask, totals, 0.0)
+    return totals
+
+def confidence_intervals(
+    points: np.ndarray,
+    weights: Optional[np.ndarray] = None,
+    z: float = 1.96
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Normal-approximation interval for the mean points each solution receives
+    across experts. Experts with weight 0 are excluded.
+
+    Returns: (mean, low, high), each shaped (..., solutions)
+    """
+    points = np.asarray(points, dtype=float)
+    if weights is None:
+        weights = np.ones(points.shape[:-1])
+    w = np.asarray(weights, dtype=float)[..., None]
+
+    w_sum = w.sum(axis=-2)
+    mean = np.divide((w * points).sum(axis=-2), w_sum, out=np.zeros(points.shape[:-2] + points.shape[-1:]), where=w_sum > 0)
+    var = np.divide((w * (points - mean[..., None, :]) ** 2).sum(axis=-2), w_sum, out=np.zeros_like(mean), where=w_sum > 0)
+
+    # Effective number of experts (Kish) for weighted samples
+    n_eff = np.divide(w_sum ** 2, (w ** 2).sum(axis=-2), out=np.zeros_like(w_sum), where=w_sum > 0)
+    stderr = np.sqrt(np.divide(var, n_eff, out=np.zeros_like(var), where=n_eff > 0))
+
+    return mean, mean - z * stderr, mean + z * stderr
+
+def aggregate_rankings(
+    stage4: Dict[str, Any],
+    solutions: Optional[List[Dict[str, str]]] = None,
+    weights: Optional[Dict[str, float]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Build the aggregate ranking for one deliberation from its Stage 4 result.
+
+    weights: optional {agent_id: weight}; experts default to 1.
+
+    Returns: [
+        {"id": str, "text": str, "total": int, "borda": float, "approvals": float,
+         "mean": float, "ci_low": float, "ci_high": float, "merged_ids": [str]?},
+        ...
+    ] sorted by total descending (Borda breaks ties)
+    """
+    if not stage4:
+        return []
+
+    matrix, agent_ids, solutions = stage4_to_matrix(stage4, solutions)
+    if not solutions:
+        return []
+
+    w = np.array([float((weights or {}).get(agent_id, 1.0)) for agent_id in agent_ids])
+
+    totals = aggregate(matrix, w, "points")
+    borda = aggregate(matrix, w, "borda")
+    approvals = aggregate(matrix, w, "approval")
+    mean, low, high = confidence_intervals(matrix, w)
+
+    rankings = [
+        {
+            "id": sol["id"],
+            "text": sol.get("text", ""),
+            "total": int(round(totals[j])) if float(totals[j]).is_integer() else float(totals[j]),
+            "borda": float(borda[j]),
+            "approvals": float(approvals[j]),
+            "mean": round(float(mean[j]), 3),
+            "ci_low": round(float(max(low[j], 0.0)), 3),
+            "ci_high": round(float(min(high[j], POINTS_BUDGET)), 3),
+            # Ids of near-duplicates merged into this solution before scoring
+            **({"merged_ids": sol["merged_ids"]} if sol.get("merged_ids") else {})
+        }
+        for j, sol in enumerate(solutions)
+    ]
+
+    rankings.sort(key=lambda x: (x["total"], x["borda"]), reverse=True)
+    return rankings
@@ -0,0 +1,204 @@
+"""
+Full-text search over stored deliberations (SQLite FTS5).
+
+Each message contributes rows to an inverted index: the user's problem, the
+Gatekeeper's normalized problem, expert role names, Stage 1/2 summaries, the
+Notary summary and proposed solutions. Storage keeps the index in sync as
+messages are added and conversations deleted; `python -m backend.search
+--rebuild` reindexes everything (working set and archive).
+"""
+import argparse
+import re
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+KINDS = ("problem", "role", "summary", "solution")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def fts_available() -> bool:
+    try:
+        sqlite3.connect(":memory:").execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+def message_documents(message: Dict[str, Any]) -> Iterator[Tuple[str, str]]:
+    """(kind, text) pairs worth indexing from one stored message"""
+    if message.get("role") == "user":
+        if message.get("content"):
+            yield "problem", message["content"]
+        return
+
+    stage0 = message.get("stage0") or {}
+    if stage0.get("normalized_problem"):
+        yield "problem", stage0["normalized_problem"]
+    for agent in stage0.get("proposed_agents") or []:
+        if isinstance(agent, dict) and agent.get("role_name"):
+            yield "role", f"{agent['role_name']}. {agent.get('role_mission', '')}"
+
+    for stage in ("stage1", "stage2"):
+        for entry in (message.get(stage) or {}).values():
+            if not isinstance(entry, dict):
+                continue
+            if entry.get("role_name"):
+                yield "role", entry["role_name"]
+            if entry.get("one_sentence_summary"):
+                yield "summary", entry["one_sentence_summary"]
+
+    stage3 = message.get("stage3") or {}
+    if stage3.get("summary_markdown"):
+        yield "summary", stage3["summary_markdown"]
+    for solution in stage3.get("proposed_solutions") or []:
+        text = solution.get("text") if isinstance(solution, dict) else solution
+        if text:
+            yield "solution", str(text)
+
+def to_match_query(query: str) -> str:
+    """User text -> FTS5 query: every word must match, last one as a prefix"""
+    tokens = _TOKEN.findall(query)
+    if not tokens:
+        return ""
+    terms = [f'"{token}"' for token in tokens]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+class SearchIndex:
+    """Inverted index of conversation text in one SQLite database"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        with self._lock, self._db:
+            self._db.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5("
+                "conversation_id UNINDEXED, created_at UNINDEXED, kind UNINDEXED, text, "
+                "tokenize = 'porter unicode61')"
+            )
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    @property
+    def backfilled(self) -> bool:
+        """Whether the existing store has been indexed once (see Storage.rebuild_search_index)"""
+        with self._lock:
+            return self._db.execute("SELECT 1 FROM meta WHERE key = 'backfilled'").fetchone() is not None
+
+    def mark_backfilled(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES ('backfilled', datetime('now'))")
+
+    def index_message(self, conversation_id: str, created_at: str, message: Dict[str, Any]) -> None:
+        rows = [(conversation_id, created_at, kind, text) for kind, text in message_documents(message)]
+        if rows:
+            with self._lock, self._db:
+                self._db.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", rows)
+
+    def index_conversation(self, conversation: Dict[str, Any]) -> None:
+        """(Re)index a whole conversation"""
+        self.index_conversations([conversation])
+
+    def index_conversations(self, conversations: List[Dict[str, Any]]) -> None:
+        """(Re)index a batch of conversations in one transaction"""
+        with self._lock, self._db:
+            self._db.executemany(
+                "DELETE FROM documents WHERE conversation_id = ?",
+                [(conversation["id"],) for conversation in conversations]
+            )
+            self._db.executemany("INSERT INTO documents VALUES (?, ?, ?, ?)", [
+                (conversation["id"], conversation.get("created_at", ""), kind, text)
+                for conversation in conversations
+                for message in conversation.get("messages", [])
+                for kind, text in message_documents(message)
+            ])
+    
+    def remove(self, conversation_id: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM documents WHERE conversation_id = ?", (conversation_id,))
+
+    def clear(self) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM documents")
+
+    def search(self, query: str, limit: int = 20, offset: int = 0, kind: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Conversations matching `query`, best BM25 match first.
+
+        Returns {"total": int, "results": [{"id", "created_at", "kind", "snippet", "score", "matches"}]}
+        where kind/snippet describe the best-matching text in that conversation.
+        """
+        match = to_match_query(query)
+        if not match:
+            return {"total": 0, "results": []}
+
+        where = "documents MATCH ?" + (" AND kind = ?" if kind else "")
+        params = [match] + ([kind] if kind else [])
+        with self._lock:
+            total = self._db.execute(
+                f"SELECT COUNT(DISTINCT conversation_id) FROM documents WHERE {where}", params
+            ).fetchone()[0]
+            # SQLite returns the other columns from the row holding MIN(score)
+            rows = self._db.execute(
+                f"""
+                WITH hits AS MATERIALIZED (
+                    SELECT rowid AS id, conversation_id, created_at, kind, bm25(documents) AS score
+                    FROM documents WHERE {where}
+                )
+                SELECT id, conversation_id, created_at, kind, MIN(score), COUNT(*) FROM hits
+                GROUP BY conversation_id
+                ORDER BY MIN(score)
+                LIMIT ? OFFSET ?
+                """,
+                params + [limit, offset]
+            ).fetchall()
+            # Snippets only for the rows on this page
+            snippets = dict(self._db.execute(
+                f"""
+                SELECT rowid, snippet(documents, 3, '**', '**', '…', 16) FROM documents
+                WHERE documents MATCH ? AND rowid IN ({",".join("?" * len(rows))})
+                """,
+                [match] + [row[0] for row in rows]
+            ).fetchall()) if rows else {}
+
+        return {
+            "total": total,
+            "results": [
+                {
+                    "id": conversation_id,
+                    "created_at": created_at,
+                    "kind": match_kind,
+                    "snippet": snippets.get(rowid, ""),
+                    # bm25() is lower-is-better; flip it so higher means more relevant
+                    "score": round(-score, 4),
+                    "matches": count
+                }
+                for rowid, conversation_id, created_at, match_kind, score, count in rows
+            ]
+        }
+
+def main(argv: Optional[List[str]] = None) -> None:
+    from .storage import Storage
+
+    parser = argparse.ArgumentParser(description="RoundWise deliberation search index")
+    parser.add_argument("query", nargs="?", help="Search text")
+    parser.add_argument("--data-dir", default="backend/data/conversations", help="Conversation store directory")
+    parser.add_argument("--rebuild", action="store_true", help="Reindex all conversations")
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    storage = Storage(args.data_dir)
+    if storage.search is None:
+        raise SystemExit("SQLite FTS5 is not available in this Python build")
+    if args.rebuild:
+        print(f"Indexed {storage.rebuild_search_index()} conversations")
+    if args.query:
+        found = storage.search.search(args.query, limit=args.limit)
+        print(f"{found['total']} conversations")
+        for result in found["results"]:
+            print(f"{result['score']:>8.3f}  {result['id']}  [{result['kind']}] {result['snippet']}")
+
+if __name__ == "__main__":
+    main()
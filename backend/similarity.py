@@ -0,0 +1,48 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Any
+
+# Common words that say nothing about an expert's position
+STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being
+below between both but by can could did do does doing down during each few for from further
+had has have having he her here hers him his how i if in into is it its itself just more most
+must my no nor not now of off on once only or other our ours out over own same she should so
+some such than that the their theirs them then there these they this those through to too
+under until up very was we were what when where which while who whom why will with would you
+your yours should may might need needs
+""".split())
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+def tokenize(text: str) -> list:
+    """Lowercase content words (3+ chars, stopwords removed)"""
+    return [w for w in _WORD.findall((text or "").lower()) if len(w) > 2 and w not in STOPWORDS]
+
+def term_vector(text: str) -> Counter:
+    """Bag of words plus word bigrams, so shared phrasing counts more than shared vocabulary"""
+    words = tokenize(text)
+    terms = Counter(words)
+    terms.update(f"{a} {b}" for a, b in zip(words, words[1:]))
+    return terms
+
+def cosine_similarity(text_a: str, text_b: str) -> float:
+    """Cosine similarity of two texts' term vectors, in [0, 1]"""
+    a, b = term_vector(text_a), term_vector(text_b)
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[term] for term, count in a.items() if term in b)
+    norm = math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values()))
+    return dot / norm if norm else 0.0
+
+def stance_text(entry: Dict[str, Any]) -> str:
+    """The parts of a Stage 1/2 expert entry that express its position"""
+    points = entry.get("critical_points_to_consider") or {}
+    if isinstance(points, dict):
+        points = list(points.values())
+    return " ".join([
+        str(entry.get("final_stance") or entry.get("initial_recommendation") or ""),
+        str(entry.get("one_sentence_summary") or ""),
+        *(str(p) for p in points)
+    ])
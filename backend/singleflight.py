@@ -0,0 +1,75 @@
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Tuple
+
+def request_key(*parts: Any) -> str:
+    """Stable hash of JSON-serializable parts, for use as a coalescing key"""
+    payload = json.dumps(parts, sort_keys=True, default=str, separators=(",", ":"))
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key starts the work as an independent task; callers
+    arriving while it runs await the same task. Waiters are shielded, so one of
+    them disconnecting does not cancel the work for the others.
+
+    With `result_ttl` > 0, successful results are also kept for that many
+    seconds, so a retry arriving just after completion gets the stored result
+    instead of starting over. Failures are never cached.
+
+    With `cancel_orphans`, the work is cancelled once every caller waiting
+    on it has been cancelled, so abandoned work stops early.
+    """
+
+    def __init__(self, result_ttl: float = 0, max_results: int = 1024, cancel_orphans: bool = False):
+        self.result_ttl = result_ttl
+        self.max_results = max_results
+        self.cancel_orphans = cancel_orphans
+        self._in_flight: Dict[str, asyncio.Task] = {}
+        self._waiters: Dict[str, int] = {}
+        self._results: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._in_flight
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `factory()` once per key, sharing its result with concurrent callers"""
+        cached = self._results.get(key)
+        if cached is not None:
+            if time.monotonic() - cached[0] < self.result_ttl:
+                return cached[1]
+            del self._results[key]
+
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self.cancel_orphans and self._waiters[key] == 1 and not task.done():
+                task.cancel()
+            raise
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+
+    def _finish(self, key: str, task: asyncio.Task) -> None:
+        self._in_flight.pop(key, None)
+        # Always retrieve the exception so an orphaned failure is not logged as unhandled
+        if task.cancelled() or task.exception() is not None:
+            return
+        if self.result_ttl > 0:
+            self._results[key] = (time.monotonic(), task.result())
+            self._results.move_to_end(key)
+            while len(self._results) > self.max_results:
+                self._results.popitem(last=False)
@@ -0,0 +1,140 @@
+"""
+Speculative Stage 1 while the user reviews the proposed experts.
+
+Right after Stage 0, each proposed agent's Stage 1 analysis is started in the
+background. When the roles are confirmed, analyses for agents the user left
+unchanged are reused; agents that were edited or removed have their work
+cancelled and are queried afresh. Opt-in via
+`deliberation.speculative_stage1.enabled`.
+"""
+import asyncio
+import time
+from functools import lru_cache
+from typing import Dict, List, Any, Optional, Tuple
+
+from .config import get_settings
+from .singleflight import request_key
+from .tracing import span
+
+DEFAULT_SPECULATION = {
+    "enabled": False,
+    # Unclaimed speculative work is cancelled after this long
+    "ttl_seconds": 600,
+    # Do not speculate while this many full pipelines are queued
+    "max_queued_pipelines": 1
+}
+
+def agent_fingerprint(agent: Dict[str, Any]) -> str:
+    """Everything about an agent that changes its Stage 1 prompt"""
+    return request_key(agent.get("agent_id"), agent.get("role_name"), agent.get("role_mission"), agent.get("llm_model"))
+
+class SpeculativeStage1:
+    """Background Stage 1 tasks per conversation, claimed or cancelled on role_update"""
+
+    def __init__(self, speculation_config: Optional[Dict[str, Any]] = None):
+        if speculation_config is None:
+            speculation_config = get_settings().deliberation.get("speculative_stage1", {}) or {}
+        self.settings = {**DEFAULT_SPECULATION, **speculation_config}
+        # conversation_id -> (problem key, started at, {fingerprint: (agent_id, task)})
+        self._runs: Dict[str, Tuple[str, float, Dict[str, Tuple[str, asyncio.Task]]]] = {}
+        self.stats = {"started": 0, "reused": 0, "cancelled": 0, "expired": 0}
+
+    @staticmethod
+    def _problem_key(conversation_id: str, normalized_problem: str, key_dimensions: List[str]) -> str:
+        return request_key(conversation_id, normalized_problem, key_dimensions)
+
+    def start(
+        self,
+        conversation_id: str,
+        normalized_problem: str,
+        key_dimensions: List[str],
+        agents: List[Dict[str, Any]]
+    ) -> int:
+        """Start Stage 1 for every proposed agent; returns how many were started"""
+        if not self.settings["enabled"] or not agents:
+            return 0
+        from .admission import get_admission, PIPELINE
+        if get_admission().queued[PIPELINE] >= self.settings["max_queued_pipelines"]:
+            # Under load, confirmed pipelines get the capacity instead
+            return 0
+        from .roundwise import stage1_expert_response
+
+        self._expire()
+        self.discard(conversation_id)
+
+        async def run(agent: Dict[str, Any]) -> Dict[str, Any]:
+            with span("stage1.speculative", **{"conversation.id": conversation_id, "agent.id": agent.get("agent_id")}):
+                return await stage1_expert_response(normalized_problem, key_dimensions, agent)
+
+        tasks = {}
+        for agent in agents:
+            task = asyncio.ensure_future(run(agent))
+            # Retrieve failures so an unclaimed one is not logged as never retrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            tasks[agent_fingerprint(agent)] = (agent.get("agent_id"), task)
+
+        self._runs[conversation_id] = (
+            self._problem_key(conversation_id, normalized_problem, key_dimensions),
+            time.monotonic(),
+            tasks
+        )
+        self.stats["started"] += len(tasks)
+        return len(tasks)
+
+    def claim(
+        self,
+        conversation_id: str,
+        normalized_problem: str,
+        key_dimensions: List[str],
+        agents: List[Dict[str, Any]]
+    ) -> Dict[str, asyncio.Task]:
+        """
+        Speculative work usable for the confirmed `agents`, as {agent_id: task}.
+
+        Tasks for agents that were edited or dropped are cancelled. The
+        conversation's speculation is consumed either way.
+        """
+        run = self._runs.pop(conversation_id, None)
+        if run is None:
+            return {}
+        problem_key, _, tasks = run
+        if problem_key != self._problem_key(conversation_id, normalized_problem, key_dimensions):
+            self._cancel(tasks.values())
+            return {}
+
+        confirmed = {agent_fingerprint(agent): agent["agent_id"] for agent in agents}
+        claimed = {}
+        for fingerprint, (agent_id, task) in tasks.items():
+            if fingerprint in confirmed and not task.cancelled():
+                claimed[confirmed[fingerprint]] = task
+            else:
+                self._cancel([(agent_id, task)])
+        self.stats["reused"] += len(claimed)
+        return claimed
+
+    def discard(self, conversation_id: str) -> None:
+        run = self._runs.pop(conversation_id, None)
+        if run:
+            self._cancel(run[2].values())
+
+    def _cancel(self, entries) -> None:
+        for _, task in entries:
+            if not task.done():
+                task.cancel()
+                self.stats["cancelled"] += 1
+
+    def _expire(self) -> None:
+        horizon = time.monotonic() - self.settings["ttl_seconds"]
+        for conversation_id, (_, started, _) in list(self._runs.items()):
+            if started < horizon:
+                self.discard(conversation_id)
+                self.stats["expired"] += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        self._expire()
+        return {**self.stats, "pending_conversations": len(self._runs)}
+
+@lru_cache(maxsize=1)
+def get_speculation() -> SpeculativeStage1:
+    """Process-wide speculation registry, constructed on first use"""
+    return SpeculativeStage1()
@@ -1,21 +1,214 @@
 import json
 import os
+import gzip
+import sqlite3
+import threading
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Set, Tuple
 from datetime import datetime
+import re
 import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from .config import get_settings
+from .tracing import traced
+from .search import SearchIndex, fts_available
+
+ARCHIVE_INDEX_NAME = "index.json"
+SEARCH_INDEX_NAME = "search.sqlite3"
+
+# Conversation ids become file names; imports must not escape data_dir
+_VALID_ID = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+
+# Per-conversation write locks are striped over this many locks
+LOCK_STRIPES = 64
+
+DEFAULT_CACHE = {
+    "max_entries": 256,
+    "max_bytes": 64 * 1024 * 1024
+}
+
+class ConversationCache:
+    """
+    LRU of parsed conversations keyed by id, each stamped with its file's
+    (mtime_ns, size, inode) so a file changed by another process is re-read.
+    Bounded by entry count and by total file size. Also holds the
+    (version, updated_at) of recently checked files for ETags. Thread-safe:
+    storage is also used from worker threads (exports, imports, maintenance).
+    """
+    
+    def __init__(self, max_entries: int = DEFAULT_CACHE["max_entries"], max_bytes: int = DEFAULT_CACHE["max_bytes"]):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        # conversation_id -> ((mtime_ns, size, inode), conversation)
+        self._entries: "OrderedDict[str, Tuple[Tuple[int, ...], Dict[str, Any]]]" = OrderedDict()
+        # conversation_id -> ((mtime_ns, size, inode), version, updated_at)
+        self._versions: Dict[str, Tuple[Tuple[int, ...], int, str]] = {}
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0}
+        self._lock = threading.Lock()
+    
+    def get(self, conversation_id: str, stamp: Tuple[int, ...]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._entries.get(conversation_id)
+            if entry is None or entry[0] != stamp:
+                self.stats["misses"] += 1
+                return None
+            self._entries.move_to_end(conversation_id)
+            self.stats["hits"] += 1
+            return entry[1]
+    
+    def put(self, conversation_id: str, stamp: Tuple[int, ...], conversation: Dict[str, Any]) -> None:
+        with self._lock:
+            self._discard(conversation_id)
+            if self.max_entries <= 0 or stamp[1] > self.max_bytes:
+                return
+            self._entries[conversation_id] = (stamp, conversation)
+            self.bytes += stamp[1]
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self.bytes -= evicted[1]
+                self.stats["evictions"] += 1
+    
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._discard(conversation_id)
+            self._versions.pop(conversation_id, None)
+    
+    def get_version(self, conversation_id: str, stamp: Tuple[int, ...]) -> Optional[Tuple[int, str]]:
+        with self._lock:
+            cached = self._versions.get(conversation_id)
+            if cached and cached[0] == stamp:
+                return cached[1], cached[2]
+            return None
+    
+    def put_version(self, conversation_id: str, stamp: Tuple[int, ...], version: int, updated_at: str) -> None:
+        with self._lock:
+            self._versions[conversation_id] = (stamp, version, updated_at)
+    
+    def _discard(self, conversation_id: str) -> None:
+        entry = self._entries.pop(conversation_id, None)
+        if entry:
+            self.bytes -= entry[0][1]
+    
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.stats, "entries": len(self._entries), "bytes": self.bytes}
+
+def _stamp(path: Path) -> Optional[Tuple[int, ...]]:
+    """
+    (mtime_ns, size, inode) of a file, or None if it does not exist. Saves
+    replace the file, so the inode changes even when a same-size rewrite
+    lands within the filesystem's timestamp resolution.
+    """
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size, st.st_ino
+
+def iter_segment_file(segment: Path) -> Iterator[Dict[str, Any]]:
+    """Every conversation copy in a gzip NDJSON archive segment, in file order"""
+    try:
+        with gzip.open(segment, 'rt') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    except (OSError, EOFError, json.JSONDecodeError):
+        # A truncated final member (interrupted append) ends the segment
+        return
+
+def iter_latest_in_segment(segment: Path, conversation_ids: Set[str]) -> Iterator[Dict[str, Any]]:
+    """
+    The latest copy of each of `conversation_ids` in a segment, in file order.
+    
+    Two streaming passes (find each id's last line, then yield those lines),
+    so memory stays constant whatever the segment size.
+    """
+    last: Dict[str, int] = {}
+    for line_no, conversation in enumerate(iter_segment_file(segment)):
+        if conversation.get("id") in conversation_ids:
+            last[conversation["id"]] = line_no
+    for line_no, conversation in enumerate(iter_segment_file(segment)):
+        if last.get(conversation.get("id")) == line_no:
+            yield conversation
 
 class Storage:
-    """JSON-based conversation storage"""
+    """
+    JSON-based conversation storage.
+    
+    Active conversations live as one JSON file each in `data_dir`. Old ones can
+    be moved into gzip-compressed NDJSON segments in `archive_dir`, with an
+    index mapping conversation id -> segment. Archived conversations stay
+    readable through get_conversation; writing to one restores it to the
+    working set.
+    
+    A full-text search index (SQLite FTS5, `search`) is updated as messages
+    are added and conversations deleted.
     
-    def __init__(self, data_dir: str = "backend/data/conversations"):
+    Every save bumps the conversation's `version` and `updated_at`, which
+    HTTP reads use for ETag/Last-Modified.
+    
+    Recently used conversations are kept parsed in memory (`cache`); saves
+    write through to disk and replace the cached object (writers build a new
+    one rather than changing it in place). Conversations returned by
+    get_conversation are shared with the cache and must be treated as
+    read-only. Bulk readers (iter_conversations, export, import
+    version checks) pass `cache=False` and get private copies without
+    evicting the hot set.
+    """
+    
+    def __init__(
+        self,
+        data_dir: str = "backend/data/conversations",
+        archive_dir: Optional[str] = None,
+        search_path: Optional[str] = None,
+        cache_settings: Optional[Dict[str, Any]] = None
+    ):
         self.data_dir = Path(data_dir)
         self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.archive_dir = Path(archive_dir) if archive_dir else self.data_dir.parent / "archive"
+        self._archive_index: Optional[Dict[str, str]] = None
+        cache_settings = {**DEFAULT_CACHE, **(cache_settings or {})}
+        self.cache = ConversationCache(cache_settings["max_entries"], cache_settings["max_bytes"])
+        # Writers (add_message, import, delete/archive) hold the conversation's lock, so
+        # maintenance threads cannot delete a file between another writer's read and write
+        self._locks = [threading.RLock() for _ in range(LOCK_STRIPES)]
+        
+        self.search_path = Path(search_path) if search_path else self.data_dir.parent / SEARCH_INDEX_NAME
+        self._search: Optional[SearchIndex] = None
+        self._search_opened = False
+        self._search_lock = threading.Lock()
+    
+    @property
+    def search(self) -> Optional[SearchIndex]:
+        """
+        The search index, opened (and created) on first use, so tools that
+        never search or write do not create it; None without SQLite FTS5.
+        A new index is backfilled by the server at startup or by
+        `python -m backend.search --rebuild`.
+        """
+        with self._search_lock:
+            if not self._search_opened:
+                self._search_opened = True
+                if fts_available():
+                    self._search = SearchIndex(str(self.search_path))
+                else:
+                    print("SQLite FTS5 not available; conversation search is disabled")
+            return self._search
     
     def _get_conversation_path(self, conversation_id: str) -> Path:
         """Get the file path for a conversation"""
         return self.data_dir / f"{conversation_id}.json"
     
+    def _lock(self, conversation_id: str) -> threading.RLock:
+        return self._locks[hash(conversation_id) % LOCK_STRIPES]
+    
+    def file_stamp(self, conversation_id: str) -> Optional[Tuple[int, ...]]:
+        """Stamp of the working-set file, for delete_conversation/archive_conversations `stamps`"""
+        return _stamp(self._get_conversation_path(conversation_id))
+    
+    @traced("storage.create_conversation")
     def create_conversation(self) -> str:
         """Create a new conversation and return its ID"""
         conversation_id = str(uuid.uuid4())
@@ -28,19 +221,65 @@ class Storage:
         self._save_conversation(conversation_id, conversation)
         return conversation_id
     
-    def get_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
-        """Get a conversation by ID"""
+    @traced("storage.get_conversation")
+    def get_conversation(self, conversation_id: str, cache: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        Get a conversation by ID.
+        
+        Cached reads are read-only and served from the cache while the file is
+        unchanged; `cache=False` reads the file into a private copy and leaves
+        the cache untouched.
+        """
         path = self._get_conversation_path(conversation_id)
+        stamp = _stamp(path)
         
-        if not path.exists():
-            return None
+        if stamp is None:
+            if cache:
+                self.cache.discard(conversation_id)
+            return self.get_archived_conversation(conversation_id)
+        
+        if not cache:
+            return self._read_file(path)
         
+        conversation = self.cache.get(conversation_id, stamp)
+        if conversation is not None:
+            return conversation
+        
+        conversation = self._read_file(path)
+        if conversation is not None:
+            self.cache.put(conversation_id, stamp, conversation)
+        return conversation
+    
+    def _read_file(self, path: Path) -> Optional[Dict[str, Any]]:
         try:
             with open(path, 'r') as f:
                 return json.load(f)
         except (json.JSONDecodeError, IOError):
             return None
     
+    def get_version(self, conversation_id: str, cache: bool = True) -> Optional[Tuple[int, str]]:
+        """
+        (version, updated_at) of a conversation, without re-reading it when unchanged.
+        
+        Cached per file stamp, so writes from other processes are still seen.
+        `cache` is passed to get_conversation when the file must be read.
+        """
+        stamp = _stamp(self._get_conversation_path(conversation_id))
+        if stamp is not None:
+            cached = self.cache.get_version(conversation_id, stamp)
+            if cached:
+                return cached
+        
+        conversation = self.get_conversation(conversation_id, cache=cache)
+        if not conversation:
+            return None
+        version = conversation.get("version", 0)
+        updated_at = conversation.get("updated_at") or conversation.get("created_at", "")
+        if stamp is not None:
+            self.cache.put_version(conversation_id, stamp, version, updated_at)
+        return version, updated_at
+    
+    @traced("storage.list_conversations")
     def list_conversations(self) -> List[Dict[str, Any]]:
         """List all conversations (metadata only)"""
         conversations = []
@@ -61,6 +300,19 @@ class Storage:
         conversations.sort(key=lambda x: x["created_at"], reverse=True)
         return conversations
     
+    def iter_conversation_files(self) -> Iterator[Tuple[str, Path]]:
+        """Lazily yield (conversation_id, path) for every stored conversation"""
+        for file in self.data_dir.glob("*.json"):
+            yield file.stem, file
+    
+    def iter_conversations(self) -> Iterator[Dict[str, Any]]:
+        """Stream full conversations one at a time (uncached private copies) instead of loading them all"""
+        for conversation_id, _ in self.iter_conversation_files():
+            conversation = self.get_conversation(conversation_id, cache=False)
+            if conversation:
+                yield conversation
+    
+    @traced("storage.add_message")
     def add_message(
         self,
         conversation_id: str,
@@ -69,6 +321,16 @@ class Storage:
         stage_data: Optional[Dict[str, Any]] = None
     ) -> bool:
         """Add a message to a conversation"""
+        with self._lock(conversation_id):
+            return self._add_message(conversation_id, role, content, stage_data)
+    
+    def _add_message(
+        self,
+        conversation_id: str,
+        role: str,
+        content: str,
+        stage_data: Optional[Dict[str, Any]]
+    ) -> bool:
         conversation = self.get_conversation(conversation_id)
         
         if not conversation:
@@ -84,14 +346,229 @@ class Storage:
         if role == "assistant" and stage_data:
             message.update(stage_data)
         
-        conversation["messages"].append(message)
+        # A new object: the one from get_conversation is shared with the cache and other readers
+        conversation = {**conversation, "messages": conversation["messages"] + [message]}
         self._save_conversation(conversation_id, conversation)
         
+        if self.search:
+            try:
+                self.search.index_message(conversation_id, conversation.get("created_at", ""), message)
+            except sqlite3.Error as e:
+                print(f"Search indexing failed for {conversation_id}: {e}")
+        
+        return True
+    
+    def delete_conversation(self, conversation_id: str, stamp: Optional[Tuple[int, ...]] = None) -> bool:
+        """
+        Remove a conversation from the working set.
+        
+        With `stamp` (from file_stamp), the file is only removed if it has not
+        been written since, so a concurrent add_message is never lost.
+        """
+        path = self._get_conversation_path(conversation_id)
+        with self._lock(conversation_id):
+            if stamp is not None and _stamp(path) != stamp:
+                return False
+            self.cache.discard(conversation_id)
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                return False
+        # Without an index file there is nothing to remove; do not create one for it
+        if (self._search_opened or self.search_path.exists()) and self.search \
+                and conversation_id not in self._load_archive_index():
+            self.search.remove(conversation_id)
         return True
     
+    # Archive
+    
+    def _load_archive_index(self) -> Dict[str, str]:
+        if self._archive_index is None:
+            path = self.archive_dir / ARCHIVE_INDEX_NAME
+            try:
+                with open(path, 'r') as f:
+                    self._archive_index = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError, IOError):
+                self._archive_index = {}
+        return self._archive_index
+    
+    def _save_archive_index(self) -> None:
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        tmp = self.archive_dir / f"{ARCHIVE_INDEX_NAME}.tmp"
+        with open(tmp, 'w') as f:
+            json.dump(self._load_archive_index(), f)
+        tmp.replace(self.archive_dir / ARCHIVE_INDEX_NAME)
+    
+    def _iter_segment(self, segment: Path) -> Iterator[Dict[str, Any]]:
+        return iter_segment_file(segment)
+    
+    def get_archived_conversation(self, conversation_id: str) -> Optional[Dict[str, Any]]:
+        """Read a conversation back from its archive segment"""
+        segment = self._load_archive_index().get(conversation_id)
+        if not segment:
+            return None
+        
+        found = None
+        for conversation in self._iter_segment(self.archive_dir / segment):
+            if conversation.get("id") == conversation_id:
+                # Keep scanning: a later copy in the same segment supersedes earlier ones
+                found = conversation
+        return found
+    
+    def archive_segments(self) -> Dict[str, Set[str]]:
+        """Archive segment name -> ids of the conversations the index maps to it"""
+        segments: Dict[str, Set[str]] = {}
+        for conversation_id, segment in self._load_archive_index().items():
+            segments.setdefault(segment, set()).add(conversation_id)
+        return segments
+    
+    def iter_archive_segment(self, segment: str, conversation_ids: Set[str]) -> Iterator[Dict[str, Any]]:
+        """
+        Stream the latest copy of each of `conversation_ids` in one segment,
+        for bulk readers that would otherwise rescan it per conversation
+        with get_archived_conversation.
+        """
+        return iter_latest_in_segment(self.archive_dir / segment, conversation_ids)
+    
+    @traced("storage.archive_conversations")
+    def archive_conversations(
+        self,
+        conversations: List[Dict[str, Any]],
+        segment: str,
+        stamps: Optional[Dict[str, Tuple[int, ...]]] = None
+    ) -> int:
+        """
+        Append conversations to a compressed segment and drop them from the working set.
+        
+        The segment is written and closed before the index is updated and the
+        working-set files are deleted, so an interruption never loses data.
+        `stamps` ({id: file_stamp taken before reading}) keeps conversations
+        written since in the working set, where the newer file supersedes the
+        archived copy. Returns the number removed from the working set.
+        """
+        if not conversations:
+            return 0
+        
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        segment_path = self.archive_dir / segment
+        
+        # Each append adds a new gzip member; readers see the concatenation
+        with gzip.open(segment_path, 'at') as f:
+            for conversation in conversations:
+                f.write(json.dumps(conversation, separators=(",", ":")) + "\n")
+        
+        index = self._load_archive_index()
+        for conversation in conversations:
+            index[conversation["id"]] = segment
+        self._save_archive_index()
+        
+        stamps = stamps or {}
+        return sum(
+            self.delete_conversation(conversation["id"], stamps.get(conversation["id"]))
+            for conversation in conversations
+        )
+    
+    def rebuild_archive_index(self) -> int:
+        """Rescan every archive segment and rewrite the id -> segment index"""
+        index = {}
+        for segment in sorted(self.archive_dir.glob("*.jsonl.gz")):
+            for conversation in self._iter_segment(segment):
+                if "id" in conversation:
+                    index[conversation["id"]] = segment.name
+        self._archive_index = index
+        self._save_archive_index()
+        return len(index)
+    
+    @traced("storage.import_conversations")
+    def import_conversations(self, conversations: List[Dict[str, Any]], overwrite: bool = False) -> Dict[str, int]:
+        """
+        Write a batch of whole conversations, keeping their ids and versions.
+        
+        All files are written to temporary names first and only then renamed
+        into place, and the batch is indexed for search in one transaction,
+        so a failed batch leaves no partial conversations behind. Existing
+        conversations are kept unless `overwrite` is set or the incoming copy
+        has a higher version, which makes re-running an interrupted import safe.
+        Returns {"imported", "skipped", "invalid"}.
+        """
+        counts = {"imported": 0, "skipped": 0, "invalid": 0}
+        accepted = []
+        for conversation in conversations:
+            if (
+                not isinstance(conversation, dict)
+                or not _VALID_ID.match(str(conversation.get("id", "")))
+                or not isinstance(conversation.get("messages"), list)
+            ):
+                counts["invalid"] += 1
+                continue
+            existing = self.get_version(conversation["id"], cache=False)
+            if existing and not overwrite and existing[0] >= conversation.get("version", 0):
+                counts["skipped"] += 1
+                continue
+            accepted.append(conversation)
+        
+        staged = []
+        try:
+            for conversation in accepted:
+                tmp = self.data_dir / f".{conversation['id']}.json.tmp"
+                with open(tmp, 'w') as f:
+                    json.dump(conversation, f, indent=2)
+                    f.flush()
+                    os.fsync(f.fileno())
+                staged.append((tmp, conversation))
+        except OSError:
+            for tmp, _ in staged:
+                tmp.unlink(missing_ok=True)
+            raise
+        
+        for tmp, conversation in staged:
+            path = self._get_conversation_path(conversation["id"])
+            with self._lock(conversation["id"]):
+                tmp.replace(path)
+                self.cache.discard(conversation["id"])
+        
+        if self.search and accepted:
+            self.search.index_conversations(accepted)
+        
+        counts["imported"] = len(accepted)
+        return counts
+    
+    def rebuild_search_index(self) -> int:
+        """Reindex every working-set and archived conversation; returns the count"""
+        self.search.clear()
+        seen = set()
+        for conversation in self.iter_conversations():
+            self.search.index_conversation(conversation)
+            seen.add(conversation["id"])
+        for segment, conversation_ids in sorted(self.archive_segments().items()):
+            for conversation in self.iter_archive_segment(segment, conversation_ids - seen):
+                self.search.index_conversation(conversation)
+                seen.add(conversation["id"])
+        self.search.mark_backfilled()
+        return len(seen)
+    
+    @traced("storage.save_conversation")
     def _save_conversation(self, conversation_id: str, conversation: Dict[str, Any]) -> None:
-        """Save conversation to disk"""
+        """
+        Save conversation to disk (write-through), bumping its version.
+        
+        `conversation` must not be an object returned by get_conversation:
+        it is changed here and becomes the new cached copy.
+        """
         path = self._get_conversation_path(conversation_id)
+        conversation["version"] = conversation.get("version", 0) + 1
+        conversation["updated_at"] = datetime.now().isoformat()
         
-        with open(path, 'w') as f:
+        # Written aside and renamed into place: readers never see a partial file
+        tmp = self.data_dir / f".{conversation_id}.json.saving"
+        with open(tmp, 'w') as f:
             json.dump(conversation, f, indent=2)
+        tmp.replace(path)
+        stamp = _stamp(path)
+        self.cache.put(conversation_id, stamp, conversation)
+        self.cache.put_version(conversation_id, stamp, conversation["version"], conversation["updated_at"])
+
+@lru_cache(maxsize=1)
+def get_storage() -> Storage:
+    """Shared Storage, constructed (and its directory created) on first use"""
+    return Storage(cache_settings=get_settings().storage.get("cache"))
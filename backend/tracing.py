@@ -0,0 +1,324 @@
+"""
+OpenTelemetry-style tracing without the SDK dependency.
+
+Spans carry W3C-sized trace/span ids, a parent link, start/end times and
+attributes (conversation.id, agent.id, llm.model, token counts, ...). The
+current span lives in a context variable, so spans opened inside
+asyncio.gather() tasks nest under the stage that started them.
+
+Finished spans are exported when their trace's root span ends:
+    exporter: "jsonl"  append one JSON object per span to `path` (from a
+                       background thread, see appender.py)
+    exporter: "otlp"   POST OTLP/HTTP JSON to `otlp_endpoint` (e.g. a local collector)
+
+A waterfall of a run can be printed from the JSONL file:
+    python -m backend.tracing                 # latest trace
+    python -m backend.tracing <trace_id>
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator
+from .appender import get_appender
+
+DEFAULT_TRACING = {
+    "enabled": False,
+    "exporter": "jsonl",
+    "path": "backend/data/traces/spans.jsonl",
+    "otlp_endpoint": "http://localhost:4318/v1/traces",
+    "service_name": "roundwise",
+    "max_buffered_spans": 2048,
+    # Event-loop lag above this is recorded as an event_loop.stall span
+    "loop_stall_ms": 100
+}
+
+# Attributes copied from a parent span to its children
+INHERITED_ATTRIBUTES = ("conversation.id",)
+
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+class Span:
+    """One timed operation; use through `span()` or `@traced`"""
+
+    __slots__ = ("trace_id", "span_id", "parent_span_id", "name", "start_ns", "end_ns", "attributes", "status", "error")
+
+    def __init__(self, name: str, parent: Optional["Span"], attributes: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.name = name
+        self.start_ns = time.time_ns()
+        self.end_ns = 0
+        inherited = {k: parent.attributes[k] for k in INHERITED_ATTRIBUTES if parent and k in parent.attributes}
+        self.attributes = {**inherited, **{k: v for k, v in attributes.items() if v is not None}}
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        for key, value in attributes.items():
+            self.set_attribute(key, value)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_ns,
+            "end_time_unix_nano": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3),
+            "attributes": self.attributes,
+            "status": self.status,
+            "error": self.error
+        }
+
+class _NoopSpan:
+    """Stand-in when tracing is disabled"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, attributes: Dict[str, Any]) -> None:
+        pass
+
+_NOOP = _NoopSpan()
+
+class Tracer:
+    """Buffers finished spans per trace and exports each trace when its root ends"""
+
+    def __init__(self, tracing_config: Optional[Dict[str, Any]] = None):
+        if tracing_config is None:
+            from .config import get_settings
+            tracing_config = get_settings().raw.get("tracing", {}) or {}
+        self.settings = {**DEFAULT_TRACING, **tracing_config}
+        self.enabled = bool(self.settings["enabled"])
+        self._buffer: List[Span] = []
+        self._lock = threading.Lock()
+
+    def finish(self, span: Span) -> None:
+        span.end_ns = time.time_ns()
+        with self._lock:
+            self._buffer.append(span)
+            if span.parent_span_id is not None and len(self._buffer) < self.settings["max_buffered_spans"]:
+                return
+            batch, self._buffer = self._buffer, []
+        self.export(batch)
+
+    def export(self, spans: List[Span]) -> None:
+        if self.settings["exporter"] == "otlp":
+            # Off the event loop; a missing collector must not slow requests down
+            threading.Thread(target=self._post_otlp, args=(spans,), daemon=True).start()
+        else:
+            self._write_jsonl(spans)
+
+    def _write_jsonl(self, spans: List[Span]) -> None:
+        # Appended from a background thread: file I/O must not stall the event loop
+        get_appender().append(Path(self.settings["path"]), [span.to_dict() for span in spans])
+
+    def _post_otlp(self, spans: List[Span]) -> None:
+        import urllib.request
+
+        body = json.dumps(_otlp_payload(self.settings["service_name"], spans), default=str).encode("utf-8")
+        request = urllib.request.Request(
+            self.settings["otlp_endpoint"],
+            data=body,
+            headers={"Content-Type": "application/json"},
+            method="POST"
+        )
+        try:
+            urllib.request.urlopen(request, timeout=5).close()
+        except Exception as e:
+            print(f"OTLP export to {self.settings['otlp_endpoint']} failed: {e}")
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def _otlp_payload(service_name: str, spans: List[Span]) -> Dict[str, Any]:
+    """OTLP/HTTP JSON ExportTraceServiceRequest for a batch of spans"""
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": service_name}}]},
+            "scopeSpans": [{
+                "scope": {"name": "roundwise"},
+                "spans": [
+                    {
+                        "traceId": span.trace_id,
+                        "spanId": span.span_id,
+                        **({"parentSpanId": span.parent_span_id} if span.parent_span_id else {}),
+                        "name": span.name,
+                        "kind": 1,
+                        "startTimeUnixNano": str(span.start_ns),
+                        "endTimeUnixNano": str(span.end_ns),
+                        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+                        "status": {"code": 2, "message": span.error or ""} if span.status == "error" else {"code": 1}
+                    }
+                    for span in spans
+                ]
+            }]
+        }]
+    }
+
+@lru_cache(maxsize=1)
+def get_tracer() -> Tracer:
+    """Process-wide tracer, configured from `tracing` in config.yaml on first use"""
+    return Tracer()
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Open a span as a child of the current one.
+
+    Attribute names use dots, so pass them as a dict:
+        with span("llm.query_model", **{"llm.model": model}) as s:
+            s.set_attribute("llm.usage.completion_tokens", n)
+    """
+    tracer = get_tracer()
+    if not tracer.enabled:
+        yield _NOOP
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "error"
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        _current_span.reset(token)
+        tracer.finish(current)
+
+def traced(name: Optional[str] = None, **attributes: Any):
+    """Decorator: run the (sync or async) function inside a span"""
+    def decorator(fn):
+        span_name = name or fn.__qualname__
+
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                with span(span_name, **attributes):
+                    return await fn(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name, **attributes):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def usage_attributes(response: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Span attributes for an LLM response: model used, finish reason and token counts"""
+    if not response:
+        return {"llm.failed": True}
+    usage = response.get("usage") or {}
+    return {
+        "llm.response.model": response.get("model"),
+        "llm.finish_reason": response.get("finish_reason"),
+        "llm.usage.prompt_tokens": usage.get("prompt_tokens"),
+        "llm.usage.completion_tokens": usage.get("completion_tokens"),
+        "llm.usage.cached_tokens": response.get("cached_tokens"),
+        "llm.substituted_for": response.get("substituted_for")
+    }
+
+async def monitor_event_loop() -> None:
+    """Record event-loop stalls (callbacks late by more than `loop_stall_ms`) as spans"""
+    import asyncio
+
+    tracer = get_tracer()
+    if not tracer.enabled:
+        return
+    interval = 0.05
+    threshold = tracer.settings["loop_stall_ms"] / 1000
+    while True:
+        expected = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        lag = time.monotonic() - expected
+        if lag > threshold:
+            stall = Span("event_loop.stall", None, {"event_loop.lag_ms": round(lag * 1000, 1)})
+            stall.start_ns = time.time_ns() - int(lag * 1e9)
+            tracer.finish(stall)
+
+# Waterfall view
+
+def _load_spans(path: Path) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, "r") as f:
+        for line in f:
+            if line.strip():
+                spans.append(json.loads(line))
+    return spans
+
+def waterfall(spans: List[Dict[str, Any]], trace_id: Optional[str] = None, width: int = 60) -> str:
+    """Text waterfall of one trace (the latest root span if no id is given)"""
+    roots = [s for s in spans if not s["parent_span_id"] and s["name"] != "event_loop.stall"]
+    if trace_id is None:
+        if not roots:
+            return "No traces found"
+        trace_id = max(roots, key=lambda s: s["start_time_unix_nano"])["trace_id"]
+
+    trace = [s for s in spans if s["trace_id"] == trace_id]
+    if not trace:
+        return f"Trace {trace_id} not found"
+    start = min(s["start_time_unix_nano"] for s in trace)
+    end = max(s["end_time_unix_nano"] for s in trace)
+    # Loop stalls are separate traces; show those that happened during this one
+    trace += [
+        s for s in spans
+        if s["name"] == "event_loop.stall" and s["end_time_unix_nano"] >= start and s["start_time_unix_nano"] <= end
+    ]
+    total = max(end - start, 1)
+
+    children: Dict[Optional[str], List[Dict[str, Any]]] = {}
+    for s in sorted(trace, key=lambda s: s["start_time_unix_nano"]):
+        parent = s["parent_span_id"] if s["trace_id"] == trace_id else None
+        children.setdefault(parent, []).append(s)
+
+    lines = [f"trace {trace_id}  {total / 1e6:.0f} ms"]
+
+    def render(parent: Optional[str], depth: int) -> None:
+        for s in children.get(parent, []):
+            offset = int((s["start_time_unix_nano"] - start) / total * width)
+            length = max(1, int((s["end_time_unix_nano"] - s["start_time_unix_nano"]) / total * width))
+            bar = " " * offset + "#" * min(length, width - offset)
+            detail = " ".join(
+                f"{k}={s['attributes'][k]}"
+                for k in ("agent.id", "llm.model", "llm.usage.completion_tokens", "event_loop.lag_ms")
+                if k in s["attributes"]
+            )
+            flag = " !" if s["status"] == "error" else ""
+            label = ("  " * depth + s["name"])[:40]
+            lines.append(f"{label:<40} |{bar:<{width}}| {s['duration_ms']:>9.1f} ms{flag} {detail}")
+            render(s["span_id"], depth + 1)
+
+    render(None, 0)
+    return "\n".join(lines)
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Print a waterfall of a traced pipeline run")
+    parser.add_argument("trace_id", nargs="?", default=None, help="Trace id (default: latest)")
+    parser.add_argument("--path", default=DEFAULT_TRACING["path"], help="Spans JSONL file")
+    args = parser.parse_args(argv)
+    print(waterfall(_load_spans(Path(args.path)), args.trace_id))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+Streaming bulk export and import of conversations as NDJSON.
+
+Export yields one conversation per line: the working set in id order, then
+each archive segment (in name order) in file order. Working-set conversations
+are read one at a time and segments are streamed, so memory stays constant,
+and an interrupted export resumes from the last id written (`after`). Import reads line by line and writes in
+batches through Storage.import_conversations; re-running it skips
+conversations that are already present.
+
+Usage (from project root):
+    python -m backend.transfer export --out backup.ndjson.gz --since 2025-01-01 --has-stage4
+    python -m backend.transfer export --out backup.ndjson.gz --resume
+    python -m backend.transfer import backup.ndjson.gz --batch-size 200
+"""
+import argparse
+import gzip
+import json
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator, AsyncIterator, IO
+
+from .storage import Storage
+
+DEFAULT_BATCH_SIZE = 100
+
+def matches(
+    conversation: Dict[str, Any],
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    has_stage4: Optional[bool] = None
+) -> bool:
+    """Export filters: created_at in [since, until) (ISO prefixes compare as text) and has-stage4"""
+    created_at = conversation.get("created_at", "")
+    if since and created_at < since:
+        return False
+    if until and created_at >= until:
+        return False
+    if has_stage4 is not None:
+        completed = any("stage4" in message for message in conversation.get("messages", []))
+        if completed != has_stage4:
+            return False
+    return True
+
+def iter_export(
+    storage: Storage,
+    since: Optional[str] = None,
+    until: Optional[str] = None,
+    has_stage4: Optional[bool] = None,
+    after: Optional[str] = None
+) -> Iterator[Dict[str, Any]]:
+    """
+    Conversations passing the filters, in export order, starting after id `after`.
+
+    Archived conversations that are also in the working set are exported
+    from the working set only. An `after` id that is no longer stored
+    resumes by id within the working set and re-exports the archive;
+    import skips what it already has.
+    """
+    working = sorted(conversation_id for conversation_id, _ in storage.iter_conversation_files())
+    in_working = set(working)
+    segments = storage.archive_segments()
+    after_segment = None
+    if after and after not in in_working:
+        after_segment = next((segment for segment, ids in segments.items() if after in ids), None)
+
+    if after_segment is None:
+        for conversation_id in working:
+            if after and conversation_id <= after:
+                continue
+            conversation = storage.get_conversation(conversation_id, cache=False)
+            if conversation and matches(conversation, since, until, has_stage4):
+                yield conversation
+
+    for segment in sorted(segments):
+        if after_segment and segment < after_segment:
+            continue
+        # Resuming inside a segment skips up to and including `after`
+        skipping = segment == after_segment
+        for conversation in storage.iter_archive_segment(segment, segments[segment] - in_working):
+            if skipping:
+                skipping = conversation["id"] != after
+                continue
+            if matches(conversation, since, until, has_stage4):
+                yield conversation
+
+def iter_ndjson(conversations: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for conversation in conversations:
+        yield json.dumps(conversation, separators=(",", ":")) + "\n"
+
+class Importer:
+    """Parses NDJSON lines into batches and writes them, keeping running totals"""
+
+    def __init__(self, storage: Storage, batch_size: int = DEFAULT_BATCH_SIZE, overwrite: bool = False):
+        self.storage = storage
+        self.batch_size = batch_size
+        self.overwrite = overwrite
+        self.totals: Dict[str, Any] = {"imported": 0, "skipped": 0, "invalid": 0, "last_id": None}
+        self.batch: List[Any] = []
+
+    def add(self, line: str) -> Optional[List[Any]]:
+        """Queue one line; returns a full batch to write, if any"""
+        if not line.strip():
+            return None
+        try:
+            self.batch.append(json.loads(line))
+        except json.JSONDecodeError:
+            self.totals["invalid"] += 1
+            return None
+        if len(self.batch) >= self.batch_size:
+            return self.take()
+        return None
+
+    def take(self) -> List[Any]:
+        batch, self.batch = self.batch, []
+        return batch
+
+    def write(self, batch: List[Any]) -> None:
+        if not batch:
+            return
+        counts = self.storage.import_conversations(batch, overwrite=self.overwrite)
+        for key, value in counts.items():
+            self.totals[key] += value
+        if isinstance(batch[-1], dict):
+            self.totals["last_id"] = batch[-1].get("id")
+
+def import_lines(storage: Storage, lines: Iterable[str], batch_size: int = DEFAULT_BATCH_SIZE, overwrite: bool = False) -> Dict[str, Any]:
+    """Import NDJSON lines in batches; returns counts and the last id written"""
+    importer = Importer(storage, batch_size, overwrite)
+    for line in lines:
+        batch = importer.add(line)
+        if batch:
+            importer.write(batch)
+    importer.write(importer.take())
+    return importer.totals
+
+async def aiter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Split an async byte stream (e.g. a request body) into text lines"""
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8")
+    if buffer:
+        yield buffer.decode("utf-8")
+
+def _open(path: Path, mode: str) -> IO:
+    if ".gz" in path.suffixes:
+        return gzip.open(path, mode + "t")
+    return open(path, mode)
+
+def _truncate_to_complete_lines(path: Path) -> Optional[str]:
+    """
+    Rewrite an earlier (possibly interrupted) export keeping only complete
+    lines, streaming through a temporary file; returns the last id kept.
+    """
+    if not path.exists():
+        return None
+    last = None
+    tmp = path.with_name(path.name + ".tmp")
+    with _open(tmp, "w") as out:
+        try:
+            with _open(path, "r") as f:
+                for line in f:
+                    try:
+                        if not line.endswith("\n"):
+                            raise ValueError("incomplete line")
+                        last = json.loads(line)["id"]
+                    except (ValueError, KeyError):
+                        # A torn final line from the interruption; it is exported again
+                        break
+                    out.write(line)
+        except (EOFError, OSError):
+            # Truncated gzip stream
+            pass
+    tmp.replace(path)
+    return last
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Bulk export/import of RoundWise conversations (NDJSON)")
+    parser.add_argument("--data-dir", default="backend/data/conversations", help="Conversation store directory")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    export = commands.add_parser("export", help="Write conversations to an NDJSON file (.gz to compress)")
+    export.add_argument("--out", required=True)
+    export.add_argument("--since", help="created_at >= this ISO date")
+    export.add_argument("--until", help="created_at < this ISO date")
+    export.add_argument("--has-stage4", dest="has_stage4", action="store_const", const=True, default=None)
+    export.add_argument("--no-stage4", dest="has_stage4", action="store_const", const=False)
+    export.add_argument("--resume", action="store_true", help="Append after the last id already in --out")
+
+    imp = commands.add_parser("import", help="Read conversations from an NDJSON file")
+    imp.add_argument("path")
+    imp.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    imp.add_argument("--overwrite", action="store_true", help="Replace existing conversations")
+
+    args = parser.parse_args(argv)
+    storage = Storage(args.data_dir)
+
+    if args.command == "export":
+        out = Path(args.out)
+        after = _truncate_to_complete_lines(out) if args.resume else None
+        count = 0
+        with _open(out, "a" if args.resume else "w") as f:
+            for line in iter_ndjson(iter_export(storage, args.since, args.until, args.has_stage4, after)):
+                f.write(line)
+                count += 1
+        print(f"Exported {count} conversations to {out}" + (f" (resumed after {after})" if after else ""))
+    else:
+        with _open(Path(args.path), "r") as f:
+            totals = import_lines(storage, f, args.batch_size, args.overwrite)
+        print(
+            f"Imported {totals['imported']}, skipped {totals['skipped']} existing, "
+            f"{totals['invalid']} invalid"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Offline microbenchmarks for backend hot paths, with regression gating.
+
+Covers JSON extraction from model output, Stage 4 score normalization,
+aggregate rankings, solution dedup, prompt construction for N experts and
+Storage create/add/get/list on a store of --conversations conversations
+(in a temporary directory). No API key or network access is needed.
+
+Each benchmark reports the median seconds per call over --repeat runs.
+--save writes them to benchmarks/baseline.json; --compare fails (exit 1)
+when a benchmark is more than --threshold slower than its baseline.
+
+Timings are stored and compared as multiples of a fixed pure-Python
+calibration loop timed in the same run, so a baseline saved on one machine
+is roughly comparable on another. That only cancels raw CPU speed, not
+differences in Python version, disk or cache sizes: gate CI on a baseline
+saved (--save) on the same runner, and treat the committed one as a guide.
+
+Usage (from project root):
+    python benchmarks/hotpaths.py
+    python benchmarks/hotpaths.py --save
+    python benchmarks/hotpaths.py --compare --threshold 0.25
+    python benchmarks/hotpaths.py --filter storage --conversations 2000
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import timeit
+from datetime import datetime
+from pathlib import Path
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+BASELINE = Path(ROOT) / "benchmarks" / "baseline.json"
+
+WORDS = (
+    "market pricing churn retention onboarding latency budget hiring roadmap risk "
+    "compliance security vendor migration platform revenue support quality growth"
+).split()
+
+def _text(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+def _agents(n: int):
+    return [
+        {
+            "agent_id": f"expert_{i}",
+            "role_name": f"Expert {i}",
+            "role_mission": f"Assess the problem from perspective {i}",
+            "llm_model": "anthropic/claude-3.5-sonnet" if i % 2 else "openai/gpt-4o"
+        }
+        for i in range(1, n + 1)
+    ]
+
+def _stage1_entry(rng: random.Random):
+    return {
+        "role_name": "Expert",
+        "initial_recommendation": _text(rng, 120),
+        "one_sentence_summary": _text(rng, 20),
+        "critical_points_to_consider": {str(k): _text(rng, 25) for k in range(1, 4)}
+    }
+
+# Benchmarks: name -> setup(args, workdir) returning the callable to time
+
+def bench_parse_json(kind: str):
+    def setup(args, workdir):
+        from backend.roundwise import _parse_json_from_response
+
+        rng = random.Random(1)
+        payload = json.dumps({
+            "summary_markdown": _text(rng, 4000),
+            "proposed_solutions": [{"id": str(i), "text": _text(rng, 40)} for i in range(200)]
+        })
+        text = {
+            "large": payload,
+            "wrapped": "Here is my analysis:\n```json\n" + payload + "\n```\nLet me know if you need more.",
+            "truncated": "Sure! " + payload[: len(payload) // 2],
+            "no_json": _text(rng, 20000),
+        }[kind]
+        return lambda: _parse_json_from_response(text)
+    return setup
+
+def setup_normalize_allocation(args, workdir):
+    from backend.scoring import normalize_allocation
+
+    ids = [str(i) for i in range(1, 9)]
+    raw = {"1": 4, "2": 3, "3": 3, "4": 2, "7": 1, "unknown": 5}
+    return lambda: normalize_allocation(raw, ids)
+
+def setup_largest_remainder_bulk(args, workdir):
+    import numpy as np
+    from backend.scoring import largest_remainder
+
+    raw = np.random.default_rng(1).integers(0, 6, size=(1000, 5, 8))
+    return lambda: largest_remainder(raw)
+
+def setup_aggregate_rankings(args, workdir):
+    from backend.scoring import aggregate_rankings
+
+    rng = random.Random(1)
+    solutions = [{"id": str(j), "text": _text(rng, 12)} for j in range(1, 11)]
+    stage4 = {}
+    for agent in _agents(8):
+        points = [rng.randint(0, 3) for _ in solutions]
+        stage4[agent["agent_id"]] = {"scores": [
+            {"id": sol["id"], "text": sol["text"], "points": p} for sol, p in zip(solutions, points)
+        ]}
+    return lambda: aggregate_rankings(stage4, solutions)
+
+def setup_dedupe_solutions(args, workdir):
+    from backend.dedup import dedupe_solutions
+
+    rng = random.Random(1)
+    base = [_text(rng, 14) for _ in range(12)]
+    solutions = [{"id": str(i), "text": base[i % len(base)] + (" now" if i >= len(base) else "")} for i in range(30)]
+    return lambda: dedupe_solutions(solutions, 0.75, 8)
+
+def setup_prompts(args, workdir):
+    from backend.prompts import build_messages, role_block
+    from backend.roundwise import STAGE1_SYSTEM, _rebuttal_prompt
+
+    rng = random.Random(1)
+    agents = _agents(args.experts)
+    stage1 = {agent["agent_id"]: _stage1_entry(rng) for agent in agents}
+    problem = _text(rng, 80)
+
+    def build():
+        for i, agent in enumerate(agents):
+            build_messages(agent["llm_model"], STAGE1_SYSTEM, problem, role_block(agent))
+            other = agents[(i + 1) % len(agents)]["agent_id"]
+            build_messages(agent["llm_model"], STAGE1_SYSTEM, problem, f"{role_block(agent)}\n\n{_rebuttal_prompt(agent, other, stage1, {})}")
+    return build
+
+_stores = {}
+
+def _populated_storage(args, workdir):
+    """One Storage over --conversations small conversations, shared by the storage benchmarks"""
+    if "storage" not in _stores:
+        from backend.storage import Storage
+
+        data_dir = Path(workdir) / "conversations"
+        storage = Storage(str(data_dir), search_path=str(Path(workdir) / "search.sqlite3"))
+        rng = random.Random(1)
+        for i in range(args.conversations):
+            conversation = {
+                "id": f"bench-{i:06d}",
+                "created_at": datetime(2025, 1, 1 + i % 28).isoformat(),
+                "version": 2,
+                "messages": [
+                    {"role": "user", "content": _text(rng, 30)},
+                    {"role": "assistant", "content": "Stage 0 complete", "stage0": {"normalized_problem": _text(rng, 30)}}
+                ]
+            }
+            with open(data_dir / f"{conversation['id']}.json", "w") as f:
+                json.dump(conversation, f, indent=2)
+        _stores["storage"] = storage
+    return _stores["storage"]
+
+def setup_storage_create(args, workdir):
+    return _populated_storage(args, workdir).create_conversation
+
+def setup_storage_deliberation(args, workdir):
+    """One deliberation's writes: create, user message and five stage messages"""
+    storage = _populated_storage(args, workdir)
+    rng = random.Random(1)
+    stage1 = {agent["agent_id"]: _stage1_entry(rng) for agent in _agents(3)}
+
+    def run():
+        conversation_id = storage.create_conversation()
+        storage.add_message(conversation_id, "user", "How should we price the new tier?")
+        for stage in ("stage0", "stage1", "stage2", "stage3", "stage4"):
+            storage.add_message(conversation_id, "assistant", f"{stage} complete", stage_data={stage: stage1})
+    return run
+
+def setup_storage_get(args, workdir):
+    storage = _populated_storage(args, workdir)
+    return lambda: storage.get_conversation("bench-000001")
+
+def setup_storage_list(args, workdir):
+    return _populated_storage(args, workdir).list_conversations
+
+BENCHMARKS = [
+    ("parse_json.large", bench_parse_json("large")),
+    ("parse_json.wrapped", bench_parse_json("wrapped")),
+    ("parse_json.truncated", bench_parse_json("truncated")),
+    ("parse_json.no_json", bench_parse_json("no_json")),
+    ("scoring.normalize_allocation", setup_normalize_allocation),
+    ("scoring.largest_remainder_bulk", setup_largest_remainder_bulk),
+    ("scoring.aggregate_rankings", setup_aggregate_rankings),
+    ("dedup.dedupe_solutions", setup_dedupe_solutions),
+    ("prompts.n_experts", setup_prompts),
+    # Reads first: the write benchmarks grow the store
+    ("storage.get_conversation", setup_storage_get),
+    ("storage.list_conversations", setup_storage_list),
+    ("storage.create_conversation", setup_storage_create),
+    ("storage.deliberation_writes", setup_storage_deliberation),
+]
+
+def calibration_loop():
+    """Fixed interpreter-bound work (dict, string and arithmetic ops) used as the unit of time"""
+    counts = {}
+    for i in range(2000):
+        key = str(i % 97)
+        counts[key] = counts.get(key, 0) + i * 3 // 7
+    return sorted(counts.items())
+
+def measure(fn, repeat: int) -> float:
+    """Median seconds per call; each run loops for at least ~0.2s"""
+    timer = timeit.Timer(fn)
+    loops, _ = timer.autorange()
+    return statistics.median(t / loops for t in timer.repeat(repeat=repeat, number=loops))
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Print current vs baseline (both in calibration units); returns the names that regressed beyond `threshold`"""
+    regressed = []
+    print(f"\n{'benchmark':<32} {'baseline':>11} {'current':>11} {'change':>8}")
+    for name, units in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:<32} {'-':>11} {units:>10.3f}x {'new':>8}")
+            continue
+        change = units / before - 1
+        flag = "  REGRESSED" if change > threshold else ""
+        print(f"{name:<32} {before:>10.3f}x {units:>10.3f}x {change:>+7.0%}{flag}")
+        if flag:
+            regressed.append(name)
+    return regressed
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backend hot-path microbenchmarks")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per benchmark")
+    parser.add_argument("--filter", help="Only benchmarks whose name contains this")
+    parser.add_argument("--conversations", type=int, default=10000, help="Conversations in the benchmark store")
+    parser.add_argument("--experts", type=int, default=12, help="Experts for prompt construction")
+    parser.add_argument("--save", action="store_true", help=f"Write results to {BASELINE.name}")
+    parser.add_argument("--compare", action="store_true", help=f"Compare with {BASELINE.name}; exit 1 on regression")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before failing (0.25 = 25%%)")
+    parser.add_argument("--baseline", default=str(BASELINE), help="Baseline file")
+    args = parser.parse_args()
+
+    results = {}
+    unit = measure(calibration_loop, args.repeat)
+    print(f"calibration loop: {unit * 1e6:.1f}us\n")
+    with tempfile.TemporaryDirectory(prefix="roundwise-bench-") as workdir:
+        print(f"{'benchmark':<32} {'per call':>11} {'units':>11}")
+        for name, setup in BENCHMARKS:
+            if args.filter and args.filter not in name:
+                continue
+            seconds = measure(setup(args, workdir), args.repeat)
+            results[name] = seconds / unit
+            print(f"{name:<32} {seconds * 1e6:>9.1f}us {results[name]:>10.3f}x")
+
+    if args.save:
+        existing = {}
+        if Path(args.baseline).exists():
+            with open(args.baseline) as f:
+                saved = json.load(f)
+            # Baselines from before calibration hold seconds; they cannot be mixed with units
+            if saved.get("units") == "calibration":
+                existing = saved.get("results", {})
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "python": platform.python_version(),
+                "machine": platform.machine(),
+                "conversations": args.conversations,
+                "experts": args.experts,
+                "saved_at": datetime.now().isoformat(timespec="seconds"),
+                # Results are seconds per call divided by the calibration loop's
+                "units": "calibration",
+                "calibration_seconds": unit,
+                # A filtered run only replaces the benchmarks it ran
+                "results": {**existing, **results}
+            }, f, indent=2)
+        print(f"\nSaved baseline to {args.baseline}")
+
+    if args.compare:
+        try:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        except FileNotFoundError:
+            print(f"\nNo baseline at {args.baseline}; run with --save first")
+            return 1
+        if baseline.get("units") != "calibration":
+            print(f"\n{args.baseline} holds absolute timings from another run; regenerate it with --save")
+            return 1
+        if baseline.get("python", "").rsplit(".", 1)[0] != platform.python_version().rsplit(".", 1)[0]:
+            print(f"\nNote: baseline saved with Python {baseline.get('python')}, running {platform.python_version()}")
+        regressed = compare(results, baseline.get("results", {}), args.threshold)
+        if regressed:
+            print(f"\nSlower than baseline by more than {args.threshold:.0%}: {', '.join(regressed)}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for backend entry points.
+
+Each target is imported in a fresh interpreter several times; the script reports
+the median and worst wall time (interpreter start included) and exits non-zero
+if any median exceeds the budget or any target fails to import.
+
+Usage (from project root):
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --budget 0.5
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# (label, python -c code) - serving worker, CLI/batch tools, config alone
+TARGETS = [
+    ("interpreter", "pass"),
+    ("config import", "import backend.config"),
+    ("config parse", "from backend.config import get_settings; get_settings()"),
+    ("stage modules", "import backend.gatekeeper, backend.roundwise"),
+    ("analytics CLI", "import backend.analytics"),
+    ("serving worker", "import backend.main"),
+]
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def time_target(code: str, runs: int) -> list:
+    """Wall-clock seconds for `runs` fresh interpreters running `code`"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-c", code],
+            cwd=ROOT,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True
+        )
+        elapsed = time.perf_counter() - start
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "failed")
+        timings.append(elapsed)
+    return timings
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Backend cold-start benchmark")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per target")
+    parser.add_argument("--budget", type=float, default=1.0, help="Max median seconds per target")
+    args = parser.parse_args()
+
+    print(f"{'target':<16} {'median':>9} {'max':>9}")
+    over_budget = []
+    failed = []
+    for label, code in TARGETS:
+        try:
+            timings = time_target(code, args.runs)
+        except RuntimeError as e:
+            print(f"{label:<16} {'FAILED':>9}  ({e})")
+            failed.append(label)
+            continue
+        median = statistics.median(timings)
+        print(f"{label:<16} {median * 1000:>7.0f}ms {max(timings) * 1000:>7.0f}ms")
+        if median > args.budget:
+            over_budget.append(label)
+
+    if failed:
+        print(f"\nFailed to import: {', '.join(failed)}")
+    if over_budget:
+        print(f"\nOver the {args.budget:.2f}s budget: {', '.join(over_budget)}")
+    return 1 if failed or over_budget else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
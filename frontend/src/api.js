@@ -18,6 +18,14 @@ export async function listConversations() {
   return response.json();
 }
 
+export async function searchConversations(query, { limit = 20, offset = 0, kind = null } = {}) {
+  const params = new URLSearchParams({ q: query, limit, offset });
+  if (kind) params.set("kind", kind);
+  const response = await fetch(`${API_BASE_URL}/api/search?${params}`);
+  if (!response.ok) throw new Error("Search failed");
+  return response.json();
+}
+
 export async function getConversation(conversationId) {
   const response = await fetch(`${API_BASE_URL}/api/conversations/${conversationId}`);
   if (!response.ok) throw new Error("Conversation not found");
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+from backend import main
+from backend.admission import GATEKEEPER, PIPELINE, AdmissionController, Overloaded
+
+def controller(**settings) -> AdmissionController:
+    return AdmissionController({
+        "max_concurrent": 1,
+        "max_concurrent_pipelines": 1,
+        "max_queued_gatekeeper": 4,
+        "max_queued_pipelines": 4,
+        "queue_timeout_seconds": 5,
+        **settings
+    })
+
+def test_gatekeeper_requests_are_admitted_before_pipelines():
+    async def run():
+        admission = controller()
+        order = []
+        await admission.acquire(PIPELINE)
+
+        async def wait(kind, name):
+            await admission.acquire(kind)
+            order.append(name)
+            admission.release(kind, 0.1)
+
+        # The pipeline queued first, but the gatekeeper request goes ahead of it
+        tasks = [asyncio.ensure_future(wait(PIPELINE, "pipeline"))]
+        await asyncio.sleep(0)
+        tasks.append(asyncio.ensure_future(wait(GATEKEEPER, "gatekeeper")))
+        await asyncio.sleep(0)
+        admission.release(PIPELINE, 1.0)
+        await asyncio.gather(*tasks)
+        return order, admission.snapshot()
+
+    order, snapshot = asyncio.run(run())
+    assert order == ["gatekeeper", "pipeline"]
+    assert snapshot[PIPELINE]["active"] == snapshot[GATEKEEPER]["active"] == 0
+
+def test_pipeline_cap_leaves_room_for_gatekeeper():
+    async def run():
+        admission = controller(max_concurrent=2)
+        await admission.acquire(PIPELINE)
+        blocked = asyncio.ensure_future(admission.acquire(PIPELINE))
+        await asyncio.sleep(0)
+        # The queued pipeline is blocked by its own cap, not by the gatekeeper request
+        await asyncio.wait_for(admission.acquire(GATEKEEPER), 1)
+        # A cancelled waiter leaves the queue
+        blocked.cancel()
+        await asyncio.gather(blocked, return_exceptions=True)
+        return admission.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot[GATEKEEPER]["active"] == 1
+    assert snapshot[PIPELINE]["queued"] == 0
+
+def test_full_queue_is_rejected_with_429():
+    async def run():
+        admission = controller(max_queued_pipelines=1)
+        await admission.acquire(PIPELINE)
+        queued = asyncio.ensure_future(admission.acquire(PIPELINE))
+        await asyncio.sleep(0)
+        with pytest.raises(Overloaded) as excinfo:
+            await admission.acquire(PIPELINE)
+        queued.cancel()
+        return excinfo.value, admission.snapshot()
+
+    error, snapshot = asyncio.run(run())
+    assert error.status_code == 429
+    # No run time observed yet: the configured default
+    assert error.retry_after == 60
+    assert snapshot[PIPELINE]["rejected"] == 1
+
+def test_long_wait_is_shed_with_503():
+    async def run():
+        admission = controller(queue_timeout_seconds=0.01)
+        await admission.acquire(GATEKEEPER)
+        admission.durations[GATEKEEPER].extend([4.0, 6.0])
+        with pytest.raises(Overloaded) as excinfo:
+            await admission.acquire(GATEKEEPER)
+        return excinfo.value, admission.snapshot()
+
+    error, snapshot = asyncio.run(run())
+    assert error.status_code == 503
+    # Mean run time 5s x (1 active + 0 queued) per slot
+    assert error.retry_after == 5
+    assert snapshot[GATEKEEPER]["shed"] == 1
+    assert snapshot[GATEKEEPER]["queued"] == 0
+
+def test_admitted_maps_overload_to_http_error(monkeypatch):
+    admission = controller(max_queued_gatekeeper=0)
+    monkeypatch.setattr(main, "get_admission", lambda: admission)
+
+    async def work():
+        return {"ok": True}
+
+    async def run():
+        await admission.acquire(GATEKEEPER)
+        with pytest.raises(HTTPException) as excinfo:
+            await main._admitted(GATEKEEPER, work)
+        admission.release(GATEKEEPER)
+        return excinfo.value, await main._admitted(GATEKEEPER, work)
+
+    error, result = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.headers == {"Retry-After": "5"}
+    assert result == {"ok": True}
@@ -0,0 +1,92 @@
+import csv
+import json
+import os
+
+from backend.analytics import run_analytics, FIELDS
+from backend.storage import Storage
+
+def deliberation(conversation_id, model="openai/gpt-4o", failed=False):
+    solutions = [{"id": "1", "text": "Raise prices"}, {"id": "2", "text": "Keep prices"}]
+    return {
+        "id": conversation_id,
+        "created_at": "2025-01-05T10:00:00",
+        "messages": [
+            {"role": "user", "content": "Price?", "timestamp": "2025-01-05T10:00:00"},
+            {"role": "assistant", "timestamp": "2025-01-05T10:00:05", "stage0": {"proposed_agents": []}},
+            {"role": "assistant", "timestamp": "2025-01-05T10:00:20", "stage1": {"expert_1": {
+                "role_name": "CFO", "llm_model": model,
+                "initial_recommendation": "Response not available" if failed else "Raise"
+            }}},
+            {"role": "assistant", "timestamp": "2025-01-05T10:00:30", "stage3": {"proposed_solutions": solutions}},
+            {"role": "assistant", "timestamp": "2025-01-05T10:00:40", "stage4": {"expert_1": {
+                "scores": [{"id": "1", "points": 7}, {"id": "2", "points": 3}], "reasoning": "r"
+            }}}
+        ]
+    }
+
+def write(storage, conversation):
+    path = storage.data_dir / f"{conversation['id']}.json"
+    with open(path, "w") as f:
+        json.dump(conversation, f)
+    return path
+
+def rows(out, table):
+    with open(out / f"{table}.csv", newline="") as f:
+        return list(csv.DictReader(f))
+
+def test_incremental_run_replaces_changed_conversation(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    write(storage, deliberation("a"))
+    path = write(storage, deliberation("b"))
+    out = tmp_path / "out"
+
+    assert run_analytics(str(storage.data_dir), str(out), workers=1)["processed"] == 2
+    stats = run_analytics(str(storage.data_dir), str(out), workers=1)
+    assert (stats["processed"], stats["skipped"]) == (0, 2)
+
+    write(storage, deliberation("b", model="google/gemini-2.0-flash-001", failed=True))
+    os.utime(path, (1, 1))
+    stats = run_analytics(str(storage.data_dir), str(out), workers=1)
+    assert stats["processed"] == 1 and stats["compacted"] > 0
+    experts = rows(out, "experts")
+    assert sorted((r["conversation_id"], r["llm_model"]) for r in experts) == [
+        ("a", "openai/gpt-4o"), ("b", "google/gemini-2.0-flash-001")
+    ]
+
+def test_archived_conversations_are_analyzed_once(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    write(storage, deliberation("a"))
+    write(storage, deliberation("b"))
+    out = tmp_path / "out"
+    run_analytics(str(storage.data_dir), str(out), workers=1)
+
+    storage.archive_conversations([deliberation("b")], "segment-2025-01.jsonl.gz")
+    stats = run_analytics(str(storage.data_dir), str(out), workers=1)
+    assert stats["processed"] == 1
+    assert sorted(r["conversation_id"] for r in rows(out, "experts")) == ["a", "b"]
+    assert run_analytics(str(storage.data_dir), str(out), workers=1)["skipped"] == 2
+
+    storage.delete_conversation("a")
+    run_analytics(str(storage.data_dir), str(out), workers=1)
+    assert [r["conversation_id"] for r in rows(out, "experts")] == ["b"]
+
+def test_fixed_columns_and_model_summary(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    write(storage, deliberation("a"))
+    write(storage, deliberation("b", failed=True))
+    write(storage, deliberation("c", model="google/gemini-2.0-flash-001"))
+    out = tmp_path / "out"
+    out.mkdir()
+    # An experts table from before model_used existed
+    with open(out / "experts.csv", "w", newline="") as f:
+        csv.writer(f).writerow([field for field in FIELDS["experts"] if field != "model_used"])
+
+    stats = run_analytics(str(storage.data_dir), str(out), workers=1)
+    with open(out / "experts.csv", newline="") as f:
+        assert next(csv.reader(f)) == FIELDS["experts"]
+    summary = {row["llm_model"]: row for row in stats["models"]}
+    assert summary["openai/gpt-4o"]["experts"] == 2
+    assert summary["openai/gpt-4o"]["stage1_failure_rate"] == 0.5
+    assert summary["openai/gpt-4o"]["win_rate"] == 1.0
+    assert summary["openai/gpt-4o"]["mean_points_to_winner"] == 7
+    assert [r["llm_model"] for r in rows(out, "models")] == ["openai/gpt-4o", "google/gemini-2.0-flash-001"]
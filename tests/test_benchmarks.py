@@ -0,0 +1,49 @@
+import importlib.util
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCRIPT = ROOT / "benchmarks" / "hotpaths.py"
+
+def load_hotpaths():
+    spec = importlib.util.spec_from_file_location("hotpaths", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def run(*args) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, str(SCRIPT), "--filter", "parse_json.no_json", "--repeat", "1", *args],
+        cwd=ROOT, capture_output=True, text=True
+    )
+
+def test_compare_flags_slowdowns_beyond_threshold():
+    hotpaths = load_hotpaths()
+    regressed = hotpaths.compare({"a": 1.2, "b": 1.3, "c": 0.5}, {"a": 1.0, "b": 1.0}, 0.25)
+    assert regressed == ["b"]
+
+def test_saved_baseline_is_in_calibration_units(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    assert run("--save", "--baseline", str(baseline)).returncode == 0
+    saved = json.loads(baseline.read_text())
+    assert saved["units"] == "calibration"
+    assert saved["calibration_seconds"] > 0
+    assert set(saved["results"]) == {"parse_json.no_json"}
+
+    assert run("--compare", "--baseline", str(baseline), "--threshold", "10").returncode == 0
+    # A baseline far faster than this run is a regression
+    saved["results"]["parse_json.no_json"] /= 100
+    baseline.write_text(json.dumps(saved))
+    result = run("--compare", "--baseline", str(baseline))
+    assert result.returncode == 1
+    assert "REGRESSED" in result.stdout
+
+def test_absolute_baseline_is_not_used_for_gating(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"python": "3.11.7", "results": {"parse_json.no_json": 1e-9}}))
+    result = run("--compare", "--baseline", str(baseline))
+    assert result.returncode == 1
+    assert "regenerate it with --save" in result.stdout
+    assert "REGRESSED" not in result.stdout
@@ -0,0 +1,29 @@
+import json
+
+from backend.budget import TokenBudget
+
+STOP_CONFIG = {"expert": {"max_tokens": 2000, "stop": ["\n}"]}}
+
+def stopped(full: str) -> dict:
+    """A response as providers return it: text up to (not including) the stop sequence"""
+    return {"content": full[:full.rindex("\n}")], "finish_reason": "stop", "usage": {}}
+
+def test_restores_brace_after_nested_object():
+    full = json.dumps({
+        "initial_recommendation": "Do it",
+        "one_sentence_summary": "Yes",
+        "critical_points_to_consider": {"1": "a", "2": "b"}
+    }, indent=2)
+    # The remaining text ends with the nested object's brace
+    response = TokenBudget(STOP_CONFIG).record("expert", "m", stopped(full))
+    assert json.loads(response["content"]) == json.loads(full)
+
+def test_leaves_complete_json_alone():
+    content = '{"a": 1}'
+    response = TokenBudget(STOP_CONFIG).record("expert", "m", {"content": content, "finish_reason": "stop"})
+    assert response["content"] == content
+
+def test_no_repair_without_stop_sequence():
+    content = '{"a": {"b": 1}'
+    response = TokenBudget({"expert": {}}).record("expert", "m", {"content": content, "finish_reason": "stop"})
+    assert response["content"] == content
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from backend import llm_client
+from backend.appender import get_appender
+from backend.cassette import Cassette, summarize
+
+MESSAGES = [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "How should we price the new tier?"}]
+
+class FakeClient(llm_client.LLMClient):
+    def __init__(self):
+        self.sent = []
+
+    async def _request(self, model, messages, temperature, max_tokens, timeout, stop):
+        self.sent.append(model)
+        return {"content": f"{model} answer {len(self.sent)}", "usage": {}}
+
+def use(monkeypatch, cassette):
+    monkeypatch.setattr(llm_client, "get_cassette", lambda: cassette)
+
+def test_replay_ignores_routing_and_max_tokens(tmp_path, monkeypatch):
+    path = tmp_path / "run.jsonl"
+    client = FakeClient()
+    use(monkeypatch, Cassette({"mode": "record", "path": str(path)}))
+    # Recorded while the breaker routed openai/gpt-4o to a substitute, with an adaptive max_tokens
+    recorded = asyncio.run(client._send("anthropic/claude-3.5-sonnet", MESSAGES, 0.3, 900, 60, None, requested="openai/gpt-4o"))
+    get_appender().flush()
+
+    use(monkeypatch, Cassette({"mode": "replay", "path": str(path), "time_scale": 0, "fuzzy": False}))
+    replayed = asyncio.run(client._send("openai/gpt-4o", MESSAGES, 0.3, 2000, 60, None))
+    assert replayed == recorded
+    assert client.sent == ["anthropic/claude-3.5-sonnet"]
+    # Temperature is part of the key
+    assert asyncio.run(client._send("openai/gpt-4o", MESSAGES, 0.9, 2000, 60, None)) is None
+
+def test_identical_calls_replay_in_order_then_cycle(tmp_path, monkeypatch):
+    path = tmp_path / "run.jsonl"
+    client = FakeClient()
+    use(monkeypatch, Cassette({"mode": "record", "path": str(path)}))
+    first = asyncio.run(client._send("m", MESSAGES, 0.3, 100, 60, None))
+    second = asyncio.run(client._send("m", MESSAGES, 0.3, 100, 60, None))
+    get_appender().flush()
+
+    use(monkeypatch, Cassette({"mode": "replay", "path": str(path), "time_scale": 0}))
+    replies = [asyncio.run(client._send("m", MESSAGES, 0.3, 100, 60, None)) for _ in range(3)]
+    assert replies == [first, second, first]
+
+def test_fuzzy_match_by_prompt_similarity(tmp_path, monkeypatch):
+    path = tmp_path / "run.jsonl"
+    client = FakeClient()
+    use(monkeypatch, Cassette({"mode": "record", "path": str(path)}))
+    recorded = asyncio.run(client._send("m", MESSAGES, 0.3, 100, 60, None))
+    get_appender().flush()
+
+    use(monkeypatch, Cassette({"mode": "replay", "path": str(path), "time_scale": 0, "fuzzy_threshold": 0.5}))
+    similar = [MESSAGES[0], {"role": "user", "content": "How should we price the new enterprise tier?"}]
+    assert asyncio.run(client._send("m", similar, 0.3, 100, 60, None)) == recorded
+    assert asyncio.run(client._send("other", similar, 0.3, 100, 60, None)) is None
+    assert summarize(path)["m"]["calls"] == 1
+
+def test_recorded_result_is_not_changed_by_later_annotation(tmp_path, monkeypatch):
+    path = tmp_path / "run.jsonl"
+    client = FakeClient()
+    use(monkeypatch, Cassette({"mode": "record", "path": str(path)}))
+    result = asyncio.run(client._send("m", MESSAGES, 0.3, 100, 60, None))
+    result["model"] = "substitute"
+    get_appender().flush()
+    with open(path) as f:
+        assert "model" not in json.loads(f.readline())["result"]
@@ -0,0 +1,84 @@
+from backend import circuit_breaker
+from backend.circuit_breaker import CLOSED, HALF_OPEN, OPEN, BreakerRegistry, CircuitBreaker, DEFAULT_BREAKER
+
+SETTINGS = {**DEFAULT_BREAKER, "min_calls": 2, "cooldown_seconds": 30, "slow_call_seconds": 5}
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+def fake_clock(monkeypatch) -> Clock:
+    clock = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", clock)
+    return clock
+
+def test_opens_then_half_opens_then_closes(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    breaker = CircuitBreaker(SETTINGS)
+    breaker.record(False, 1)
+    assert breaker.state == CLOSED
+    breaker.record(True, 1)
+    assert breaker.state == OPEN
+    assert not breaker.allow()
+
+    clock.now += 30
+    # One probe only while half-open
+    assert breaker.allow()
+    assert breaker.state == HALF_OPEN
+    assert not breaker.allow()
+
+    breaker.record(True, 1)
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.snapshot()["calls"] == 0
+
+def test_failed_probe_reopens(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    breaker = CircuitBreaker(SETTINGS)
+    breaker.record(False, 1)
+    breaker.record(False, 1)
+    clock.now += 30
+    assert breaker.allow()
+    # Slow calls count as failures
+    breaker.record(True, 6)
+    assert breaker.state == OPEN
+    assert breaker.opened_at == clock.now
+    clock.now += 29
+    assert not breaker.allow()
+
+def test_old_calls_leave_the_window(monkeypatch):
+    clock = fake_clock(monkeypatch)
+    breaker = CircuitBreaker(SETTINGS)
+    breaker.record(False, 1)
+    clock.now += SETTINGS["window_seconds"] + 1
+    breaker.record(True, 1)
+    breaker.record(True, 1)
+    assert breaker.state == CLOSED
+    assert breaker.error_rate() == 0.0
+
+def test_registry_routes_to_substitutes(monkeypatch):
+    fake_clock(monkeypatch)
+    registry = BreakerRegistry(
+        {"circuit_breaker": {"min_calls": 1}, "substitutes": {"a": ["c"]}},
+        ["a", "b", "c"]
+    )
+    assert registry.candidates("a") == ["c", "b"]
+    assert registry.route("a") == "a"
+
+    registry.record("a", False, 1)
+    assert registry.route("a") == "c"
+    registry.record("c", False, 1)
+    assert registry.route("a") == "b"
+    registry.record("b", False, 1)
+    # Every route open: the original model is returned
+    assert registry.route("a") == "a"
+    assert set(registry.snapshot()) == {"a", "b", "c"}
+
+def test_disabled_registry_never_opens():
+    registry = BreakerRegistry({"circuit_breaker": {"enabled": False, "min_calls": 1}}, ["a", "b"])
+    registry.record("a", False, 1)
+    assert registry.route("a") == "a"
+    assert registry.snapshot() == {}
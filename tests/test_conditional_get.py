@@ -0,0 +1,66 @@
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.storage import Storage
+
+def client(tmp_path, monkeypatch):
+    storage = Storage(str(tmp_path / "conversations"))
+    monkeypatch.setattr(main, "get_storage", lambda: storage)
+    return TestClient(main.app), storage
+
+def test_matching_etag_gets_304(tmp_path, monkeypatch):
+    http, storage = client(tmp_path, monkeypatch)
+    conversation_id = storage.create_conversation()
+
+    response = http.get(f"/api/conversations/{conversation_id}")
+    assert response.status_code == 200
+    assert response.json()["id"] == conversation_id
+    etag = response.headers["etag"]
+    assert etag.startswith('W/"')
+
+    reads = []
+    monkeypatch.setattr(storage, "get_conversation", lambda *args, **kwargs: reads.append(args))
+    response = http.get(f"/api/conversations/{conversation_id}", headers={"If-None-Match": f'"other", {etag}'})
+    assert response.status_code == 304
+    assert response.headers["etag"] == etag
+    assert response.content == b""
+    # The conversation is not read again for a 304
+    assert reads == []
+
+def test_changed_conversation_gets_new_etag(tmp_path, monkeypatch):
+    http, storage = client(tmp_path, monkeypatch)
+    conversation_id = storage.create_conversation()
+    etag = http.get(f"/api/conversations/{conversation_id}").headers["etag"]
+
+    storage.add_message(conversation_id, "user", "How should we price it?")
+    response = http.get(f"/api/conversations/{conversation_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()["messages"][0]["content"] == "How should we price it?"
+
+def test_if_modified_since(tmp_path, monkeypatch):
+    http, storage = client(tmp_path, monkeypatch)
+    conversation_id = storage.create_conversation()
+    last_modified = http.get(f"/api/conversations/{conversation_id}").headers["last-modified"]
+
+    response = http.get(f"/api/conversations/{conversation_id}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    response = http.get(f"/api/conversations/{conversation_id}", headers={"If-Modified-Since": "Thu, 01 Jan 1970 00:00:00 GMT"})
+    assert response.status_code == 200
+    # If-None-Match wins when both are sent
+    response = http.get(f"/api/conversations/{conversation_id}", headers={
+        "If-Modified-Since": last_modified, "If-None-Match": '"stale"'
+    })
+    assert response.status_code == 200
+
+def test_missing_conversation_is_404(tmp_path, monkeypatch):
+    http, _ = client(tmp_path, monkeypatch)
+    assert http.get("/api/conversations/missing").status_code == 404
+
+def test_large_responses_are_compressed(tmp_path, monkeypatch):
+    http, storage = client(tmp_path, monkeypatch)
+    conversation_id = storage.create_conversation()
+    storage.add_message(conversation_id, "user", "price " * 1000)
+    response = http.get(f"/api/conversations/{conversation_id}", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.json()["messages"][0]["content"] == "price " * 1000
@@ -0,0 +1,55 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import yaml
+
+from backend import config
+from backend.config import CONFIG_PATH, ConfigError, load_settings
+
+ROOT = Path(__file__).resolve().parent.parent
+
+def write_config(tmp_path, change) -> Path:
+    with open(CONFIG_PATH) as f:
+        raw = yaml.safe_load(f)
+    change(raw)
+    path = tmp_path / "config.yaml"
+    path.write_text(yaml.safe_dump(raw))
+    return path
+
+def test_loads_the_shipped_config():
+    settings = load_settings()
+    assert settings.gatekeeper_model
+    assert settings.default_expert_model in settings.available_model_ids
+
+def test_missing_required_setting(tmp_path):
+    path = write_config(tmp_path, lambda raw: raw["models"].pop("notary"))
+    with pytest.raises(ConfigError, match="models.notary"):
+        load_settings(path)
+
+def test_wrong_types_are_rejected(tmp_path):
+    path = write_config(tmp_path, lambda raw: raw["server"].update(port="eighty"))
+    with pytest.raises(ConfigError, match="server.port"):
+        load_settings(path)
+    path = write_config(tmp_path, lambda raw: raw["llm"].setdefault("expert", {}).update(stop="\n}"))
+    with pytest.raises(ConfigError, match="llm.expert.stop"):
+        load_settings(path)
+    path = write_config(tmp_path, lambda raw: raw["llm"].setdefault("expert", {}).update(max_tokens=0))
+    with pytest.raises(ConfigError, match="must be positive"):
+        load_settings(path)
+
+def test_legacy_constants_resolve_through_settings():
+    assert config.GATEKEEPER_MODEL == config.get_settings().gatekeeper_model
+    assert config.AVAILABLE_MODELS == config.get_settings().available_model_ids
+    with pytest.raises(AttributeError):
+        config.NOT_A_SETTING
+
+def test_imports_stay_lazy():
+    code = (
+        "import sys, backend.main, backend.roundwise, backend.gatekeeper; "
+        "print(','.join(m for m in ('numpy', 'aiohttp', 'yaml', 'dotenv') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    # Settings, HTTP client and numpy scoring load on first use, not at import
+    assert result.stdout.strip() == ""
@@ -0,0 +1,50 @@
+from backend import roundwise
+from backend.dedup import dedupe_solutions
+
+SOLUTIONS = [
+    {"id": "1", "text": "Raise the subscription price for new customers"},
+    {"id": "2", "text": "Offer an annual plan with a discount"},
+    {"id": "3", "text": "Raise the subscription price for new customers only"},
+    {"id": "4", "text": "Offer an annual plan with a large discount"},
+    {"id": "5", "text": "Hire a dedicated sales team for enterprise accounts"}
+]
+
+def test_merges_near_duplicates_into_the_first():
+    deduped, id_map = dedupe_solutions(SOLUTIONS, threshold=0.6)
+    assert [sol["id"] for sol in deduped] == ["1", "2", "5"]
+    assert deduped[0]["merged_ids"] == ["3"]
+    assert deduped[1]["merged_ids"] == ["4"]
+    assert "merged_ids" not in deduped[2]
+    assert id_map == {"1": "1", "2": "2", "3": "1", "4": "2", "5": "5"}
+    # The input is not modified
+    assert "merged_ids" not in SOLUTIONS[0]
+
+def test_distinct_solutions_are_kept():
+    distinct = [SOLUTIONS[0], SOLUTIONS[1], SOLUTIONS[4]]
+    deduped, id_map = dedupe_solutions(distinct, threshold=0.6)
+    assert deduped == distinct
+    assert all(kept == original for original, kept in id_map.items())
+    assert dedupe_solutions([]) == ([], {})
+
+def test_cap_prefers_larger_clusters_then_notary_order():
+    deduped, id_map = dedupe_solutions(SOLUTIONS + [{"id": "6", "text": "Raise the price for new customers"}], threshold=0.6, max_solutions=2)
+    assert [sol["id"] for sol in deduped] == ["1", "2"]
+    assert id_map["5"] is None
+    assert id_map["6"] == "1"
+    # A later cluster with more members beats an earlier singleton
+    deduped, id_map = dedupe_solutions([SOLUTIONS[4], SOLUTIONS[1], SOLUTIONS[3]], threshold=0.6, max_solutions=1)
+    assert [sol["id"] for sol in deduped] == ["2"]
+    assert id_map == {"5": None, "2": "2", "4": "2"}
+
+def test_dedupe_synthesis_records_id_map(monkeypatch):
+    monkeypatch.setattr(roundwise, "_solution_settings", lambda: {
+        "dedupe": True, "similarity_threshold": 0.6, "max_solutions": 8
+    })
+    synthesis = roundwise._dedupe_synthesis({"proposed_solutions": list(SOLUTIONS)})
+    assert synthesis["notary_solutions"] == SOLUTIONS
+    assert [sol["id"] for sol in synthesis["proposed_solutions"]] == ["1", "2", "5"]
+    assert synthesis["solution_id_map"]["4"] == "2"
+
+    # Nothing merged: the synthesis is left as the Notary wrote it
+    synthesis = roundwise._dedupe_synthesis({"proposed_solutions": SOLUTIONS[:2]})
+    assert synthesis == {"proposed_solutions": SOLUTIONS[:2]}
@@ -0,0 +1,37 @@
+import asyncio
+
+from backend import main
+from backend.storage import Storage
+
+def test_same_idempotency_key_across_message_types(tmp_path, monkeypatch):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    storage.add_message(conversation_id, "assistant", "Stage 0 complete", stage_data={"stage0": {
+        "normalized_problem": "p", "key_dimensions": [], "proposed_agents": [{"agent_id": "a"}]
+    }})
+    calls = []
+
+    async def gatekeeper(conversation_id, content):
+        calls.append("stage0")
+        return {"stage": "stage0"}
+
+    async def pipeline(conversation_id, agents, normalized_problem, key_dimensions):
+        calls.append("pipeline")
+        return {"stage": "pipeline"}
+
+    monkeypatch.setattr(main, "get_storage", lambda: storage)
+    monkeypatch.setattr(main, "_run_gatekeeper", gatekeeper)
+    monkeypatch.setattr(main, "_run_pipeline", pipeline)
+    main._completed_flights.cache_clear()
+
+    async def send(kind):
+        request = main.MessageRequest(content="How should we price it?", type=kind)
+        return await main._dispatch_message(conversation_id, request, "key-1")
+
+    assert asyncio.run(send("message")) == {"stage": "stage0"}
+    assert asyncio.run(send("role_update")) == {"stage": "pipeline"}
+    # Retries of either type still get their own stored result
+    assert asyncio.run(send("message")) == {"stage": "stage0"}
+    assert asyncio.run(send("role_update")) == {"stage": "pipeline"}
+    assert calls == ["stage0", "pipeline"]
+    main._completed_flights.cache_clear()
@@ -0,0 +1,60 @@
+import json
+import os
+import time
+
+from backend.maintenance import run_maintenance, DEFAULT_RETENTION
+from backend.storage import Storage
+
+DAY = 86400
+
+def add(storage, conversation_id, messages, age_days):
+    path = storage.data_dir / f"{conversation_id}.json"
+    with open(path, "w") as f:
+        json.dump({"id": conversation_id, "created_at": "2025-01-05T00:00:00", "messages": messages}, f)
+    then = time.time() - age_days * DAY
+    os.utime(path, (then, then))
+
+def test_deletes_empty_archives_old_and_skips_busy(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    message = [{"role": "user", "content": "x"}]
+    add(storage, "empty", [], 2)
+    add(storage, "old", message, 40)
+    add(storage, "busy", message, 40)
+    add(storage, "recent", message, 1)
+
+    stats = run_maintenance(storage, DEFAULT_RETENTION, skip_ids=["busy"])
+    assert (stats["deleted_empty"], stats["archived"]) == (1, 1)
+    assert sorted(cid for cid, _ in storage.iter_conversation_files()) == ["busy", "recent"]
+    assert storage.get_conversation("old")["messages"] == message
+
+def test_dry_run_changes_nothing(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    add(storage, "old", [{"role": "user", "content": "x"}], 40)
+    assert run_maintenance(storage, DEFAULT_RETENTION, dry_run=True)["archived"] == 1
+    assert [cid for cid, _ in storage.iter_conversation_files()] == ["old"]
+
+def test_write_after_scan_is_not_lost(tmp_path):
+    class RacingStorage(Storage):
+        def file_stamp(self, conversation_id):
+            stamp = super().file_stamp(conversation_id)
+            # A request handler adds a message right after maintenance took the stamp
+            self.add_message(conversation_id, "user", "late message")
+            return stamp
+
+    storage = RacingStorage(str(tmp_path / "conversations"))
+    add(storage, "old", [{"role": "user", "content": "x"}], 40)
+    add(storage, "empty", [], 2)
+
+    stats = run_maintenance(storage, DEFAULT_RETENTION)
+    assert (stats["archived"], stats["deleted_empty"]) == (0, 0)
+    assert storage.get_conversation("old")["messages"][-1]["content"] == "late message"
+    assert storage.get_conversation("empty")["messages"][-1]["content"] == "late message"
+
+def test_delete_with_stale_stamp_keeps_file(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    stamp = storage.file_stamp(conversation_id)
+    storage.add_message(conversation_id, "user", "hello")
+    assert not storage.delete_conversation(conversation_id, stamp)
+    assert storage.delete_conversation(conversation_id, storage.file_stamp(conversation_id))
+    assert storage.get_conversation(conversation_id) is None
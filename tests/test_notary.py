@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+from backend import roundwise
+
+STAGE1 = {
+    "expert_1": {"role_name": "CFO", "one_sentence_summary": "Cut prices", "initial_recommendation": "Cut prices to grow volume"},
+    "expert_2": {"role_name": "CMO", "one_sentence_summary": "Raise prices", "initial_recommendation": "Raise prices for premium brand"},
+    "expert_3": {"role_name": "CTO", "one_sentence_summary": "Automate", "initial_recommendation": "Automate onboarding"},
+}
+STAGE2 = {
+    agent_id: {"final_stance": entry["initial_recommendation"], "one_sentence_summary": entry["one_sentence_summary"],
+               "previous_rounds": [{"final_stance": "earlier"}]}
+    for agent_id, entry in STAGE1.items()
+}
+SYNTHESIS = {"summary_markdown": "## Summary", "proposed_solutions": [{"id": "1", "text": "Cut prices"}, "Automate onboarding"]}
+
+class FakeClient:
+    """Answers map calls per expert and the Notary's reduce call"""
+
+    def __init__(self, map_replies):
+        self.map_replies = map_replies
+        self.calls = []
+
+    async def query_model(self, model, messages, trace_attributes=None, **kwargs):
+        prompt = messages[-1]["content"]
+        if trace_attributes:
+            self.calls.append(("map", trace_attributes["agent.id"], prompt))
+            reply = self.map_replies.get(trace_attributes["agent.id"])
+            return {"content": reply, "finish_reason": "stop"} if reply is not None else None
+        self.calls.append(("notary", None, prompt))
+        return {"content": json.dumps(SYNTHESIS), "finish_reason": "stop"}
+
+def synthesize(monkeypatch, map_replies, **settings):
+    client = FakeClient(map_replies)
+    monkeypatch.setattr(roundwise, "get_client", lambda: client)
+    defaults = roundwise._notary_settings()
+    monkeypatch.setattr(roundwise, "_notary_settings", lambda: {**defaults, **settings})
+    monkeypatch.setattr(roundwise, "_solution_settings", lambda: {"dedupe": False, "similarity_threshold": 0.75, "max_solutions": 8})
+    synthesis = asyncio.run(roundwise.stage3_notary_synthesis("Pricing", STAGE1, STAGE2))
+    return client, synthesis
+
+def test_map_reduce_condenses_each_expert(monkeypatch):
+    map_replies = {
+        "expert_1": json.dumps({"summary": "CFO wants volume", "solutions": ["Cut prices"]}),
+        # Failed and non-object map replies fall back to the expert's own stance
+        "expert_2": None,
+        "expert_3": json.dumps(["not", "an", "object"]),
+    }
+    client, synthesis = synthesize(monkeypatch, map_replies, mode="map_reduce")
+
+    maps = [call for call in client.calls if call[0] == "map"]
+    assert sorted(agent_id for _, agent_id, _ in maps) == ["expert_1", "expert_2", "expert_3"]
+    # Only the final rebuttal round is sent
+    assert all("earlier" not in prompt for _, _, prompt in maps)
+
+    reduce_prompt = client.calls[-1][2]
+    assert client.calls[-1][0] == "notary"
+    condensed = json.loads(reduce_prompt.split("per expert):\n", 1)[1].split("\n\nYour job:", 1)[0])
+    assert condensed[0] == {"expert": "CFO", "summary": "CFO wants volume", "solutions": ["Cut prices"]}
+    assert [entry["expert"] for entry in condensed] == ["CFO", "CMO", "CTO"]
+    assert condensed[1]["solutions"] == [] and condensed[1]["summary"]
+    assert condensed[2]["solutions"] == []
+
+    assert synthesis["summary_markdown"] == "## Summary"
+    assert synthesis["proposed_solutions"] == [{"id": "1", "text": "Cut prices"}, {"id": "2", "text": "Automate onboarding"}]
+
+def test_single_mode_sends_everything_to_one_call(monkeypatch):
+    client, synthesis = synthesize(monkeypatch, {}, mode="single")
+    assert [call[0] for call in client.calls] == ["notary"]
+    assert "Raise prices for premium brand" in client.calls[0][2]
+    assert len(synthesis["proposed_solutions"]) == 2
+
+def test_auto_mode_picks_by_panel_size_and_prompt_length(monkeypatch):
+    client, _ = synthesize(monkeypatch, {}, mode="auto", map_reduce_min_experts=4, max_prompt_chars=100000)
+    assert [call[0] for call in client.calls] == ["notary"]
+    client, _ = synthesize(monkeypatch, {}, mode="auto", map_reduce_min_experts=3)
+    assert [call[0] for call in client.calls].count("map") == 3
+    client, _ = synthesize(monkeypatch, {}, mode="auto", map_reduce_min_experts=10, max_prompt_chars=100)
+    assert [call[0] for call in client.calls].count("map") == 3
@@ -0,0 +1,59 @@
+import time
+from collections import Counter
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend import profiling
+from backend.profiling import Profile, ProfileManager, ProfileMiddleware
+
+def busy(seconds: float) -> int:
+    total = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        total += sum(range(200))
+    return total
+
+def test_folded_and_top():
+    profile = Profile("p", "test", 0.005)
+    profile.stacks = Counter({("main", "handler", "parse"): 3, ("main", "handler"): 1})
+    assert profile.folded() == "main;handler;parse 3\nmain;handler 1"
+    top = profile.top(5)
+    assert top[0] == {"function": "parse", "self_samples": 3, "self_pct": 75.0, "total_samples": 3, "total_pct": 75.0}
+    assert top[1]["function"] == "handler" and top[1]["total_samples"] == 4
+
+def test_samples_the_calling_thread_and_stores_the_profile(tmp_path):
+    profiles = ProfileManager({"interval_ms": 1, "path": str(tmp_path)})
+    profiler = profiles.start("busy loop")
+    assert profiles.start("second") is None
+    busy(0.1)
+    summary = profiles.stop(profiler)
+    assert profiles.active is None
+
+    assert summary["samples"] > 0
+    assert any("busy (test_profiling.py" in entry["function"] for entry in summary["top"])
+    assert profiles.list_profiles()[0]["id"] == summary["id"]
+    assert profiles.get_profile(summary["id"])["label"] == "busy loop"
+    assert "busy (test_profiling.py" in profiles.get_profile(summary["id"], folded=True)
+    assert profiles.get_profile("../" + summary["id"]) is None
+
+def test_middleware_requires_admin_and_reports_profile_id(tmp_path, monkeypatch):
+    profiles = ProfileManager({"interval_ms": 1, "path": str(tmp_path)})
+    monkeypatch.setattr(profiling, "get_profiles", lambda: profiles)
+    app = FastAPI()
+
+    @app.get("/work")
+    def work():
+        return {"total": busy(0.02)}
+
+    app.add_middleware(ProfileMiddleware, is_admin=lambda token: token == "secret")
+    http = TestClient(app)
+
+    assert "x-profile-id" not in http.get("/work").headers
+    assert http.get("/work", headers={"X-Profile": "1"}).status_code == 403
+
+    response = http.get("/work", headers={"X-Profile": "1", "X-Admin-Token": "secret"})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+    assert profiles.get_profile(profile_id)["label"] == "GET /work"
+    assert (tmp_path / f"{profile_id}.folded").exists()
@@ -0,0 +1,62 @@
+import asyncio
+import json
+
+import pytest
+
+from backend import prompts, roundwise
+from backend.prompts import PromptCacheStats, build_messages
+
+AGENTS = [
+    {"agent_id": "expert_1", "role_name": "CFO", "role_mission": "Costs", "llm_model": "openai/gpt-4o"},
+    {"agent_id": "expert_2", "role_name": "CMO", "role_mission": "Growth", "llm_model": "openai/gpt-4o"},
+]
+
+@pytest.fixture
+def cache_settings(monkeypatch):
+    settings = {**prompts.DEFAULT_PROMPT_CACHE}
+    monkeypatch.setattr(prompts, "prompt_cache_settings", lambda: settings)
+    return settings
+
+def test_plain_models_get_shared_content_first(cache_settings):
+    messages = build_messages("openai/gpt-4o", "Stage rules", "Shared problem", "Expert part")
+    assert messages == [
+        {"role": "system", "content": "Stage rules"},
+        {"role": "user", "content": "Shared problem\n\nExpert part"}
+    ]
+
+def test_cache_control_models_get_a_breakpoint_after_shared_content(cache_settings):
+    user = build_messages("anthropic/claude-3.5-sonnet", "Stage rules", "Shared problem", "Expert part")[1]
+    assert user["content"] == [
+        {"type": "text", "text": "Shared problem", "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": "Expert part"}
+    ]
+    cache_settings["enabled"] = False
+    user = build_messages("anthropic/claude-3.5-sonnet", "Stage rules", "Shared problem")[1]
+    assert user["content"] == "Shared problem"
+
+def test_cache_stats_hit_ratio():
+    stats = PromptCacheStats()
+    assert stats.record("m", {"prompt_tokens": 2000, "prompt_tokens_details": {"cached_tokens": 1500}}) == 1500
+    assert stats.record("m", {"prompt_tokens": 2000}) == 0
+    assert stats.record("m", None) == 0
+    assert stats.snapshot() == {"m": {"calls": 3, "prompt_tokens": 4000, "cached_tokens": 1500, "hit_ratio": 0.375}}
+
+def test_stage1_prompts_share_a_prefix_across_experts(cache_settings, monkeypatch):
+    sent = []
+
+    class FakeClient:
+        async def query_model(self, model, messages, **kwargs):
+            sent.append(messages)
+            return {"content": json.dumps({"initial_recommendation": "r", "one_sentence_summary": "s"}), "finish_reason": "stop"}
+
+    monkeypatch.setattr(roundwise, "get_client", lambda: FakeClient())
+    asyncio.run(roundwise.stage1_expert_responses("How should we price it?", ["cost", "brand"], AGENTS))
+
+    first, second = sent
+    assert first[0] == second[0]
+    first_user, second_user = first[1]["content"], second[1]["content"]
+    # Everything before the role block is identical for both experts
+    shared = first_user[:first_user.index("Your assignment:")]
+    assert "How should we price it?" in shared
+    assert second_user.startswith(shared)
+    assert "CFO" in first_user[len(shared):] and "CMO" in second_user[len(shared):]
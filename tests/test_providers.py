@@ -0,0 +1,81 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend import config
+from backend.providers import GeminiProvider, OpenAICompatibleProvider, Provider, ProviderRouter
+
+MESSAGES = [
+    {"role": "system", "content": [{"type": "text", "text": "You are an expert.", "cache_control": {"type": "ephemeral"}}]},
+    {"role": "user", "content": "Should we raise prices?"}
+]
+
+class FakeProvider(Provider):
+    def __init__(self, name, replies):
+        self.name = name
+        self.replies = list(replies)
+        self.timeouts = []
+
+    async def request(self, model, messages, temperature, max_tokens, timeout, stop):
+        self.timeouts.append(timeout)
+        reply = self.replies.pop(0)
+        return {"content": reply} if reply else None
+
+def make_router(monkeypatch, direct_replies, openrouter_replies, **providers_config):
+    monkeypatch.setattr(config, "get_settings", lambda: SimpleNamespace(openai_api_key=None, gemini_api_key=None, raw={}))
+    openrouter = FakeProvider("openrouter", openrouter_replies)
+    provider_router = ProviderRouter(openrouter, {"circuit_breaker": {"min_calls": 2}, **providers_config})
+    provider_router.direct["openai"] = FakeProvider("openai", direct_replies)
+    return provider_router
+
+def send(provider_router, model="openai/gpt-4o", timeout=60):
+    return asyncio.run(provider_router.request(model, MESSAGES, 0.3, 100, timeout, None))
+
+def test_direct_provider_with_openrouter_fallback(monkeypatch):
+    provider_router = make_router(monkeypatch, ["direct", None], ["routed"], direct_timeout_seconds=10)
+    assert send(provider_router) == {"content": "direct", "provider": "openai"}
+    assert send(provider_router) == {"content": "routed", "provider": "openrouter"}
+    # The direct attempt gets the shorter timeout, the fallback the call's own
+    assert provider_router.direct["openai"].timeouts == [10, 10]
+    assert provider_router.openrouter.timeouts == [60]
+
+def test_other_models_go_to_openrouter(monkeypatch):
+    provider_router = make_router(monkeypatch, [], ["routed"])
+    assert send(provider_router, "anthropic/claude-3.5-sonnet") == {"content": "routed", "provider": "openrouter"}
+    assert provider_router.breakers == {}
+
+def test_open_breaker_skips_direct_provider(monkeypatch):
+    provider_router = make_router(monkeypatch, [None, None], ["a", "b", "c"])
+    send(provider_router)
+    send(provider_router)
+    assert provider_router.snapshot()["breakers"]["openai"]["state"] == "open"
+    assert send(provider_router) == {"content": "c", "provider": "openrouter"}
+    assert len(provider_router.direct["openai"].timeouts) == 2
+
+def test_openai_payload_flattens_content_and_strips_prefix():
+    provider = OpenAICompatibleProvider("openai", "key", "https://api.openai.com/v1", strip_prefix="openai/")
+    payload = provider.payload("openai/gpt-4o", MESSAGES, 0.3, 100, ["\n}"])
+    assert payload["model"] == "gpt-4o"
+    assert payload["messages"][0] == {"role": "system", "content": "You are an expert."}
+    assert payload["stop"] == ["\n}"]
+
+def test_gemini_request_and_response_translation(monkeypatch):
+    provider = GeminiProvider("key", "https://gemini.example/v1beta")
+    sent = {}
+
+    async def post(url, payload, headers, timeout, model):
+        sent.update(url=url, payload=payload)
+        return {
+            "candidates": [{"content": {"parts": [{"text": "Yes"}, {"text": "."}]}, "finishReason": "MAX_TOKENS"}],
+            "usageMetadata": {"promptTokenCount": 12, "candidatesTokenCount": 2, "cachedContentTokenCount": 8}
+        }
+
+    monkeypatch.setattr(provider, "_post", post)
+    result = asyncio.run(provider.request("google/gemini-1.5-pro", MESSAGES, 0.3, 100, 60, None))
+    assert sent["url"] == "https://gemini.example/v1beta/models/gemini-1.5-pro:generateContent"
+    assert sent["payload"]["systemInstruction"] == {"parts": [{"text": "You are an expert."}]}
+    assert sent["payload"]["contents"] == [{"role": "user", "parts": [{"text": "Should we raise prices?"}]}]
+    assert result == {
+        "content": "Yes.",
+        "finish_reason": "length",
+        "usage": {"prompt_tokens": 12, "completion_tokens": 2, "prompt_tokens_details": {"cached_tokens": 8}}
+    }
@@ -0,0 +1,69 @@
+import asyncio
+import json
+
+from backend import roundwise
+from backend.roundwise import _completion_tokens, _point_list, _rebuttal_prompt
+
+AGENTS = [
+    {"agent_id": "expert_1", "role_name": "CFO", "role_mission": "Costs", "llm_model": "openai/gpt-4o"},
+    {"agent_id": "expert_2", "role_name": "CMO", "role_mission": "Growth", "llm_model": "google/gemini-2.0-flash-001"},
+]
+STAGE1 = {
+    "expert_1": {"role_name": "CFO", "one_sentence_summary": "Cut prices", "initial_recommendation": "Cut prices to grow volume",
+                 "critical_points_to_consider": {"1": "margin", "2": "volume"}},
+    "expert_2": {"role_name": "CMO", "one_sentence_summary": "Raise prices", "initial_recommendation": "Raise prices for premium brand",
+                 "critical_points_to_consider": "brand perception"},
+}
+
+class FakeClient:
+    def __init__(self, stances):
+        self.stances = stances
+        self.prompts = []
+
+    async def query_model(self, model, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"] if isinstance(messages[-1]["content"], str) else str(messages[-1]["content"]))
+        stance = self.stances[model][min((len(self.prompts) - 1) // 2, len(self.stances[model]) - 1)]
+        return {"content": json.dumps({
+            "final_stance": stance, "one_sentence_summary": stance, "critical_points_to_consider": "one string point"
+        }), "usage": {"completion_tokens": 50}, "finish_reason": "stop"}
+
+def run(monkeypatch, stances, **settings):
+    client = FakeClient(stances)
+    monkeypatch.setattr(roundwise, "get_client", lambda: client)
+    defaults = roundwise._rebuttal_settings()
+    monkeypatch.setattr(roundwise, "_rebuttal_settings", lambda: {**defaults, **settings})
+    result, _, deliberation = asyncio.run(roundwise.stage2_expert_rebuttals("Pricing", AGENTS, STAGE1))
+    return client, result, deliberation
+
+def test_point_list_accepts_every_shape():
+    assert _point_list({"1": "a", "2": "b"}) == ["a", "b"]
+    assert _point_list(["a", "b"]) == ["a", "b"]
+    assert _point_list("just one point") == ["just one point"]
+    assert _point_list(None) == []
+
+def test_string_points_are_not_split_into_characters():
+    previous = {"expert_2": {"one_sentence_summary": "s", "final_stance": "f", "critical_points_to_consider": "brand"}}
+    prompt = _rebuttal_prompt(AGENTS[0], "expert_2", STAGE1, previous)
+    assert "- brand" in prompt and "- b\n" not in prompt
+    assert "- brand perception" in _rebuttal_prompt(AGENTS[0], "expert_2", STAGE1, {})
+
+def test_completion_tokens_falls_back_to_content_length():
+    assert _completion_tokens({"usage": {"completion_tokens": 7}, "content": "x" * 400}) == 7
+    assert _completion_tokens({"content": "x" * 400}) == 100
+    assert _completion_tokens(None) == 0
+
+def test_single_round_by_default(monkeypatch):
+    stances = {a["llm_model"]: ["keep arguing " + a["role_name"]] for a in AGENTS}
+    client, result, deliberation = run(monkeypatch, stances, max_rounds=1)
+    assert deliberation["rounds"] == 1 and len(client.prompts) == 2
+    assert set(result) == {"expert_1", "expert_2"}
+
+def test_stops_when_experts_converge(monkeypatch):
+    stances = {
+        "openai/gpt-4o": ["cut prices now", "a premium tier with moderate price increase for brand value"],
+        "google/gemini-2.0-flash-001": ["raise prices", "a premium tier with moderate price increase for brand value"],
+    }
+    client, result, deliberation = run(monkeypatch, stances, max_rounds=3, min_rounds=1, convergence_threshold=0.9)
+    assert deliberation["stop_reason"] == "converged"
+    assert deliberation["rounds"] == 2
+    assert result["expert_1"]["previous_rounds"][0]["final_stance"] == "cut prices now"
@@ -0,0 +1,87 @@
+from types import SimpleNamespace
+
+import pytest
+
+from backend import router
+from backend.circuit_breaker import BreakerRegistry
+from backend.router import ModelRouter
+
+@pytest.fixture
+def breakers(monkeypatch):
+    registry = BreakerRegistry({"circuit_breaker": {"min_calls": 1}}, [])
+    monkeypatch.setattr(router, "get_breakers", lambda: registry)
+    return registry
+
+def make_router(**settings) -> ModelRouter:
+    return ModelRouter({
+        "min_samples": 2,
+        "probe_every": 0,
+        "slo_seconds": {"gatekeeper": 5},
+        "candidates": {"gatekeeper": ["fast", "cheap"]},
+        **settings
+    })
+
+def feed(model_router: ModelRouter, model: str, latency: float, cost: float = None, ok: bool = True, times: int = 3):
+    for _ in range(times):
+        model_router.record("gatekeeper", model, ok, latency, {"cost": cost} if cost is not None else None)
+
+def test_keeps_configured_model_without_data(breakers):
+    assert make_router().choose("gatekeeper", "slow") == "slow"
+    assert make_router().choose("expert", "slow") == "slow"
+
+def test_switches_when_configured_misses_slo(breakers):
+    model_router = make_router()
+    feed(model_router, "slow", 9)
+    feed(model_router, "fast", 1, cost=0.02)
+    feed(model_router, "cheap", 3, cost=0.01)
+    assert model_router.meets_slo("gatekeeper", "slow") is False
+    assert model_router.choose("gatekeeper", "slow") == "fast"
+
+    model_router.settings["prefer"] = "cheapest"
+    assert model_router.choose("gatekeeper", "slow") == "cheap"
+
+    # Configured model meeting the SLO is kept under "configured"
+    model_router.settings["prefer"] = "configured"
+    feed(model_router, "slow", 4, times=50)
+    assert model_router.choose("gatekeeper", "slow") == "slow"
+
+def test_errors_and_open_breakers_are_not_eligible(breakers):
+    model_router = make_router()
+    feed(model_router, "slow", 9)
+    feed(model_router, "fast", 1, ok=False)
+    feed(model_router, "cheap", 2)
+    assert model_router.choose("gatekeeper", "slow") == "cheap"
+
+    breakers.record("cheap", False, 1)
+    assert model_router.choose("gatekeeper", "slow") == "slow"
+
+def test_probe_goes_to_least_recently_seen(breakers):
+    model_router = make_router(probe_every=2)
+    feed(model_router, "slow", 1)
+    feed(model_router, "fast", 1)
+    assert model_router.choose("gatekeeper", "slow") == "slow"
+    # Second choice is a probe: "cheap" has never been called
+    assert model_router.choose("gatekeeper", "slow") == "cheap"
+
+def test_slo_warning_for_expert_models(breakers, monkeypatch):
+    monkeypatch.setattr(router, "get_settings", lambda: SimpleNamespace(available_model_ids=["slow", "fast"]))
+    model_router = make_router(slo_seconds={"expert": 10})
+    for model, latency in (("slow", 20), ("fast", 2)):
+        for _ in range(3):
+            model_router.record("expert", model, True, latency)
+
+    warnings = model_router.check_agents([
+        {"agent_id": "a", "llm_model": "slow"},
+        {"agent_id": "b", "llm_model": "fast"}
+    ])
+    assert warnings == [{
+        "agent_id": "a", "stage": "expert", "model": "slow", "slo_seconds": 10,
+        "latency_p": 20, "error_rate": 0.0, "suggested_model": "fast"
+    }]
+
+def test_disabled_router_keeps_configured(breakers):
+    model_router = make_router(enabled=False)
+    feed(model_router, "slow", 9)
+    feed(model_router, "fast", 1)
+    assert model_router.choose("gatekeeper", "slow") == "slow"
+    assert model_router.slo_warning("gatekeeper", "slow") is None
@@ -0,0 +1,66 @@
+import numpy as np
+
+from backend.scoring import aggregate_rankings, largest_remainder, normalize_allocation
+
+def test_largest_remainder_sums_to_budget():
+    rng = np.random.default_rng(0)
+    raw = rng.random((50, 4, 7)) * 20
+    points = largest_remainder(raw)
+    assert points.shape == raw.shape
+    assert (points.sum(axis=-1) == 10).all()
+    assert (points >= 0).all()
+
+def test_largest_remainder_ties_go_to_lower_index():
+    # Three equal shares of 10: 3 each plus one leftover point
+    assert largest_remainder(np.array([1.0, 1.0, 1.0])).tolist() == [4, 3, 3]
+
+def test_largest_remainder_mask_and_empty_rows():
+    mask = np.array([True, False, True, True])
+    points = largest_remainder(np.array([5.0, 100.0, 5.0, 0.0]), mask=mask)
+    assert points.tolist() == [5, 0, 5, 0]
+    # No positive points: spread evenly over the valid solutions only
+    points = largest_remainder(np.array([0.0, 0.0, 0.0, 0.0]), mask=mask)
+    assert points.tolist() == [4, 0, 3, 3]
+    # Negative and NaN inputs count as 0
+    assert largest_remainder(np.array([-3.0, np.nan, 2.0])).tolist() == [0, 0, 10]
+
+def test_normalize_allocation_ignores_unknown_ids():
+    allocation = normalize_allocation({"S1": 6, "S9": 50, "S3": 2}, ["S1", "S2", "S3"])
+    assert allocation == {"S1": 8, "S2": 0, "S3": 2}
+
+def test_normalize_allocation_treats_none_as_zero():
+    allocation = normalize_allocation({"S1": None, "S2": 3}, ["S1", "S2"])
+    assert allocation == {"S1": 0, "S2": 10}
+
+def scores(**points):
+    return {"scores": [{"id": sol_id, "text": sol_id.lower(), "points": p} for sol_id, p in points.items()]}
+
+def test_aggregate_rankings_orders_by_total_then_borda():
+    stage4 = {
+        "a": scores(S1=5, S2=5, S3=0),
+        "b": scores(S1=2, S2=4, S3=4),
+        "c": scores(S1=3, S2=1, S3=6)
+    }
+    rankings = aggregate_rankings(stage4)
+    # Every solution totals 10 points; Borda decides
+    assert [(r["id"], r["total"], r["borda"]) for r in rankings] == [
+        ("S3", 10, 3.5), ("S2", 10, 3.0), ("S1", 10, 2.5)
+    ]
+    assert [r["approvals"] for r in rankings] == [2.0, 3.0, 3.0]
+
+def test_aggregate_rankings_weights_and_intervals():
+    stage4 = {"a": scores(S1=10, S2=0), "b": scores(S1=0, S2=10)}
+    rankings = aggregate_rankings(stage4, weights={"a": 2.0})
+    assert [r["id"] for r in rankings] == ["S1", "S2"]
+    assert rankings[0]["total"] == 20
+    assert rankings[1]["total"] == 10
+    for r in rankings:
+        assert 0 <= r["ci_low"] <= r["mean"] <= r["ci_high"] <= 10
+
+def test_aggregate_rankings_uses_given_solutions():
+    solutions = [{"id": "S1", "text": "one", "merged_ids": ["S4"]}, {"id": "S2", "text": "two"}]
+    rankings = aggregate_rankings({"a": scores(S2=7, S1=3, S9=4)}, solutions)
+    assert [(r["id"], r["total"]) for r in rankings] == [("S2", 7), ("S1", 3)]
+    assert rankings[1]["merged_ids"] == ["S4"]
+    assert "merged_ids" not in rankings[0]
+    assert aggregate_rankings({}) == []
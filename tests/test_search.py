@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from backend import main
+from backend.search import to_match_query
+from backend.storage import Storage
+
+def problem(conversation_id, text):
+    return {"id": conversation_id, "created_at": "2025-01-05", "messages": [{"role": "user", "content": text}]}
+
+def test_storage_does_not_create_index_until_used(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    storage.get_conversation(conversation_id)
+    storage.delete_conversation(conversation_id)
+    assert not storage.search_path.exists()
+
+    conversation_id = storage.create_conversation()
+    storage.add_message(conversation_id, "user", "How should we price the enterprise tier?")
+    assert storage.search_path.exists()
+    found = storage.search.search("pricing enterprise")
+    assert [r["id"] for r in found["results"]] == [conversation_id]
+
+def test_delete_removes_from_index(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    storage.add_message(conversation_id, "user", "vendor migration risk")
+    storage.delete_conversation(conversation_id)
+    assert storage.search.search("vendor")["total"] == 0
+
+def test_match_query_quotes_terms_and_prefixes_last():
+    assert to_match_query('churn "retention" on') == '"churn" "retention" "on"*'
+    assert to_match_query("  ") == ""
+
+def test_startup_backfills_existing_store_once(tmp_path, monkeypatch):
+    storage = Storage(str(tmp_path / "conversations"))
+    for i, text in enumerate(["hiring roadmap", "security compliance"]):
+        with open(storage.data_dir / f"c{i}.json", "w") as f:
+            json.dump(problem(f"c{i}", text), f)
+    storage.archive_conversations([problem("a1", "security audit")], "segment-2025-01.jsonl.gz")
+    monkeypatch.setattr(main, "get_storage", lambda: storage)
+
+    async def startup():
+        await main.backfill_search_index()
+        # The backfill runs as a background task on a worker thread
+        while not storage.search.backfilled:
+            await asyncio.sleep(0.01)
+
+    asyncio.run(startup())
+    assert storage.search.search("security")["total"] == 2
+
+    reopened = Storage(str(tmp_path / "conversations"))
+    assert reopened.search.backfilled
@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from backend import singleflight
+from backend.singleflight import SingleFlight, request_key
+
+def test_request_key_is_stable():
+    assert request_key("c", {"b": 1, "a": 2}) == request_key("c", {"a": 2, "b": 1})
+    assert request_key("c", "message") != request_key("c", "start_deliberation")
+
+def test_concurrent_callers_share_one_run():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def run():
+        flights = SingleFlight()
+        results = await asyncio.gather(*(flights.do("k", work) for _ in range(5)))
+        assert not flights.in_flight("k")
+        return results
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+def test_one_cancelled_waiter_does_not_cancel_the_work():
+    async def run():
+        flights = SingleFlight(cancel_orphans=True)
+        release = asyncio.Event()
+
+        async def work():
+            await release.wait()
+            return "done"
+
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        await asyncio.sleep(0)
+        release.set()
+        return await second, first.cancelled()
+
+    assert asyncio.run(run()) == ("done", True)
+
+def test_orphaned_work_is_cancelled():
+    async def run(cancel_orphans):
+        flights = SingleFlight(cancel_orphans=cancel_orphans)
+        state = {}
+
+        async def work():
+            try:
+                await asyncio.sleep(0.05)
+                state["finished"] = True
+            except asyncio.CancelledError:
+                state["cancelled"] = True
+                raise
+
+        waiter = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.sleep(0.1)
+        return state
+
+    assert asyncio.run(run(True)) == {"cancelled": True}
+    # Without cancel_orphans the work runs to completion
+    assert asyncio.run(run(False)) == {"finished": True}
+
+def test_results_are_kept_for_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(singleflight.time, "monotonic", lambda: now[0])
+    calls = []
+
+    async def work():
+        calls.append(1)
+        return len(calls)
+
+    async def run():
+        flights = SingleFlight(result_ttl=10)
+        first = await flights.do("k", work)
+        now[0] += 5
+        retry = await flights.do("k", work)
+        now[0] += 10
+        expired = await flights.do("k", work)
+        return first, retry, expired
+
+    assert asyncio.run(run()) == (1, 1, 2)
+
+def test_failures_are_not_cached():
+    calls = []
+
+    async def work():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("boom")
+        return "ok"
+
+    async def run():
+        flights = SingleFlight(result_ttl=60)
+        with pytest.raises(RuntimeError):
+            await flights.do("k", work)
+        return await flights.do("k", work)
+
+    assert asyncio.run(run()) == "ok"
+    assert len(calls) == 2
+
+def test_max_results_evicts_oldest():
+    async def work():
+        return "v"
+
+    async def run():
+        flights = SingleFlight(result_ttl=60, max_results=2)
+        for key in ("a", "b", "c"):
+            await flights.do(key, work)
+        return list(flights._results)
+
+    assert asyncio.run(run()) == ["b", "c"]
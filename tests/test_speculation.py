@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from backend import admission, roundwise, speculation
+from backend.admission import AdmissionController, PIPELINE
+from backend.speculation import SpeculativeStage1
+
+AGENTS = [
+    {"agent_id": "expert_1", "role_name": "CFO", "role_mission": "Costs", "llm_model": "openai/gpt-4o"},
+    {"agent_id": "expert_2", "role_name": "CMO", "role_mission": "Growth", "llm_model": "openai/gpt-4o"},
+]
+
+@pytest.fixture
+def stage1(monkeypatch):
+    calls = []
+    controller = AdmissionController({})
+    monkeypatch.setattr(admission, "get_admission", lambda: controller)
+
+    async def expert_response(normalized_problem, key_dimensions, agent):
+        calls.append(agent["agent_id"])
+        await asyncio.sleep(0.01)
+        return {"role_name": agent["role_name"]}
+
+    monkeypatch.setattr(roundwise, "stage1_expert_response", expert_response)
+    return calls, controller
+
+def test_unchanged_agents_are_reused_and_edited_ones_cancelled(stage1):
+    async def run():
+        speculative = SpeculativeStage1({"enabled": True})
+        assert speculative.start("c1", "Pricing", ["cost"], AGENTS) == 2
+        edited = [AGENTS[0], {**AGENTS[1], "role_mission": "Brand"}]
+        claimed = speculative.claim("c1", "Pricing", ["cost"], edited)
+        await asyncio.sleep(0)
+        return claimed, await claimed["expert_1"], speculative.snapshot()
+
+    claimed, result, snapshot = asyncio.run(run())
+    assert list(claimed) == ["expert_1"]
+    assert result == {"role_name": "CFO"}
+    assert snapshot == {"started": 2, "reused": 1, "cancelled": 1, "expired": 0, "pending_conversations": 0}
+
+def test_changed_problem_discards_everything(stage1):
+    async def run():
+        speculative = SpeculativeStage1({"enabled": True})
+        speculative.start("c1", "Pricing", ["cost"], AGENTS)
+        claimed = speculative.claim("c1", "Pricing v2", ["cost"], AGENTS)
+        # Consumed: a second claim finds nothing
+        return claimed, speculative.claim("c1", "Pricing", ["cost"], AGENTS), speculative.stats["cancelled"]
+
+    assert asyncio.run(run()) == ({}, {}, 2)
+
+def test_disabled_or_loaded_does_not_speculate(stage1):
+    calls, controller = stage1
+
+    async def run():
+        assert SpeculativeStage1({"enabled": False}).start("c1", "Pricing", [], AGENTS) == 0
+        controller.queued[PIPELINE] = 1
+        assert SpeculativeStage1({"enabled": True}).start("c1", "Pricing", [], AGENTS) == 0
+
+    asyncio.run(run())
+    assert calls == []
+
+def test_unclaimed_work_expires(stage1, monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(speculation.time, "monotonic", lambda: now[0])
+
+    async def run():
+        speculative = SpeculativeStage1({"enabled": True, "ttl_seconds": 60})
+        speculative.start("c1", "Pricing", [], AGENTS)
+        now[0] += 61
+        return speculative.snapshot()
+
+    snapshot = asyncio.run(run())
+    assert snapshot["expired"] == 1
+    assert snapshot["cancelled"] == 2
+    assert snapshot["pending_conversations"] == 0
+
+def test_stage1_awaits_speculative_work(monkeypatch):
+    calls = []
+
+    async def expert_response(normalized_problem, key_dimensions, agent):
+        calls.append(agent["agent_id"])
+        return {"role_name": agent["role_name"]}
+
+    monkeypatch.setattr(roundwise, "stage1_expert_response", expert_response)
+
+    async def speculated():
+        return {"role_name": "CFO (speculative)"}
+
+    async def run():
+        return await roundwise.stage1_expert_responses("Pricing", ["cost"], AGENTS, speculative={"expert_1": speculated()})
+
+    result = asyncio.run(run())
+    assert calls == ["expert_2"]
+    assert result["expert_1"] == {"role_name": "CFO (speculative)"}
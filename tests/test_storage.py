@@ -0,0 +1,109 @@
+import json
+import os
+import threading
+
+from backend.storage import ConversationCache, Storage
+
+def test_cache_evicts_least_recent_by_count_and_bytes():
+    cache = ConversationCache(max_entries=2, max_bytes=100)
+    cache.put("a", (1, 40, 1), {"id": "a"})
+    cache.put("b", (1, 40, 2), {"id": "b"})
+    assert cache.get("a", (1, 40, 1)) == {"id": "a"}
+    cache.put("c", (1, 40, 3), {"id": "c"})
+    assert cache.get("b", (1, 40, 2)) is None
+    cache.put("d", (1, 90, 4), {"id": "d"})
+    assert cache.snapshot()["entries"] == 1 and cache.snapshot()["bytes"] == 90
+    # Larger than the whole budget: not cached at all
+    cache.put("e", (1, 500, 5), {"id": "e"})
+    assert cache.get("e", (1, 500, 5)) is None
+
+def test_cache_misses_on_changed_stamp():
+    cache = ConversationCache()
+    cache.put("a", (1, 10, 1), {"id": "a"})
+    assert cache.get("a", (2, 10, 1)) is None
+    assert cache.get("a", (1, 10, 2)) is None
+
+def test_add_message_does_not_change_shared_object(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    before = storage.get_conversation(conversation_id)
+    version = before["version"]
+
+    storage.add_message(conversation_id, "user", "hello")
+    assert before["messages"] == [] and before["version"] == version
+    after = storage.get_conversation(conversation_id)
+    assert [m["content"] for m in after["messages"]] == ["hello"]
+    assert after["version"] == version + 1
+    assert storage.get_version(conversation_id)[0] == version + 1
+
+def test_versions_follow_external_rewrites(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    path = storage.data_dir / f"{conversation_id}.json"
+    conversation = storage.get_conversation(conversation_id)
+    assert storage.get_version(conversation_id)[0] == 1
+
+    # Same size and mtime, new file: only the inode tells them apart
+    stat = path.stat()
+    tmp = path.with_name("rewrite.tmp")
+    with open(tmp, "w") as f:
+        json.dump({**conversation, "version": 2}, f, indent=2)
+    os.utime(tmp, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    tmp.replace(path)
+    assert path.stat().st_size == stat.st_size
+    assert storage.get_version(conversation_id)[0] == 2
+    assert storage.get_conversation(conversation_id)["version"] == 2
+
+def test_uncached_reads_leave_cache_alone(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"), cache_settings={"max_entries": 1})
+    hot = storage.create_conversation()
+    cold = storage.create_conversation()
+    cached = storage.get_conversation(hot)
+    copy = storage.get_conversation(cold, cache=False)
+    assert copy["id"] == cold
+    assert storage.get_conversation(hot) is cached
+    assert [c["id"] for c in storage.iter_conversations() if c["id"] == hot][0] is not cached
+
+def test_concurrent_writers_keep_every_message(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+
+    def write(n):
+        for i in range(20):
+            storage.add_message(conversation_id, "user", f"{n}-{i}")
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(storage.get_conversation(conversation_id, cache=False)["messages"]) == 80
+
+def test_archive_and_restore(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    conversation_id = storage.create_conversation()
+    storage.add_message(conversation_id, "user", "hello")
+    conversation = storage.get_conversation(conversation_id)
+
+    assert storage.archive_conversations([conversation], "segment-2025-01.jsonl.gz") == 1
+    assert not (storage.data_dir / f"{conversation_id}.json").exists()
+    assert storage.get_conversation(conversation_id)["messages"][0]["content"] == "hello"
+
+    # Writing to an archived conversation restores it to the working set
+    storage.add_message(conversation_id, "user", "again")
+    assert (storage.data_dir / f"{conversation_id}.json").exists()
+    assert len(storage.get_conversation(conversation_id)["messages"]) == 2
+
+def test_import_keeps_newer_versions_unless_overwrite(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    existing = {"id": "c1", "created_at": "2025", "version": 3, "messages": []}
+    assert storage.import_conversations([existing])["imported"] == 1
+
+    older = {**existing, "version": 2, "messages": [{"role": "user", "content": "old"}]}
+    newer = {**existing, "version": 4, "messages": [{"role": "user", "content": "new"}]}
+    assert storage.import_conversations([older])["skipped"] == 1
+    assert storage.import_conversations([older], overwrite=True)["imported"] == 1
+    assert storage.get_conversation("c1")["version"] == 2
+    assert storage.import_conversations([newer])["imported"] == 1
+    assert storage.get_conversation("c1")["messages"][0]["content"] == "new"
+    assert storage.import_conversations([{"id": "../x", "messages": []}, "nope"])["invalid"] == 2
@@ -0,0 +1,57 @@
+import asyncio
+import json
+import threading
+
+import pytest
+
+from backend import tracing
+from backend.appender import get_appender
+from backend.tracing import Tracer, span, waterfall
+
+@pytest.fixture
+def tracer(tmp_path, monkeypatch):
+    tracer = Tracer({"enabled": True, "exporter": "jsonl", "path": str(tmp_path / "spans.jsonl")})
+    monkeypatch.setattr(tracing, "get_tracer", lambda: tracer)
+    return tracer
+
+def read_spans(tracer):
+    get_appender().flush()
+    with open(tracer.settings["path"]) as f:
+        return [json.loads(line) for line in f]
+
+def test_nested_spans_across_gather_share_the_trace(tracer):
+    async def expert(n):
+        with span("expert", **{"agent.id": n}):
+            await asyncio.sleep(0)
+
+    async def run():
+        with span("message", **{"conversation.id": "c1"}):
+            await asyncio.gather(expert(1), expert(2))
+
+    asyncio.run(run())
+    spans = read_spans(tracer)
+    root = next(s for s in spans if s["name"] == "message")
+    children = [s for s in spans if s["name"] == "expert"]
+    assert len(children) == 2
+    assert all(s["trace_id"] == root["trace_id"] and s["parent_span_id"] == root["span_id"] for s in children)
+    # conversation.id is inherited by child spans
+    assert all(s["attributes"]["conversation.id"] == "c1" for s in children)
+    assert "expert" in waterfall(spans)
+
+def test_errors_are_recorded(tracer):
+    with pytest.raises(ValueError):
+        with span("failing"):
+            raise ValueError("boom")
+    (failed,) = read_spans(tracer)
+    assert failed["status"] == "error" and "boom" in failed["error"]
+
+def test_export_writes_off_the_calling_thread(tracer, monkeypatch):
+    writers = []
+    original = type(get_appender())._write
+    monkeypatch.setattr(type(get_appender()), "_write", lambda self, path, records: (
+        writers.append(threading.current_thread()), original(self, path, records)
+    ))
+    with span("root"):
+        pass
+    assert len(read_spans(tracer)) == 1
+    assert writers and threading.current_thread() not in writers
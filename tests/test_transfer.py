@@ -0,0 +1,41 @@
+import json
+
+from backend.storage import Storage
+from backend.transfer import iter_export, iter_ndjson, import_lines
+
+def conversation(i, created_at="2025-01-05"):
+    return {"id": f"id{i:02d}", "created_at": created_at, "messages": [{"role": "user", "content": "x"}]}
+
+def make_storage(tmp_path):
+    storage = Storage(str(tmp_path / "conversations"))
+    for i in range(4):
+        with open(tmp_path / "conversations" / f"id{i:02d}.json", "w") as f:
+            json.dump(conversation(i), f)
+    storage.archive_conversations([conversation(1), conversation(5)], "segment-2025-01.jsonl.gz")
+    # A later copy in the same segment supersedes the first
+    storage.archive_conversations([{**conversation(5), "version": 3}, conversation(6)], "segment-2025-01.jsonl.gz")
+    storage.archive_conversations([conversation(7, "2025-02-01")], "segment-2025-02.jsonl.gz")
+    return storage
+
+def test_export_covers_working_set_then_archive(tmp_path):
+    exported = list(iter_export(make_storage(tmp_path)))
+    assert [c["id"] for c in exported] == ["id00", "id02", "id03", "id01", "id05", "id06", "id07"]
+    assert next(c for c in exported if c["id"] == "id05")["version"] == 3
+
+def test_resume_after_any_exported_id(tmp_path):
+    storage = make_storage(tmp_path)
+    ids = [c["id"] for c in iter_export(storage)]
+    for position, after in enumerate(ids):
+        assert [c["id"] for c in iter_export(storage, after=after)] == ids[position + 1:]
+
+def test_filters(tmp_path):
+    storage = make_storage(tmp_path)
+    assert [c["id"] for c in iter_export(storage, since="2025-02")] == ["id07"]
+    assert list(iter_export(storage, has_stage4=True)) == []
+
+def test_import_round_trip_skips_existing(tmp_path):
+    lines = list(iter_ndjson(iter_export(make_storage(tmp_path / "a"))))
+    target = Storage(str(tmp_path / "b" / "conversations"))
+    assert import_lines(target, lines, batch_size=3)["imported"] == 7
+    totals = import_lines(target, lines + ["not json"], batch_size=3)
+    assert (totals["imported"], totals["skipped"], totals["invalid"]) == (0, 7, 1)